@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Serve the dashboard reads from the async views (see config/asgi_urls.py)
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'config.asgi_urls')
+# Sync views run on sync_to_async's executor threads, which do not end with
+# the request, so persistent connections would never be closed
+os.environ.setdefault('DJANGO_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -0,0 +1,14 @@
+"""
+URL configuration for the ASGI entry point.
+
+Identical to ``config.urls`` except that the dashboard reads resolve to the
+async views in ``expenses.async_views`` first.
+"""
+from django.urls import path, include
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/', include('expenses.async_urls')),
+    *wsgi_urlpatterns,
+]
@@ -11,6 +11,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,12 +40,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'payments',
     'expenses',
 ]
 
 MIDDLEWARE = [
+    'expenses.profiling.ProfilingMiddleware',  # first, so its timings cover the whole stack
       'corsheaders.middleware.CorsMiddleware',  # keep this if frontend calls API
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # ADD this for static files
@@ -56,7 +59,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+# config/asgi.py switches this to config.asgi_urls
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'config.urls')
 
 TEMPLATES = [
     {
@@ -83,9 +87,74 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent
+            # read-then-write transactions (settling, ledger updates) queue on
+            # the busy timeout instead of failing with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Keep connections (and their pragmas) for a minute instead of reopening
+        # per request; checked before reuse. config/asgi.py defaults it to 0.
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Run on every new SQLite connection (expenses/db.py): WAL lets reads run
+# alongside the writer, NORMAL only syncs at checkpoints in WAL mode, reads go
+# through a 256 MiB memory map, and a locked database is retried for 10s.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 10000,
+}
+
+# Read-only views read from this alias when set (expenses/db.py). Point
+# DJANGO_REPLICA_DB at a live, readable copy of the database.
+DATABASE_REPLICA_ALIAS = None
+if os.environ.get('DJANGO_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DJANGO_REPLICA_DB'],
+        # Same lifetime as default, including ASGI's 0
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICA_ALIAS = 'replica'
+
+DATABASE_ROUTERS = ['expenses.db.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Local-memory per process; switch to FileBasedCache to share between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'divide-it',
     }
 }
 
+# Versioned dashboard responses (usage, balance, breakdown); see expenses/caching.py
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Server-Sent Events (expenses/stream.py, ASGI only). Publishing is in-process:
+# streams only hear about writes made by the same worker.
+STREAM_MAX_CONNECTIONS_PER_USER = 5
+# Per connection; a client further behind is told to resync instead
+STREAM_MAX_QUEUED_EVENTS = 100
+STREAM_MAX_QUEUED_BYTES = 64 * 1024
+# Seconds between keep-alive comments on an idle stream
+STREAM_HEARTBEAT = 15
+
+# Profiling
+# Requests slower than this many milliseconds are logged with their SQL; None disables the log.
+PROFILING_SLOW_REQUEST_MS = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -124,6 +193,25 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Django REST framework
+REST_FRAMEWORK = {
+    # Token from /api/login/, resolved through an in-process cache; sessions for the browsable API
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'expenses.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    # Same bytes as DRF's JSONRenderer with less encoding overhead (see expenses/fastpath.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'expenses.fastpath.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Resolved API tokens kept per process: entries, and seconds before a
+# revoked token stops working in other processes
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 300
+
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -136,3 +224,18 @@ CORS_ALLOW_HEADERS = default_headers + (
 # Replace with actual keys from environment variables in production
 RAZORPAY_KEY_ID = 'rzp_test_YOUR_KEY_ID'
 RAZORPAY_KEY_SECRET = 'YOUR_KEY_SECRET'
+# Signs webhook deliveries (Dashboard > Webhooks), separate from the API key
+RAZORPAY_WEBHOOK_SECRET = 'YOUR_WEBHOOK_SECRET'
+
+# Payment provider (payments/providers.py): 'razorpay', or 'fake' to run offline
+PAYMENT_PROVIDER = 'razorpay'
+PAYMENT_CONNECT_TIMEOUT = 3.05
+PAYMENT_READ_TIMEOUT = 10
+# Connection attempts retried; never a request the provider may have received
+PAYMENT_MAX_RETRIES = 2
+# Keep-alive connections kept per process
+PAYMENT_POOL_SIZE = 10
+# Seconds each fake order takes, to load-test against a slow provider
+PAYMENT_FAKE_LATENCY = 0
+# Events accepted per webhook request
+PAYMENT_WEBHOOK_MAX_BATCH = 500
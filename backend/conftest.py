@@ -0,0 +1,20 @@
+"""Fixtures shared by the expenses and payments test suites."""
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Cached responses are keyed by user id, which the test database reuses
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(tmp_path_factory):
+    # A file-backed test database: the default shared-cache in-memory one
+    # fails concurrent writers with "table is locked" instead of waiting,
+    # which the threaded settle tests need
+    from django.conf import settings
+    settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
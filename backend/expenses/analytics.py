@@ -0,0 +1,110 @@
+"""Spending analytics read from the ``MonthlySpend`` rollup.
+
+Every function here aggregates ``MonthlySpend`` rows (see
+``expenses/rollup.py``), so a request costs one query over at most one row
+per (member, month) of the group or user, whatever the number of expenses.
+Months are ``YYYY-MM`` in and out, except in the monthly usage payload,
+which keeps its ``Mon YYYY`` labels.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import fastpath
+from .models import MonthlySpend
+
+MEASURES = ('paid', 'share')
+
+
+def parse_month(value, name):
+    """The first day of a ``YYYY-MM`` month, or ``None``; raises ``ValueError``."""
+    if not value:
+        return None
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        return date(year, month, 1)
+    except ValueError:
+        raise ValueError(f'Invalid {name}, expected YYYY-MM')
+
+
+def _between(rows, start, end):
+    if start:
+        rows = rows.filter(month__gte=start)
+    if end:
+        rows = rows.filter(month__lte=end)
+    return rows
+
+
+def monthly_paid(user_id):
+    """``(month, total)`` rows of what ``user_id`` paid, across groups, months with spending only."""
+    return MonthlySpend.objects.filter(user_id=user_id).exclude(paid=0) \
+        .values('month').annotate(total=Sum('paid')).order_by('month')
+
+
+def usage(rows):
+    """The monthly usage payload from ``monthly_paid`` rows."""
+    return [{'month': row['month'].strftime('%b %Y'), 'amount': float(row['total'])} for row in rows]
+
+
+def group_monthly(group_id, start=None, end=None):
+    """What the group spent per month, oldest first."""
+    rows = _between(MonthlySpend.objects.filter(group_id=group_id), start, end) \
+        .values('month').annotate(total=Sum('paid')).order_by('month')
+    return [{'month': f'{row["month"]:%Y-%m}', 'total': float(row['total'])} for row in rows if row['total']]
+
+
+def group_members(group_id, start=None, end=None):
+    """Per member: what they paid, their share, and ``net`` = paid - share (positive: owed overall)."""
+    rows = _between(MonthlySpend.objects.filter(group_id=group_id), start, end) \
+        .values(*fastpath.user_lookups('user__')) \
+        .annotate(paid=Sum('paid'), share=Sum('share')).order_by('user__id')
+    return [
+        {
+            'user': fastpath.user_dict(row, 'user__'),
+            'paid': float(row['paid']),
+            'share': float(row['share']),
+            'net': float(row['paid'] - row['share']),
+        }
+        for row in rows
+    ]
+
+
+def year_over_year(rows, measure, year=None):
+    """Monthly ``measure`` totals of ``year`` (default: this year) against the year before."""
+    year = year or timezone.localdate().year
+    totals = defaultdict(int)
+    rows = rows.filter(month__gte=date(year - 1, 1, 1), month__lte=date(year, 12, 1)) \
+        .values('month').annotate(total=Sum(measure)).order_by()
+    for row in rows:
+        totals[row['month']] += row['total']
+
+    months = []
+    for number in range(1, 13):
+        current, previous = totals[date(year, number, 1)], totals[date(year - 1, number, 1)]
+        months.append({
+            'month': calendar.month_abbr[number],
+            'this_year': float(current),
+            'last_year': float(previous),
+            'change_percent': round(float((current - previous) / previous * 100), 1) if previous else None,
+        })
+    return {
+        'year': year,
+        'measure': measure,
+        'months': months,
+        'this_year': sum(month['this_year'] for month in months),
+        'last_year': sum(month['last_year'] for month in months),
+    }
+
+
+def group_year_over_year(group_id, year=None):
+    return year_over_year(MonthlySpend.objects.filter(group_id=group_id), 'paid', year)
+
+
+def user_year_over_year(user_id, measure='share', year=None, group_id=None):
+    rows = MonthlySpend.objects.filter(user_id=user_id)
+    if group_id:
+        rows = rows.filter(group_id=group_id)
+    return year_over_year(rows, measure, year)
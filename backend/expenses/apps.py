@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ExpensesConfig(AppConfig):
     name = 'expenses'
+
+    def ready(self):
+        # Connects the cache invalidation, group revision, token cache, stream,
+        # rollup and SQLite connection setup signal handlers
+        from . import authentication, caching, db, etags, rollup, stream  # noqa: F401
@@ -0,0 +1,130 @@
+"""Moving fully settled expenses to cold storage, and reading across both.
+
+``Expense`` and ``ExpenseSplit`` only ever grow, and settled rows are dead
+weight for every balance and settle query. ``archive_settled`` moves an
+expense and its splits into ``ArchivedExpense``/``ArchivedExpenseSplit``
+once every split is settled and both the expense and its last settlement
+are older than a cutoff. Archived rows owe nothing, so the ``Balance``
+ledger is unaffected.
+
+Each batch is copied with ``INSERT ... SELECT`` and deleted in one short
+transaction, after re-checking the candidates under a row lock, so the job
+can run alongside live traffic. It can be stopped and rerun at any point.
+
+History, exports and group totals read hot and cold rows together with
+``across()``. Monthly spending comes from ``MonthlySpend`` (``rollup.py``),
+which archiving leaves as it is. The expense list, expense detail and settle
+endpoints only see the hot tables.
+"""
+import time
+
+from django.db import connection, transaction
+
+from . import etags
+from .models import Expense, ExpenseSplit, ArchivedExpense, ArchivedExpenseSplit
+
+BATCH_SIZE = 500
+
+# Same attribute names on the hot and the archive models
+EXPENSE_FIELDS = ('id', 'description', 'amount', 'payer_id', 'group_id', 'date')
+SPLIT_FIELDS = ('id', 'expense_id', 'user_id', 'amount_owed', 'is_settled', 'settled_at')
+
+
+def across(build):
+    """``build(expense_model, split_model)`` over the hot tables ``UNION ALL`` the archive.
+
+    ``build`` must return a ``.values()``/``.values_list()`` queryset without
+    ordering; order the combined queryset instead.
+    """
+    return build(Expense, ExpenseSplit).union(build(ArchivedExpense, ArchivedExpenseSplit), all=True)
+
+
+class ArchiveReport:
+    def __init__(self):
+        self.expenses = 0
+        self.splits = 0
+        self.batches = 0
+        self.seconds = 0
+
+    @property
+    def rows_per_second(self):
+        return (self.expenses + self.splits) / self.seconds if self.seconds else 0
+
+    def as_dict(self):
+        return {
+            'expenses': self.expenses,
+            'splits': self.splits,
+            'batches': self.batches,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def candidates(cutoff):
+    """Expenses older than ``cutoff`` whose splits were all settled before it."""
+    return Expense.objects.filter(date__lt=cutoff) \
+        .exclude(splits__is_settled=False) \
+        .exclude(splits__settled_at__gte=cutoff)
+
+
+def _copy(source, target, fields, ids, key):
+    # INSERT ... SELECT keeps the rows out of Python entirely
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(target._meta.get_field(name).column) for name in fields)
+    sql, params = source.objects.filter(**{f'{key}__in': ids}).values_list(*fields).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(target._meta.db_table)} ({columns}) {sql}', params)
+        return cursor.rowcount
+
+
+def _delete(model, column, ids):
+    # Raw, so no per-row delete signals: archiving changes no balance, and the
+    # group revisions are bumped once per batch
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})', ids)
+
+
+def _archive_batch(cutoff, ids):
+    with transaction.atomic():
+        # Lock and re-check: an expense may have been deleted since it was picked
+        rows = list(candidates(cutoff).filter(id__in=ids).select_for_update(of=('self',))
+                    .values_list('id', 'group_id'))
+        ids = [expense_id for expense_id, _ in rows]
+        if not ids:
+            return 0, 0
+        expenses = _copy(Expense, ArchivedExpense, EXPENSE_FIELDS, ids, 'id')
+        splits = _copy(ExpenseSplit, ArchivedExpenseSplit, SPLIT_FIELDS, ids, 'expense_id')
+        _delete(ExpenseSplit, ExpenseSplit._meta.get_field('expense').column, ids)
+        _delete(Expense, Expense._meta.pk.column, ids)
+        # Cached expense lists and history pages change shape
+        etags.bump(group_id for _, group_id in rows)
+    return expenses, splits
+
+
+def archive_settled(cutoff, batch_size=BATCH_SIZE, pause=0, progress=None):
+    """Archive every candidate older than ``cutoff``, ``batch_size`` expenses per transaction.
+
+    Sleeps ``pause`` seconds between batches to leave room for live writes and
+    calls ``progress(report)`` after each one. Returns an ``ArchiveReport``.
+    """
+    report = ArchiveReport()
+    started = time.perf_counter()
+    last_id = 0
+    while True:
+        ids = list(candidates(cutoff).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        expenses, splits = _archive_batch(cutoff, ids)
+        report.expenses += expenses
+        report.splits += splits
+        report.batches += 1
+        report.seconds = time.perf_counter() - started
+        if progress:
+            progress(report)
+        if pause:
+            time.sleep(pause)
+    report.seconds = time.perf_counter() - started
+    return report
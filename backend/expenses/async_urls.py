@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import async_views
+
+# Same paths and names as their DRF counterparts in urls.py; the ASGI
+# urlconf lists these first so they win.
+urlpatterns = [
+    path('usage/<int:user_id>/', async_views.monthly_usage, name='monthly-usage'),
+    path('balance/<int:user_id>/', async_views.balance, name='balance'),
+    path('balance/breakdown/<int:user_id>/', async_views.balance_breakdown, name='balance-breakdown'),
+    path('history/<int:user_id>/', async_views.history, name='history'),
+    # Server-Sent Events; needs ASGI, so it has no DRF counterpart
+    path('stream/<int:user_id>/', async_views.stream, name='stream'),
+]
@@ -0,0 +1,116 @@
+"""Async implementations of the dashboard reads, served under ASGI.
+
+``config/asgi.py`` routes balance, breakdown, usage and history here (see
+``expenses/async_urls.py``); WSGI keeps the DRF views in ``views.py``. The
+payloads, status codes, caching and ETags are the same. Independent
+queries are awaited together with ``asyncio.gather`` and the event loop is
+never blocked on the database. Django still runs each ORM call in a
+per-request thread, so how much this buys depends on the database driver;
+``manage.py bench --concurrency N`` compares both entry points.
+
+``stream`` is the Server-Sent Events channel (``expenses/stream.py``),
+which only an async server can hold open cheaply.
+"""
+import asyncio
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+
+from . import analytics, caching, etags, fastpath
+from .db import replica_reads
+from .history import ahistory_page, DEFAULT_LIMIT as DEFAULT_HISTORY_LIMIT
+from .stream import frames, hub
+
+
+def _json(data, status=200):
+    # Byte for byte what the DRF views render
+    return HttpResponse(fastpath.dumps(data), status=status, content_type='application/json')
+
+
+def _not_found():
+    return _json({'error': 'User not found'}, status=404)
+
+
+async def balance(request, user_id):
+    async def totals():
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        row = await User.objects.filter(id=user_id).values('username').annotate(
+            you_owe=Coalesce(Sum('balances__you_owe'), zero),
+            owed_to_you=Coalesce(Sum('balances__owed_to_you'), zero)
+        ).order_by('username').afirst()
+        if row is None:
+            return None
+        return {'user': row['username'], 'you_owe': row['you_owe'], 'owed_to_you': row['owed_to_you']}
+
+    data = await caching.aget_or_compute('balance', user_id, totals)
+    return _json(data) if data is not None else _not_found()
+
+
+async def balance_breakdown(request, user_id):
+    async def breakdown():
+        exists, rows = await asyncio.gather(
+            User.objects.filter(id=user_id).aexists(),
+            _alist(fastpath.balance_rows(user_id)),
+        )
+        if not exists:
+            return None
+        return fastpath.breakdown(rows)
+
+    data = await caching.aget_or_compute('breakdown', user_id, breakdown)
+    return _json(data) if data is not None else _not_found()
+
+
+async def monthly_usage(request, user_id):
+    async def usage():
+        return analytics.usage(await _alist(analytics.monthly_paid(user_id)))
+
+    return _json(await caching.aget_or_compute('usage', user_id, usage))
+
+
+@replica_reads
+async def history(request, user_id):
+    etag = quote_etag(await etags.ahistory_etag(request, user_id))
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+
+    params = request.GET
+    try:
+        page = await ahistory_page(
+            user_id,
+            ordering=params.get('ordering', '-date'),
+            cursor=params.get('cursor'),
+            limit=params.get('limit', DEFAULT_HISTORY_LIMIT),
+            date_from=params.get('from'),
+            date_to=params.get('to'),
+            group_id=params.get('group_id'),
+        )
+    except ValueError as e:
+        return _json({'error': str(e)}, status=400)
+    if page is None:
+        return _not_found()
+
+    events, next_cursor = page
+    response = _json({'results': events, 'next_cursor': next_cursor})
+    response.headers.setdefault('ETag', etag)
+    return response
+
+
+async def stream(request, user_id):
+    if not await User.objects.filter(id=user_id).aexists():
+        return _not_found()
+    if hub.connections(user_id) >= hub.max_connections():
+        return _json({'error': 'Too many streams'}, status=429)
+    response = StreamingHttpResponse(frames(user_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Don't let nginx buffer the events
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
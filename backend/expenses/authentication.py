@@ -0,0 +1,117 @@
+"""Token authentication with an in-process token -> user cache.
+
+``LoginAPIView`` issues a ``rest_framework.authtoken`` ``Token``; clients
+send it as ``Authorization: Token <key>``. DRF's ``TokenAuthentication``
+would join the token table to the user on every request, so
+``CachedTokenAuthentication`` keeps resolved tokens in a bounded LRU with
+a TTL. A hit costs no query.
+
+Deleting a token (logout, password reset, user deletion) evicts it, and
+saving a user evicts their entry so the cached instance is never stale in
+this process. The cache is per process: another worker may keep accepting
+a revoked token until its entry expires, so ``AUTH_TOKEN_CACHE_TTL``
+(seconds, default 300) bounds how long a logout takes to apply everywhere.
+``AUTH_TOKEN_CACHE_SIZE`` (default 10000) bounds the memory.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Thread-safe LRU of token key -> ``(user, token)`` with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # A user has at most one token
+        self._keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.monotonic():
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._pop(self._keys.get(user.pk))
+            self._entries[key] = (user, token, time.monotonic() + self.ttl)
+            self._keys[user.pk] = key
+            while len(self._entries) > self.maxsize:
+                self._pop(next(iter(self._entries)))
+
+    def discard(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def discard_user(self, user_id):
+        with self._lock:
+            self._pop(self._keys.get(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._keys.get(entry[0].pk) == key:
+            del self._keys[entry[0].pk]
+
+
+token_cache = TokenCache(getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+                         getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 300))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        # Looks the token and its user up in one query and rejects inactive users
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return user, token
+
+
+def issue_token(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return token.key
+
+
+def revoke_tokens(user):
+    """Delete ``user``'s token; the signal below evicts it from the cache."""
+    Token.objects.filter(user=user).delete()
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    token_cache.discard(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user(sender, instance, **kwargs):
+    # Reload on the next request: is_active, password or profile may have changed
+    token_cache.discard_user(instance.pk)
@@ -0,0 +1,545 @@
+"""Synthetic-data load benchmark for the API (``manage.py bench``).
+
+Builds a configurable dataset, drives every URL in ``expenses/urls.py`` and
+``payments/urls.py`` through the DRF test client and reports latency
+percentiles, query counts and response sizes per scenario. Payments go
+through the fake provider (``payments/providers.py``), so runs are offline
+and repeatable; ``provider_latency`` makes it as slow as a real one.
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from asgiref.sync import async_to_sync
+from payments.models import Order
+from payments.providers import get_provider
+from rest_framework.renderers import JSONRenderer
+from . import caching, fastpath, ledger, rollup
+from .models import Group, Expense, ExpenseSplit, Balance, Profile
+from .money import split_evenly
+from .serializers import ExpenseSerializer, ExpenseSplitSerializer, UserSerializer
+from .views import expense_queryset
+
+PASSWORD = 'bench-password'
+
+
+class Dataset:
+    def __init__(self, users, groups, me, friend):
+        self.users = users
+        self.groups = groups
+        self.me = me
+        self.friend = friend
+        self.group = groups[0]
+
+
+def build_dataset(users=200, groups=20, group_size=10, expenses=5000, fanout=4,
+                  settled_ratio=0.5, orders=200, seed=42):
+    """Populate the database with synthetic users, groups, expenses and orders."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(PASSWORD)
+
+    people = User.objects.bulk_create([
+        User(username=f'bench{i}@example.com', email=f'bench{i}@example.com',
+             first_name='Bench', last_name=str(i), password=password)
+        for i in range(users)
+    ])
+    Profile.objects.bulk_create([Profile(user=u, avatar_url=f'/avatars/avatar{u.id % 6 + 1}.png') for u in people])
+
+    me = people[0]
+    group_rows = Group.objects.bulk_create([Group(name=f'Bench group {i}') for i in range(groups)])
+    Membership = Group.members.through
+    members_of = {}
+    memberships = []
+    for group in group_rows:
+        # The benchmark user is in every group so their reads are the heaviest
+        members = [me] + rng.sample(people[1:], min(group_size, users) - 1)
+        members_of[group.id] = members
+        memberships.extend(Membership(group=group, user=u) for u in members)
+    Membership.objects.bulk_create(memberships, batch_size=1000)
+
+    expense_rows = []
+    for i in range(expenses):
+        group = rng.choice(group_rows)
+        expense = Expense(description=f'Bench expense {i}', amount=Decimal(rng.randint(100, 500000)) / 100,
+                          payer=rng.choice(members_of[group.id]), group=group)
+        expense_rows.append(expense)
+    Expense.objects.bulk_create(expense_rows, batch_size=1000)
+    # auto_now_add ignores explicit dates on insert; spread them over a year
+    for expense in expense_rows:
+        expense.date = now - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+    Expense.objects.bulk_update(expense_rows, ['date'], batch_size=1000)
+
+    splits = []
+    for expense in expense_rows:
+        members = members_of[expense.group_id]
+        others = [u for u in members if u.id != expense.payer_id]
+        participants = sorted([expense.payer] + rng.sample(others, min(fanout, len(members)) - 1), key=lambda u: u.id)
+        for user, share in zip(participants, split_evenly(expense.amount, len(participants))):
+            settled = user.id == expense.payer_id or rng.random() < settled_ratio
+            splits.append(ExpenseSplit(
+                expense=expense, user=user, amount_owed=share, is_settled=settled,
+                settled_at=expense.date + timedelta(days=rng.randint(0, 30)) if settled and user.id != expense.payer_id else None
+            ))
+    ExpenseSplit.objects.bulk_create(splits, batch_size=1000)
+
+    Order.objects.bulk_create([
+        Order(order_product=f'Bench order {i}', order_amount_paise=rng.randint(1, 5000) * 100,
+              order_payment_id=f'order_seed{i}', isPaid=rng.random() < 0.5)
+        for i in range(orders)
+    ], batch_size=1000)
+
+    ledger.rebuild()
+    rollup.rebuild()
+    friend = next(u for u in members_of[group_rows[0].id] if u.id != me.id)
+    return Dataset(people, group_rows, me, friend)
+
+
+def _fresh_debt(ds, debtor, creditor):
+    # A new unsettled expense between two users, for endpoints that consume one per call
+    expense = Expense.objects.create(description='Bench debt', amount=20, payer=creditor, group=ds.group)
+    ExpenseSplit.objects.bulk_create([
+        ExpenseSplit(expense=expense, user=creditor, amount_owed=10, is_settled=True),
+        ExpenseSplit(expense=expense, user=debtor, amount_owed=10),
+    ])
+    ledger.apply_splits(expense.splits.all())
+    rollup.apply_splits(expense.splits.all())
+    return expense
+
+
+def _reset_confirm(ds, i):
+    # Tokens hash the current password, which the previous call replaced
+    user = User.objects.get(pk=ds.users[-1].pk)
+    return ('post', reverse('password-reset-confirm'), {
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+        'new_password': PASSWORD,
+    })
+
+
+def _settle_up(ds, i):
+    _fresh_debt(ds, ds.me, ds.friend)
+    return ('post', reverse('settle-up'), {'user_id': ds.me.id, 'friend_id': ds.friend.id})
+
+
+def _verify_payment(ds, i):
+    order = Order.objects.create(order_product='Bench', order_amount_paise=1000, order_payment_id=f'order_verify{i}')
+    return ('post', reverse('verify-payment'), {
+        'razorpay_order_id': order.order_payment_id,
+        'razorpay_payment_id': f'pay_bench{i}',
+        'razorpay_signature': get_provider().sign(order.order_payment_id, f'pay_bench{i}'),
+    })
+
+
+def _webhook(ds, i, events=100):
+    # One signed delivery paying ``events`` fresh orders
+    orders = Order.objects.bulk_create([
+        Order(order_product='Bench', order_amount_paise=1000, order_payment_id=f'order_hook{i}.{n}.{time.time_ns()}')
+        for n in range(events)
+    ])
+    body = json.dumps({'events': [{
+        'id': f'evt_{order.order_payment_id}', 'entity': 'event', 'event': 'payment.captured',
+        'payload': {'payment': {'entity': {'id': f'pay_{order.order_payment_id}', 'order_id': order.order_payment_id}}},
+    } for order in orders]}).encode()
+    return ('post', reverse('payment-webhook'), body, {
+        'content_type': 'application/json', 'HTTP_X_RAZORPAY_SIGNATURE': get_provider().sign_webhook(body)})
+
+
+# name -> (url name, request builder). Builders run untimed, so any setup
+# a call needs (fresh rows to delete or settle) happens there. A builder
+# returns (method, path, data), plus request options when the body is not
+# plain JSON.
+SCENARIOS = {
+    'login': ('login', lambda ds, i: ('post', reverse('login'), {'username': ds.me.username, 'password': PASSWORD})),
+    'logout': ('logout', lambda ds, i: ('post', reverse('logout'), None)),
+    'register': ('register', lambda ds, i: ('post', reverse('register'), {
+        'email': f'bench-new-{i}-{time.time_ns()}@example.com', 'password': PASSWORD})),
+    'profile': ('user-profile', lambda ds, i: ('get', reverse('user-profile', args=[ds.me.id]), None)),
+    'profile-update': ('user-profile-update', lambda ds, i: (
+        'post', reverse('user-profile-update', args=[ds.me.id]), {'first_name': 'Bench'})),
+    'usage': ('monthly-usage', lambda ds, i: ('get', reverse('monthly-usage', args=[ds.me.id]), None)),
+    'group-monthly': ('group-monthly', lambda ds, i: ('get', reverse('group-monthly', args=[ds.group.id]), None)),
+    'group-member-spend': ('group-member-spend', lambda ds, i: (
+        'get', reverse('group-member-spend', args=[ds.group.id]), None)),
+    'group-yoy': ('group-yoy', lambda ds, i: ('get', reverse('group-yoy', args=[ds.group.id]), None)),
+    'user-yoy': ('user-yoy', lambda ds, i: ('get', reverse('user-yoy', args=[ds.me.id]) + '?measure=share', None)),
+    'group-list': ('group-list', lambda ds, i: ('get', reverse('group-list') + f'?user_id={ds.me.id}', None)),
+    'group-summary': ('group-list', lambda ds, i: (
+        'get', reverse('group-list') + f'?user_id={ds.me.id}&view=summary', None)),
+    'group-create': ('group-list', lambda ds, i: ('post', reverse('group-list'), {'name': f'New {i}', 'user_id': ds.me.id})),
+    'group-detail': ('group-detail', lambda ds, i: ('get', reverse('group-detail', args=[ds.group.id]), None)),
+    'group-delete': ('group-detail', lambda ds, i: (
+        'delete', reverse('group-detail', args=[Group.objects.create(name='Doomed').id]), None)),
+    'add-member': ('add-member', lambda ds, i: ('post', reverse('add-member', args=[ds.group.id]), {
+        'email': f'bench-member-{i}-{time.time_ns()}@example.com', 'name': 'Bench Member'})),
+    'settle-plan': ('group-settle-plan', lambda ds, i: ('get', reverse('group-settle-plan', args=[ds.group.id]), None)),
+    'expense-list': ('expense-list', lambda ds, i: ('get', reverse('expense-list') + f'?group_id={ds.group.id}', None)),
+    'expense-create': ('expense-list', lambda ds, i: ('post', reverse('expense-list'), {
+        'description': f'Bench {i}', 'amount': '123.45', 'payer': ds.me.id, 'group': ds.group.id})),
+    'expense-import': ('expense-import', lambda ds, i: ('post', reverse('expense-import'), [
+        {'description': f'Import {i}.{n}', 'amount': '42.10', 'payer': ds.me.id, 'group': ds.group.id} for n in range(100)])),
+    'expense-detail': ('expense-detail', lambda ds, i: (
+        'get', reverse('expense-detail', args=[ds.group.expenses.order_by('-id').values_list('id', flat=True).first()]), None)),
+    'expense-delete': ('expense-detail', lambda ds, i: (
+        'delete', reverse('expense-detail', args=[_fresh_debt(ds, ds.friend, ds.me).id]), None)),
+    'balance': ('balance', lambda ds, i: ('get', reverse('balance', args=[ds.me.id]), None)),
+    'breakdown': ('balance-breakdown', lambda ds, i: ('get', reverse('balance-breakdown', args=[ds.me.id]), None)),
+    'settle-up': ('settle-up', _settle_up),
+    'split-settle': ('split-settle', lambda ds, i: ('post', reverse('split-settle', args=[
+        _fresh_debt(ds, ds.me, ds.friend).splits.get(user=ds.me).id]), None)),
+    'history': ('history', lambda ds, i: ('get', reverse('history', args=[ds.me.id]), None)),
+    'export-history': ('export-history', lambda ds, i: ('get', reverse('export-history', args=[ds.me.id]), None)),
+    'export-group': ('export-group', lambda ds, i: (
+        'get', reverse('export-group', args=[ds.group.id]) + '?format=ndjson', None)),
+    'metrics': ('metrics', lambda ds, i: ('get', reverse('metrics'), None)),
+    'password-reset': ('password-reset-request', lambda ds, i: ('post', reverse('password-reset-request'), {'email': ds.me.email})),
+    'password-reset-confirm': ('password-reset-confirm', _reset_confirm),
+    'create-order': ('create-order', lambda ds, i: ('post', reverse('create-order'), {'name': 'Bench', 'amount': '10'})),
+    'verify-payment': ('verify-payment', _verify_payment),
+    'order-list': ('order-list', lambda ds, i: ('get', reverse('order-list'), None)),
+    'order-list-paid': ('order-list', lambda ds, i: ('get', reverse('order-list') + '?paid=true', None)),
+    'order-summary': ('order-summary', lambda ds, i: ('get', reverse('order-summary'), None)),
+    'payment-webhook': ('payment-webhook', _webhook),
+}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _body_size(response):
+    if getattr(response, 'streaming', False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run(ds, names=None, iterations=20, warmup=2, cold=False, provider_latency=0):
+    """Run the selected scenarios and return ``{name: summary}``."""
+    client = APIClient()
+    # Only the debtor may settle their own split; the rest ignore auth
+    client.force_authenticate(user=ds.me)
+    results = {}
+    with override_settings(PAYMENT_PROVIDER='fake', PAYMENT_FAKE_LATENCY=provider_latency):
+        for name in names or SCENARIOS:
+            build = SCENARIOS[name][1]
+            timings, queries, sizes, statuses = [], [], [], set()
+            for i in range(warmup + iterations):
+                method, path, data, *options = build(ds, i)
+                if cold:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(path, data, **(options[0] if options else {'format': 'json'}))
+                    size = _body_size(response)
+                    elapsed = time.perf_counter() - started
+                if i < warmup:
+                    continue
+                timings.append(elapsed * 1000)
+                queries.append(len(captured))
+                sizes.append(size)
+                statuses.add(response.status_code)
+            results[name] = {
+                'method': method.upper(),
+                'url_name': SCENARIOS[name][0],
+                'status': sorted(statuses),
+                'samples': len(timings),
+                'p50_ms': round(_percentile(timings, 50), 3),
+                'p95_ms': round(_percentile(timings, 95), 3),
+                'p99_ms': round(_percentile(timings, 99), 3),
+                'mean_ms': round(sum(timings) / len(timings), 3),
+                'queries': max(queries),
+                'bytes': _percentile(sizes, 50),
+            }
+    return results
+
+
+# Dashboard reads with async implementations under ASGI (expenses/async_urls.py)
+DASHBOARD = ('balance', 'breakdown', 'usage', 'history')
+URLCONFS = {'wsgi': 'config.urls', 'asgi': 'config.asgi_urls'}
+
+
+def _summary(outcomes, wall):
+    timings = [elapsed * 1000 for elapsed, _ in outcomes]
+    return {
+        'status': sorted({status for _, status in outcomes}),
+        'requests': len(outcomes),
+        'requests_per_second': round(len(outcomes) / wall, 1),
+        'p50_ms': round(_percentile(timings, 50), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'p99_ms': round(_percentile(timings, 99), 3),
+    }
+
+
+def _wsgi_burst(paths, concurrency, before):
+    local = threading.local()
+
+    def fetch(path):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        before()
+        started = time.perf_counter()
+        response = local.client.get(path)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(fetch, paths))
+    return outcomes, time.perf_counter() - started
+
+
+def _asgi_burst(paths, concurrency, before):
+    async def burst():
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def fetch(path):
+            async with slots:
+                before()
+                started = time.perf_counter()
+                response = await client.get(path)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(fetch(path) for path in paths))
+        return outcomes, time.perf_counter() - started
+
+    return async_to_sync(burst)()
+
+
+def run_concurrent(ds, names=None, concurrency=16, requests=200, cold=False):
+    """Serve each dashboard read ``requests`` times, ``concurrency`` at a time,
+    through Django's WSGI and ASGI handlers. Returns ``{name: {interface: summary}}``.
+    """
+    # A fresh data version makes the next read miss the cache
+    before = (lambda: caching.invalidate([ds.me.id])) if cold else (lambda: None)
+    results = {}
+    for name in names or DASHBOARD:
+        build = SCENARIOS[name][1]
+        for interface, burst in (('wsgi', _wsgi_burst), ('asgi', _asgi_burst)):
+            with override_settings(ROOT_URLCONF=URLCONFS[interface]):
+                paths = [build(ds, i)[1] for i in range(requests)]
+                burst(paths[:concurrency], concurrency, before)  # warm up
+                outcomes, wall = burst(paths, concurrency, before)
+            results.setdefault(name, {})[interface] = _summary(outcomes, wall)
+    return results
+
+
+def run_order_load(concurrency=16, requests=200, provider_latency=0):
+    """POST ``requests`` orders, ``concurrency`` at a time, through WSGI against
+    the fake provider. With a slow provider, throughput is capped near
+    ``concurrency / provider_latency``: every worker waits on the provider.
+    """
+    local = threading.local()
+
+    def order(i):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        started = time.perf_counter()
+        response = local.client.post(reverse('create-order'), {'name': f'Load {i}', 'amount': 10},
+                                     content_type='application/json')
+        return time.perf_counter() - started, response.status_code
+
+    with override_settings(PAYMENT_PROVIDER='fake', PAYMENT_FAKE_LATENCY=provider_latency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(order, range(requests)))
+        wall = time.perf_counter() - started
+    return _summary(outcomes, wall)
+
+
+# SQLite connection setups for run_contention: Django's defaults (rollback
+# journal, 5s busy timeout, a connection per request) against the project's
+CONNECTION_SETUPS = {
+    'default': lambda: ({}, 0),
+    'tuned': lambda: (settings.SQLITE_PRAGMAS, settings.DATABASES['default']['CONN_MAX_AGE']),
+}
+# Dashboard and list reads the contention readers cycle through
+CONTENTION_READS = ('balance', 'history', 'expense-list', 'group-monthly')
+
+
+def _copy_database(path):
+    # The dataset, copied out of the (in-memory) test database
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+
+
+def _contend(ds, path, pragmas, max_age, writers, readers, requests):
+    paths = [SCENARIOS[name][1](ds, i)[1] for i, name in enumerate(CONTENTION_READS)]
+    # Every thread opens its connection from this dict
+    settings_dict = connection.settings_dict
+    saved = settings_dict['NAME'], settings_dict['CONN_MAX_AGE']
+    settings_dict['NAME'], settings_dict['CONN_MAX_AGE'] = path, max_age
+
+    def request(send):
+        # What the request handler does around every request
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            status = send().status_code
+        finally:
+            close_old_connections()
+        return time.perf_counter() - started, status
+
+    def work(role, n):
+        client = Client(raise_request_exception=False)
+        outcomes = []
+        try:
+            for i in range(requests):
+                if role == 'writes':
+                    outcomes.append(request(lambda: client.post(reverse('expense-list'), {
+                        'description': f'Contention {n}.{i}', 'amount': '12.00', 'payer': ds.me.id,
+                        'group': ds.group.id}, content_type='application/json')))
+                else:
+                    # A fresh data version makes the read miss the cache
+                    caching.invalidate([ds.me.id])
+                    outcomes.append(request(lambda: client.get(paths[(n + i) % len(paths)])))
+        finally:
+            connection.close()
+        return role, outcomes
+
+    roles = ['writes'] * writers + ['reads'] * readers
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(len(roles)) as pool:
+                finished = list(pool.map(work, roles, range(len(roles))))
+            wall = time.perf_counter() - started
+    finally:
+        settings_dict['NAME'], settings_dict['CONN_MAX_AGE'] = saved
+
+    summary = {}
+    for role in ('writes', 'reads'):
+        outcomes = [outcome for kind, batch in finished if kind == role for outcome in batch]
+        if outcomes:
+            summary[role] = {**_summary(outcomes, wall),
+                             'errors': sum(status >= 500 for _, status in outcomes)}
+    return summary
+
+
+def run_contention(ds, writers=4, readers=8, requests=50):
+    """Run ``writers`` threads creating expenses alongside ``readers`` threads
+    reading dashboards and lists, uncached, against a file copy of the
+    dataset, once per entry in ``CONNECTION_SETUPS``. ``errors`` counts 5xx
+    responses, which here are "database is locked". All threads share one
+    interpreter, so a writer holding the lock also waits on the GIL; expect
+    longer lock waits than separate worker processes would see.
+    Returns ``{setup: {'writes': summary, 'reads': summary}}``.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, setup in CONNECTION_SETUPS.items():
+            # A fresh copy each time: WAL mode sticks to the file
+            path = os.path.join(directory, f'{name}.sqlite3')
+            _copy_database(path)
+            pragmas, max_age = setup()
+            results[name] = _contend(ds, path, pragmas, max_age, writers, readers, requests)
+    return results
+
+
+# Serializer path vs the .values() fast path (expenses/fastpath.py) for the
+# hot list payloads: (serializer build, fast path build), each given a row count
+def _serializer_expenses(rows):
+    return ExpenseSerializer(expense_queryset().order_by('id')[:rows], many=True).data
+
+
+def _fastpath_expenses(rows):
+    return fastpath.expense_list(Expense.objects.order_by('id')[:rows])
+
+
+def _serializer_splits(rows):
+    splits = ExpenseSplit.objects.select_related('user__profile').order_by('id')[:rows]
+    return ExpenseSplitSerializer(splits, many=True).data
+
+
+def _fastpath_splits(rows):
+    return fastpath.splits_by_expense(ExpenseSplit.objects.order_by('id').values(*fastpath.SPLIT_LOOKUPS)[:rows])
+
+
+def _serializer_breakdown(rows):
+    return [{
+        'friend': UserSerializer(balance.friend).data,
+        'you_owe': float(balance.you_owe),
+        'owed_to_you': float(balance.owed_to_you),
+        'net_balance': float(balance.owed_to_you - balance.you_owe)
+    } for balance in Balance.objects.select_related('friend__profile').order_by('id')[:rows]]
+
+
+def _fastpath_breakdown(rows):
+    return fastpath.breakdown(Balance.objects.order_by('id')
+                              .values('you_owe', 'owed_to_you', *fastpath.user_lookups('friend__'))[:rows])
+
+
+SERIALIZATION = {
+    'expense-list': (_serializer_expenses, _fastpath_expenses, Expense),
+    'splits': (_serializer_splits, _fastpath_splits, ExpenseSplit),
+    'breakdown': (_serializer_breakdown, _fastpath_breakdown, Balance),
+}
+
+
+def _cpu_ms(build, renderer, rows, repeat):
+    # Best of ``repeat`` process CPU times; the build includes the query
+    best_build = best_render = None
+    for _ in range(repeat):
+        started = time.process_time()
+        data = build(rows)
+        built = time.process_time()
+        renderer.render(data)
+        rendered = time.process_time()
+        best_build = min(built - started, best_build or float('inf'))
+        best_render = min(rendered - built, best_render or float('inf'))
+    return best_build * 1000, best_render * 1000
+
+
+def run_serialization(rows=1000, repeat=5):
+    """CPU per 1k rows of each hot payload through the serializers and the fast path.
+
+    Returns ``{payload: {'rows', 'serializer', 'fastpath', 'cpu_saved_ms', 'speedup'}}``.
+    """
+    results = {}
+    for name, (serializer, fast, model) in SERIALIZATION.items():
+        count = min(rows, model.objects.count())
+        if not count:
+            continue
+        scale = 1000 / count
+        summary = {'rows': count}
+        for label, build, renderer in (('serializer', serializer, JSONRenderer()),
+                                       ('fastpath', fast, fastpath.JSONRenderer())):
+            build_ms, render_ms = _cpu_ms(build, renderer, count, repeat)
+            summary[label] = {
+                'build_ms': round(build_ms * scale, 3),
+                'render_ms': round(render_ms * scale, 3),
+                'total_ms': round((build_ms + render_ms) * scale, 3),
+            }
+        old, new = summary['serializer']['total_ms'], summary['fastpath']['total_ms']
+        summary['cpu_saved_ms'] = round(old - new, 3)
+        summary['speedup'] = round(old / new, 2) if new else None
+        results[name] = summary
+    return results
@@ -0,0 +1,143 @@
+"""Versioned per-user cache for the dashboard reads.
+
+Usage, balance and breakdown responses are cached under
+``dashboard:<name>:<user_id>:<version>``. Every user has a data version
+that is replaced whenever an ``Expense`` or ``ExpenseSplit`` they are part
+of changes, so a write invalidates only the affected users and stale
+entries simply age out. Works with any Django cache backend (local-memory
+or file based); the alias and timeout come from settings.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Expense, ExpenseSplit
+
+_MISSING = object()
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f'dashboard:version:{user_id}'
+
+
+def user_version(user_id):
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Never reuse a previous version if the key was evicted
+        cache.add(_version_key(user_id), time.time_ns(), None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def _bump(user_ids):
+    version = time.time_ns()
+    _cache().set_many({_version_key(user_id): version for user_id in user_ids}, None)
+
+
+def invalidate(user_ids):
+    """Give ``user_ids`` a new data version, now and again once the transaction commits."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    _bump(user_ids)
+    if transaction.get_connection().in_atomic_block:
+        # A reader may cache pre-commit data under the version set above
+        transaction.on_commit(lambda: _bump(user_ids))
+
+
+def _count(name):
+    cache = _cache()
+    key = f'dashboard:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def stats():
+    """Hit/miss counters since the cache was last cleared."""
+    values = _cache().get_many(['dashboard:stats:hits', 'dashboard:stats:misses'])
+    return {
+        'hits': values.get('dashboard:stats:hits', 0),
+        'misses': values.get('dashboard:stats:misses', 0),
+    }
+
+
+def get_or_compute(name, user_id, compute):
+    """Return the cached ``name`` payload for ``user_id``, computing it on a miss.
+
+    ``compute`` returning ``None`` (e.g. unknown user) is not cached.
+    """
+    cache = _cache()
+    key = f'dashboard:{name}:{user_id}:{user_version(user_id)}'
+    data = cache.get(key, _MISSING)
+    if data is not _MISSING:
+        _count('hits')
+        return data
+
+    _count('misses')
+    data = compute()
+    if data is not None:
+        cache.set(key, data, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return data
+
+
+async def _auser_version(user_id):
+    cache = _cache()
+    version = await cache.aget(_version_key(user_id))
+    if version is None:
+        await cache.aadd(_version_key(user_id), time.time_ns(), None)
+        version = await cache.aget(_version_key(user_id))
+    return version
+
+
+async def _acount(name):
+    cache = _cache()
+    key = f'dashboard:stats:{name}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+
+async def aget_or_compute(name, user_id, compute):
+    """Async ``get_or_compute``; ``compute`` is a coroutine function."""
+    cache = _cache()
+    key = f'dashboard:{name}:{user_id}:{await _auser_version(user_id)}'
+    data = await cache.aget(key, _MISSING)
+    if data is not _MISSING:
+        await _acount('hits')
+        return data
+
+    await _acount('misses')
+    data = await compute()
+    if data is not None:
+        await cache.aset(key, data, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return data
+
+
+@receiver([post_save, post_delete], sender=Expense)
+def expense_changed(sender, instance, **kwargs):
+    invalidate([instance.payer_id])
+
+
+@receiver([post_save, post_delete], sender=ExpenseSplit)
+def split_changed(sender, instance, signal, **kwargs):
+    user_ids = [instance.user_id]
+    if ExpenseSplit.expense.is_cached(instance):
+        user_ids.append(instance.expense.payer_id)
+    elif signal is post_save:
+        user_ids.append(Expense.objects.filter(pk=instance.expense_id).values_list('payer_id', flat=True).first())
+    # Split deletes only happen through their expense, whose own signal covers the payer
+    invalidate(user_ids)
@@ -0,0 +1,127 @@
+"""Counter upserts, read replica routing and SQLite connection setup.
+
+``add_totals`` adds to running totals (the ledger, the monthly rollup) with
+one ``INSERT ... ON CONFLICT DO UPDATE`` per batch, so the database settles
+concurrent first writes to the same row; a lookup followed by
+``bulk_create`` cannot, and ``select_for_update`` is a no-op on SQLite.
+
+Views decorated with ``replica_reads`` (history, lists and analytics)
+send their queries to ``settings.DATABASE_REPLICA_ALIAS`` when one is
+configured. Everything else, writes, reads inside a transaction and reads
+made while authenticating, stays on ``default``. A replica may lag behind,
+so only views that can show a slightly old answer are decorated. The
+cached dashboard reads (balance, breakdown, usage) are not: a payload read
+from a lagging replica would be cached under the version the write just
+set and served until it expires.
+
+Every new SQLite connection but the replica's runs
+``settings.SQLITE_PRAGMAS``: WAL, so readers no longer block the writer,
+``synchronous=NORMAL``, a memory-mapped read path and a longer busy
+timeout. With ``CONN_MAX_AGE`` that happens
+once per worker thread rather than once per request.
+``manage.py bench --contention N`` measures both against a file database.
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def add_totals(model, key_fields, total_fields, deltas):
+    """Add ``{key values: total deltas}`` to ``model``'s rows, inserting missing ones.
+
+    ``key_fields`` must be a unique constraint of ``model``; ``total_fields``
+    are decimal fields, rounded to their places after every addition.
+    """
+    if not deltas:
+        return
+    connection = connections[router.db_for_write(model)]
+    opts = model._meta
+    quote = connection.ops.quote_name
+    table = quote(opts.db_table)
+    keys = [opts.get_field(name) for name in key_fields]
+    totals = [opts.get_field(name) for name in total_fields]
+    fields = keys + totals
+    sql = 'INSERT INTO {} ({}) VALUES {{}} ON CONFLICT ({}) DO UPDATE SET {}'.format(
+        table,
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(quote(field.column) for field in keys),
+        ', '.join(f'{quote(field.column)} = ROUND({table}.{quote(field.column)} + excluded.{quote(field.column)}, '
+                  f'{field.decimal_places})' for field in totals),
+    )
+    row = '({})'.format(', '.join(['%s'] * len(fields)))
+    rows = [(*key, *values) for key, values in deltas.items()]
+    batch_size = connection.ops.bulk_batch_size(fields, rows)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            cursor.execute(sql.format(', '.join([row] * len(batch))), [
+                field.get_db_prep_save(value, connection) for values in batch for field, value in zip(fields, values)
+            ])
+
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def reading_replica():
+    """Route reads outside transactions to the replica until the block exits."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    """Decorate a view or view method (sync or async) to read from the replica."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with reading_replica():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with reading_replica():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+def replica_alias():
+    """The configured replica alias, or ``None``."""
+    return getattr(settings, 'DATABASE_REPLICA_ALIAS', None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        # A transaction reads what it writes
+        if alias and _replica_reads.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of default, migrated by replication
+        return False if db == replica_alias() else None
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    # The replica's journal mode and syncing belong to whatever keeps it
+    if connection.vendor != 'sqlite' or connection.alias == replica_alias():
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,98 @@
+"""Group revision counters and the ETags derived from them.
+
+``Group.revision`` is incremented whenever an expense, split or membership
+of the group changes. Read endpoints hash the revisions they depend on,
+plus the request path, into a strong ETag and let Django's ``condition``
+decorator answer ``304 Not Modified``. An unchanged payload then costs one
+small indexed query and no serialization.
+"""
+import hashlib
+
+from django.db.models import F, Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import groups
+from .models import Group, Expense, ExpenseSplit, ArchivedExpense, ArchivedExpenseSplit
+
+
+def bump(group_ids):
+    """Increment the revision of every group in ``group_ids``."""
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    if group_ids:
+        Group.objects.filter(id__in=group_ids).update(revision=F('revision') + 1)
+
+
+def bump_for_splits(splits):
+    """Increment the revision of the groups owning a split queryset, in one UPDATE."""
+    Group.objects.filter(id__in=splits.values('expense__group_id')).update(revision=F('revision') + 1)
+
+
+def bump_for_member(user):
+    """Increment the revision of every group ``user`` belongs to (their nested details changed)."""
+    Group.objects.filter(members=user).update(revision=F('revision') + 1)
+
+
+def _etag(request, revisions):
+    digest = hashlib.sha1(request.get_full_path().encode())
+    for group_id, revision in revisions:
+        digest.update(f'|{group_id}:{revision}'.encode())
+    return digest.hexdigest()
+
+
+def group_list_etag(request, *args, **kwargs):
+    user_id = groups.caller_id(request)
+    if user_id is None:
+        return None
+    return _etag(request, groups.member_groups(user_id).order_by('id').values_list('id', 'revision'))
+
+
+def group_detail_etag(request, pk, *args, **kwargs):
+    revisions = list(Group.objects.filter(pk=pk).values_list('id', 'revision'))
+    return _etag(request, revisions) if revisions else None
+
+
+def expense_list_etag(request, *args, **kwargs):
+    group_id = request.GET.get('group_id')
+    if not group_id or not group_id.isdigit():
+        return None
+    return group_detail_etag(request, group_id)
+
+
+def _history_revisions(user_id):
+    # The user's groups plus every group they paid or share an expense in,
+    # hot or archived: payers and participants need not be members
+    lookup = Q(id__in=Group.members.through.objects.filter(user_id=user_id).values('group_id'))
+    for expense, split in ((Expense, ExpenseSplit), (ArchivedExpense, ArchivedExpenseSplit)):
+        lookup |= Q(id__in=expense.objects.filter(payer_id=user_id).values('group_id'))
+        lookup |= Q(id__in=split.objects.filter(user_id=user_id).values('expense__group_id'))
+    return Group.objects.filter(lookup).order_by('id').values_list('id', 'revision')
+
+
+def history_etag(request, user_id, *args, **kwargs):
+    return _etag(request, _history_revisions(user_id))
+
+
+async def ahistory_etag(request, user_id):
+    return _etag(request, [row async for row in _history_revisions(user_id)])
+
+
+@receiver([post_save, post_delete], sender=Expense)
+def expense_changed(sender, instance, **kwargs):
+    bump([instance.group_id])
+
+
+@receiver([post_save, post_delete], sender=ExpenseSplit)
+def split_changed(sender, instance, signal, **kwargs):
+    # Split deletes only happen through their expense, whose own signal bumps the group
+    if signal is post_save:
+        bump_for_splits(ExpenseSplit.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Group.members.through)
+def members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # user.expense_groups.clear(): the groups are only known beforehand
+        bump_for_member(instance)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        bump((pk_set or []) if reverse else [instance.pk])
@@ -0,0 +1,147 @@
+"""Streaming CSV/NDJSON ledger exports.
+
+An export is one row per ``ExpenseSplit`` with its expense, payer, group and
+debtor joined in, archived splits included (``archive.across``). Rows are read with ``values_list().iterator()`` so the
+database cursor is consumed in chunks and never materialised, and written
+out through ``StreamingHttpResponse`` in buffered blocks. The CSV header
+goes out before the query runs, so the first byte does not wait on the
+database, and memory stays flat however many splits are exported.
+
+Under ASGI the body is an async iterator that reads one block at a time
+through ``sync_to_async``; Django reads a sync iterator into a list before
+sending anything.
+"""
+import csv
+import io
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from .archive import across
+from .history import _day_start
+
+CHUNK_SIZE = 2000
+# Bytes buffered before a block is handed to the server
+FLUSH_SIZE = 64 * 1024
+
+# output column -> lookup
+COLUMNS = {
+    'split_id': 'id',
+    'expense_id': 'expense_id',
+    'date': 'expense__date',
+    'description': 'expense__description',
+    'expense_amount': 'expense__amount',
+    'group_id': 'expense__group_id',
+    'group_name': 'expense__group__name',
+    'payer_id': 'expense__payer_id',
+    'payer_username': 'expense__payer__username',
+    'user_id': 'user_id',
+    'user_username': 'user__username',
+    'amount_owed': 'amount_owed',
+    'is_settled': 'is_settled',
+    'settled_at': 'settled_at',
+}
+
+
+class CSVRenderer(BaseRenderer):
+    """Lets DRF negotiate ``?format=csv`` / ``Accept: text/csv``; the export view streams the body itself."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error payloads go through the renderer
+        return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+class NDJSONRenderer(CSVRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+def _rows(build):
+    # build(expense_model, split_model) -> unordered split queryset
+    return across(lambda expense, split: build(expense, split).values_list(*COLUMNS.values())) \
+        .order_by('expense__date', 'expense_id', 'id')
+
+
+def group_rows(group_id):
+    return _rows(lambda expense, split: split.objects.filter(expense__group_id=group_id))
+
+
+def history_rows(user, date_from=None, date_to=None, group_id=None):
+    """Every split ``user`` owes or is owed. Raises ``ValueError`` for a malformed date."""
+    start = _day_start(date_from, 'from')
+    end = _day_start(date_to, 'to')
+
+    def build(expense, split):
+        # Subquery rather than a join so each side of the OR keeps its own index
+        paid = expense.objects.filter(payer=user).values('id')
+        rows = split.objects.filter(Q(user=user) | Q(expense_id__in=paid))
+        if start:
+            rows = rows.filter(expense__date__gte=start)
+        if end:
+            rows = rows.filter(expense__date__lt=end + timedelta(days=1))
+        if group_id:
+            rows = rows.filter(expense__group_id=group_id)
+        return rows
+
+    return _rows(build)
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(value.isoformat() if hasattr(value, 'isoformat') else value for value in row)
+        if buffer.tell() >= FLUSH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_lines(rows):
+    encoder = DjangoJSONEncoder()
+    block = []
+    size = 0
+    for row in rows:
+        line = encoder.encode(dict(zip(COLUMNS, row))) + '\n'
+        block.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(block)
+            block, size = [], 0
+    yield ''.join(block)
+
+
+async def _ablocks(blocks):
+    # Each block is read on the request's sync thread, which keeps the cursor
+    read = sync_to_async(next)
+    while (block := await read(blocks, None)) is not None:
+        yield block
+
+
+def stream(request, rows, filename):
+    """Stream ``rows`` from ``group_rows``/``history_rows`` as the ``csv`` or ``ndjson`` attachment ``request`` accepts."""
+    fmt = request.accepted_renderer.format
+    rows = rows.iterator(chunk_size=CHUNK_SIZE)
+    if fmt == NDJSONRenderer.format:
+        body, content_type = _ndjson_lines(rows), NDJSONRenderer.media_type
+    else:
+        body, content_type = _csv_lines(rows), CSVRenderer.media_type
+    if isinstance(request._request, ASGIRequest):
+        body = _ablocks(body)
+    response = StreamingHttpResponse(body, content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,60 @@
+"""Caller-scoped group listing and its summary annotations.
+
+``/api/groups/`` only lists the groups the caller belongs to. In summary
+mode each group carries its member count, expense total (archived expenses
+included) and the caller's net balance inside the group, all computed by
+correlated subqueries in the same statement as the page itself, so a page
+costs one query whatever the group sizes. Full member detail is left to ``groups/<pk>/``.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Group, Expense, ExpenseSplit, ArchivedExpense
+
+Membership = Group.members.through
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def caller_id(request):
+    """The authenticated user's id, else the ``user_id`` query parameter, else ``None``."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.id
+    value = request.GET.get('user_id', '')
+    return int(value) if value.isdigit() else None
+
+
+def member_groups(user_id):
+    return Group.objects.filter(members=user_id)
+
+
+def _per_group(queryset, total):
+    # One aggregated value per outer group; ``.values('group_key')`` keeps the
+    # GROUP BY to the correlated column
+    return Subquery(queryset.values('group_key').annotate(total=total).values('total'))
+
+
+def with_summary(queryset, user_id):
+    """Annotate ``member_count``, ``expense_total`` and the caller's ``net_balance``."""
+    zero = Value(Decimal('0.00'), output_field=MONEY)
+    members = Membership.objects.filter(group_id=OuterRef('pk')).annotate(group_key=F('group_id'))
+    expenses = Expense.objects.filter(group_id=OuterRef('pk')).annotate(group_key=F('group_id'))
+    archived = ArchivedExpense.objects.filter(group_id=OuterRef('pk')).annotate(group_key=F('group_id'))
+    # Unsettled debts between the caller and anyone else: positive when owed to them
+    debts = ExpenseSplit.objects.filter(expense__group_id=OuterRef('pk'), is_settled=False) \
+        .exclude(user=F('expense__payer')) \
+        .filter(Q(user_id=user_id) | Q(expense__payer_id=user_id)) \
+        .annotate(group_key=F('expense__group_id'))
+    return queryset.annotate(
+        member_count=Coalesce(_per_group(members, Count('*')), 0),
+        expense_total=Coalesce(_per_group(expenses, Sum('amount')), zero, output_field=MONEY)
+        + Coalesce(_per_group(archived, Sum('amount')), zero, output_field=MONEY),
+        net_balance=Coalesce(_per_group(debts, Sum(Case(
+            When(expense__payer_id=user_id, then=F('amount_owed')),
+            default=-F('amount_owed'),
+            output_field=MONEY,
+        ))), zero, output_field=MONEY),
+    )
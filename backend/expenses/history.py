@@ -0,0 +1,272 @@
+"""Keyset-paginated activity feed for ``HistoryAPIView``.
+
+A user's history is the union of two event streams: expenses they paid or
+share in, and settlements of splits they owe or are owed. Both streams are
+reduced to ``(kind, event_id, event_date, event_amount)`` rows, merged with
+``UNION ALL`` and ordered/limited in the database. Only the rows of the
+requested page are then loaded in full, so a page costs the same handful
+of queries however long the history is.
+"""
+import asyncio
+import base64
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import CharField, F, Q, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import fastpath
+from .archive import across
+from .models import Expense, ExpenseSplit, ArchivedExpense, ArchivedExpenseSplit
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# ordering query param (without '-') -> merged column
+SORT_FIELDS = {
+    'date': 'event_date',
+    'amount': 'event_amount',
+}
+
+EXPENSE = 'expense'
+PAYMENT = 'payment'
+
+
+def _encode_cursor(value, kind, event_id):
+    raw = json.dumps([str(value) if isinstance(value, Decimal) else value.isoformat(), kind, event_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor, sort_field):
+    try:
+        value, kind, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = Decimal(value) if sort_field == 'event_amount' else datetime.fromisoformat(value)
+        return value, str(kind), int(event_id)
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError('Invalid cursor')
+
+
+def _day_start(value, name):
+    day = parse_date(value) if value else None
+    if value and day is None:
+        raise ValueError(f'Invalid {name}, expected YYYY-MM-DD')
+    return timezone.make_aware(datetime.combine(day, time.min)) if day else None
+
+
+def _expense_rows(user, expense=Expense, split=ExpenseSplit):
+    shared = split.objects.filter(user=user).values('expense_id')
+    return expense.objects.filter(Q(payer=user) | Q(id__in=shared)).annotate(
+        kind=Value(EXPENSE, output_field=CharField()),
+        event_id=F('id'),
+        event_date=F('date'),
+        event_amount=F('amount'),
+        event_group=F('group_id'),
+    )
+
+
+def _payment_rows(user, expense=Expense, split=ExpenseSplit):
+    # Self-splits (payer's own share) are settled on creation and are not payments.
+    # The payer side is a subquery rather than a join so each branch of the OR
+    # can use its own index.
+    paid = expense.objects.filter(payer=user).values('id')
+    return split.objects.filter(
+        Q(user=user) | Q(expense_id__in=paid),
+        is_settled=True,
+        settled_at__isnull=False,
+    ).exclude(user=F('expense__payer')).annotate(
+        kind=Value(PAYMENT, output_field=CharField()),
+        event_id=F('id'),
+        event_date=F('settled_at'),
+        event_amount=F('amount_owed'),
+        event_group=F('expense__group_id'),
+    )
+
+
+def _after(sort_field, descending, cursor):
+    # Rows strictly after the cursor in (sort_field, kind, event_id) order
+    value, kind, event_id = cursor
+    op = 'lt' if descending else 'gt'
+    return (
+        Q(**{f'{sort_field}__{op}': value})
+        | Q(**{sort_field: value, f'kind__{op}': kind})
+        | Q(**{sort_field: value, 'kind': kind, f'event_id__{op}': event_id})
+    )
+
+
+def _page_rows(user_id, ordering, cursor, limit, date_from, date_to, group_id):
+    # The merged, ordered and limited (kind, event_id, ...) rows, plus what
+    # _split_page needs to cut the next cursor
+    descending = ordering.startswith('-')
+    sort_field = SORT_FIELDS.get(ordering.lstrip('-'))
+    if sort_field is None:
+        sort_field, descending = 'event_date', True  # Default newest
+
+    limit = min(max(int(limit), 1), MAX_LIMIT)
+    start = _day_start(date_from, 'from')
+    end = _day_start(date_to, 'to')
+    position = _decode_cursor(cursor, sort_field) if cursor else None
+
+    streams = []
+    # Hot and archived rows (expenses/archive.py) keep distinct ids, so one
+    # cursor orders them all
+    models = [(Expense, ExpenseSplit), (ArchivedExpense, ArchivedExpenseSplit)]
+    for rows in [stream(user_id, *pair) for pair in models for stream in (_expense_rows, _payment_rows)]:
+        if start:
+            rows = rows.filter(event_date__gte=start)
+        if end:
+            rows = rows.filter(event_date__lt=end + timedelta(days=1))
+        if group_id:
+            rows = rows.filter(event_group=group_id)
+        if position:
+            rows = rows.filter(_after(sort_field, descending, position))
+        streams.append(rows.values('kind', 'event_id', 'event_date', 'event_amount'))
+
+    prefix = '-' if descending else ''
+    rows = streams[0].union(*streams[1:], all=True) \
+        .order_by(f'{prefix}{sort_field}', f'{prefix}kind', f'{prefix}event_id')[:limit + 1]
+    return rows, sort_field, limit
+
+
+def _split_page(page, sort_field, limit):
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        last = page[-1]
+        next_cursor = _encode_cursor(last[sort_field], last['kind'], last['event_id'])
+    return page, next_cursor
+
+
+def history_page(user, ordering='-date', cursor=None, limit=DEFAULT_LIMIT,
+                 date_from=None, date_to=None, group_id=None):
+    """Return ``(events, next_cursor)`` for one page of ``user``'s history.
+
+    Raises ``ValueError`` for a malformed cursor, limit or date.
+    """
+    rows, sort_field, limit = _page_rows(user.id, ordering, cursor, limit, date_from, date_to, group_id)
+    page, next_cursor = _split_page(list(rows), sort_field, limit)
+    return _hydrate(user.id, page), next_cursor
+
+
+async def ahistory_page(user_id, ordering='-date', cursor=None, limit=DEFAULT_LIMIT,
+                        date_from=None, date_to=None, group_id=None):
+    """Async ``history_page``: ``(events, next_cursor)``, or ``None`` for an unknown user.
+
+    The user lookup runs alongside the page query, and the expense and
+    payment hydration queries alongside each other.
+    """
+    try:
+        rows, sort_field, limit = _page_rows(user_id, ordering, cursor, limit, date_from, date_to, group_id)
+    except ValueError:
+        # An unknown user is a 404 even when the parameters are bad too
+        if not await User.objects.filter(id=user_id).aexists():
+            return None
+        raise
+    exists, page = await asyncio.gather(
+        User.objects.filter(id=user_id).aexists(),
+        _alist(rows),
+    )
+    if not exists:
+        return None
+    page, next_cursor = _split_page(page, sort_field, limit)
+
+    expense_ids, payment_ids = _event_ids(page)
+    expenses, splits, payments = await asyncio.gather(
+        _alist(_expenses_for(expense_ids)) if expense_ids else _empty(),
+        _alist(_split_rows(expense_ids)) if expense_ids else _empty(),
+        _alist(_payments_for(payment_ids)) if payment_ids else _empty(),
+    )
+    return _events(user_id, page, _by_id(expenses), fastpath.splits_by_expense(splits), _by_id(payments)), next_cursor
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def _empty():
+    return []
+
+
+def _event_ids(page):
+    expense_ids = [row['event_id'] for row in page if row['kind'] == EXPENSE]
+    payment_ids = [row['event_id'] for row in page if row['kind'] == PAYMENT]
+    return expense_ids, payment_ids
+
+
+# Events are built from .values() rows; see expenses/fastpath.py
+EXPENSE_LOOKUPS = ('id', 'description', 'amount', 'date', 'payer_id',
+                   'payer__username', 'payer__first_name', 'payer__last_name', 'group__name')
+PAYMENT_LOOKUPS = ('id', 'amount_owed', 'settled_at', 'user__username', 'expense__description',
+                   'expense__payer_id', 'expense__payer__username', 'expense__group__name')
+
+
+def _expenses_for(ids):
+    return across(lambda expense, split: expense.objects.filter(id__in=ids).values(*EXPENSE_LOOKUPS))
+
+
+def _split_rows(expense_ids):
+    return across(lambda expense, split: split.objects.filter(expense_id__in=expense_ids)
+                  .values(*fastpath.SPLIT_LOOKUPS)).order_by('id')
+
+
+def _payments_for(ids):
+    return across(lambda expense, split: split.objects.filter(id__in=ids).values(*PAYMENT_LOOKUPS))
+
+
+def _by_id(rows):
+    return {row['id']: row for row in rows}
+
+
+def _hydrate(user_id, page):
+    expense_ids, payment_ids = _event_ids(page)
+    expenses = _by_id(_expenses_for(expense_ids)) if expense_ids else {}
+    splits = fastpath.splits_by_expense(_split_rows(expense_ids)) if expense_ids else {}
+    payments = _by_id(_payments_for(payment_ids)) if payment_ids else {}
+    return _events(user_id, page, expenses, splits, payments)
+
+
+def _events(user_id, page, expenses, splits, payments):
+    events = []
+    for row in page:
+        if row['kind'] == EXPENSE:
+            events.append(_expense_event(expenses[row['event_id']], splits.get(row['event_id'], [])))
+        else:
+            events.append(_payment_event(user_id, payments[row['event_id']]))
+    return events
+
+
+def _expense_event(exp, splits):
+    return {
+        'id': f"exp_{exp['id']}",
+        'type': 'expense',
+        'description': exp['description'],
+        'amount': float(exp['amount']),
+        'date': exp['date'],
+        'payer': exp['payer_id'],
+        'payer_name': fastpath.display_name(exp['payer__first_name'], exp['payer__last_name'], exp['payer__username']),
+        'group_name': exp['group__name'],
+        'splits': splits
+    }
+
+
+def _payment_event(user_id, split):
+    is_receiving = split['expense__payer_id'] == user_id
+
+    if is_receiving:
+        description = f"Received from {split['user__username']}"
+    else:
+        description = f"Paid to {split['expense__payer__username']}"
+
+    return {
+        'id': f"settle_{split['id']}",
+        'type': 'payment',
+        'description': f"{description} ({split['expense__description']})",
+        'amount': float(split['amount_owed']),
+        'date': split['settled_at'],
+        'from_user': split['user__username'],
+        'to_user': split['expense__payer__username'],
+        'is_receiving': is_receiving,
+        'group_name': split['expense__group__name']
+    }
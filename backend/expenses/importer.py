@@ -0,0 +1,266 @@
+"""Bulk expense import for the import API and ``manage.py import_expenses``.
+
+Rows are plain dicts with ``description``, ``amount``, ``payer``, ``group``
+and optionally ``participants`` and ``date``. Users may be given by id or
+username. Rows are processed in chunks: every user, group and group
+membership a chunk refers to is fetched with one query each, the rows are
+validated in memory, and the valid ones are written with multi-row
+INSERTs in one transaction per chunk. Split shares, settled flags and
+ledger updates follow ``ExpenseListCreateAPIView.post``. Invalid rows are reported
+by row number and skipped; they never abort the rest of the file.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime, time
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import caching, etags, ledger, rollup, stream
+from .models import Group, Expense, ExpenseSplit
+from .money import parse_amount, split_evenly
+
+CHUNK_SIZE = 1000
+# Rows per INSERT statement, within the backend's own parameter limit
+MAX_BATCH_SIZE = 500
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+
+def read_csv(stream):
+    """Yield row dicts from a CSV text stream."""
+    return csv.DictReader(stream)
+
+
+def read_json(data):
+    """Accept a list of rows or ``{"expenses": [...]}``; raise ``ValueError`` otherwise."""
+    if isinstance(data, (bytes, str)):
+        data = json.loads(data)
+    if isinstance(data, dict):
+        data = data.get('expenses')
+    if not isinstance(data, list):
+        raise ValueError('Expected a list of expenses or {"expenses": [...]}')
+    return data
+
+
+def read_upload(upload):
+    """Rows from an uploaded ``.csv`` or ``.json`` file."""
+    if upload.name.lower().endswith('.json'):
+        return read_json(upload.read())
+    return read_csv(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+
+
+def _participants(row):
+    # A list, or a ";", "," or space separated string (CSV cells)
+    value = row.get('participants') or []
+    if isinstance(value, str):
+        value = re.split(r'[;,\s]+', value)
+    if not isinstance(value, list):
+        raise ValueError('Participants must be a list or a separated string')
+    return [item for item in value if str(item).strip()]
+
+
+def _user_key(value):
+    value = str(value).strip()
+    return int(value) if value.isdigit() else value
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    value = str(value).strip()
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value!r}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _lookups(rows):
+    user_keys, group_ids = set(), set()
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        try:
+            values = [row.get('payer'), *_participants(row)]
+        except ValueError:
+            # _validate reports it against the row
+            continue
+        for value in values:
+            if value not in (None, ''):
+                user_keys.add(_user_key(value))
+        if str(row.get('group', '')).strip().isdigit():
+            group_ids.add(int(row['group']))
+
+    ids = [key for key in user_keys if isinstance(key, int)]
+    names = [key for key in user_keys if isinstance(key, str)]
+    users = {}
+    for user_id, username in User.objects.filter(Q(id__in=ids) | Q(username__in=names)).values_list('id', 'username'):
+        users[user_id] = user_id
+        users[username] = user_id
+
+    groups = set(Group.objects.filter(id__in=group_ids).values_list('id', flat=True))
+    members = {}
+    for group_id, user_id in Group.members.through.objects.filter(group_id__in=groups) \
+            .order_by('user_id').values_list('group_id', 'user_id'):
+        members.setdefault(group_id, []).append(user_id)
+    return users, groups, members
+
+
+def _validate(row, users, groups, members):
+    """Return ``(unsaved expense, [(user_id, share, settled)])``; raise ``ValueError`` for a bad row."""
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object')
+    if not row.get('amount'):
+        raise ValueError('Amount is required')
+    # Positive and within Expense.amount, which the raw INSERT does not check
+    amount = parse_amount(row['amount'])
+
+    payer_id = users.get(_user_key(row.get('payer', '')))
+    group_key = _user_key(row.get('group', ''))
+    if payer_id is None or group_key not in groups:
+        raise ValueError('Invalid payer or group')
+
+    participant_ids = []
+    for value in _participants(row):
+        user_id = users.get(_user_key(value))
+        if user_id is None:
+            raise ValueError(f'Unknown participant: {value!r}')
+        participant_ids.append(user_id)
+    # Ordered by id so the leftover cents land on the same members as the API
+    participant_ids = sorted(set(participant_ids)) or members.get(group_key) or [payer_id]
+
+    description = str(row.get('description') or '')
+    if len(description) > Expense._meta.get_field('description').max_length:
+        raise ValueError('Description is too long')
+
+    expense = Expense(description=description, amount=amount, payer_id=payer_id, group_id=group_key,
+                      date=_parse_date(row.get('date')) or timezone.now())
+    shares = [
+        (user_id, share, user_id == payer_id)
+        for user_id, share in zip(participant_ids, split_evenly(amount, len(participant_ids)))
+    ]
+    return expense, shares
+
+
+def _insert(model, field_names, rows, returning=False):
+    # Raw multi-row INSERTs skip building and compiling a model instance per
+    # row, which is most of the cost of bulk_create at this volume
+    opts = model._meta
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(opts.get_field(name).column) for name in field_names)
+    batch_size = min(MAX_BATCH_SIZE, connection.ops.bulk_batch_size([opts.get_field(name) for name in field_names], rows))
+    ids = []
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            values = ', '.join(['({})'.format(', '.join(['%s'] * len(field_names)))] * len(batch))
+            sql = f'INSERT INTO {quote(opts.db_table)} ({columns}) VALUES {values}'
+            if returning:
+                sql += f' RETURNING {quote(opts.pk.column)}'
+            cursor.execute(sql, [value for row in batch for value in row])
+            if returning:
+                ids.extend(row[0] for row in cursor.fetchall())
+    return ids
+
+
+def _insert_expenses(expenses):
+    if not connection.features.can_return_rows_from_bulk_insert:
+        dates = [expense.date for expense in expenses]
+        Expense.objects.bulk_create(expenses)
+        # auto_now_add overwrites dates on insert; restore the imported ones
+        for expense, date in zip(expenses, dates):
+            expense.date = date
+        Expense.objects.bulk_update(expenses, ['date'], batch_size=500)
+        return
+
+    ops = connection.ops
+    ids = _insert(Expense, ('description', 'amount', 'payer', 'group', 'date'), [
+        (expense.description, ops.adapt_decimalfield_value(expense.amount), expense.payer_id,
+         expense.group_id, ops.adapt_datetimefield_value(expense.date))
+        for expense in expenses
+    ], returning=True)
+    for expense, pk in zip(expenses, ids):
+        expense.pk = pk
+
+
+def _write(validated):
+    ops = connection.ops
+    with transaction.atomic():
+        expenses = [expense for expense, _ in validated]
+        _insert_expenses(expenses)
+
+        splits = []
+        debts = {}
+        # The rollup from the rows in hand; re-aggregating them in SQL
+        # truncates every date through a Python function on SQLite
+        paid, spent = {}, {}
+        for expense, shares in validated:
+            month = rollup.month_of(expense.date)
+            key = (expense.group_id, expense.payer_id, month)
+            paid[key] = paid.get(key, 0) + expense.amount
+            for user_id, share, settled in shares:
+                splits.append((expense.id, user_id, ops.adapt_decimalfield_value(share), settled))
+                key = (expense.group_id, user_id, month)
+                spent[key] = spent.get(key, 0) + share
+                if not settled:
+                    key = (user_id, expense.payer_id)
+                    debts[key] = debts.get(key, 0) + share
+        _insert(ExpenseSplit, ('expense', 'user', 'amount_owed', 'is_settled'), splits)
+
+        ledger.apply_debts(debts)
+        rollup.apply(paid, spent)
+        # Payers' monthly usage changes even when nobody owes them anything
+        caching.invalidate(expense.payer_id for expense in expenses)
+        etags.bump(expense.group_id for expense in expenses)
+        stream.expenses_created([expense.id for expense in expenses])
+
+
+def import_rows(rows, chunk_size=CHUNK_SIZE):
+    """Validate and insert ``rows`` chunk by chunk. Returns an ``ImportReport``.
+
+    Raises ``ValueError`` if the rows stop decoding as CSV part way; the
+    chunks before that point stay imported.
+    """
+    report = ImportReport()
+    rows = iter(rows)
+    offset = 0
+    while True:
+        try:
+            chunk = list(islice(rows, chunk_size))
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Earlier chunks are already committed; say where reading stopped
+            raise ValueError(f'Unreadable file after row {offset}: {e}') from e
+        if not chunk:
+            return report
+
+        users, groups, members = _lookups(chunk)
+        validated = []
+        for number, row in enumerate(chunk, start=offset + 1):
+            try:
+                validated.append(_validate(row, users, groups, members))
+            except (TypeError, ValueError, ArithmeticError) as e:
+                # ArithmeticError covers decimal.InvalidOperation
+                report.errors.append({'row': number, 'error': str(e)})
+        offset += len(chunk)
+
+        if validated:
+            _write(validated)
+            report.created += len(validated)
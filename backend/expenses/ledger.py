@@ -0,0 +1,87 @@
+"""Incrementally maintained pairwise balances.
+
+Every unsettled split whose debtor is not the payer is a debt of
+``amount_owed`` from ``split.user`` to ``split.expense.payer``. The
+``Balance`` table keeps the running totals of those debts for each
+(user, friend) direction, so balance reads touch O(friends) rows instead
+of every split the user has ever been part of.
+
+Writers call ``apply_splits`` inside the same transaction that creates,
+deletes or settles the splits: with ``sign=1`` for splits that start
+counting and ``sign=-1`` for splits that stop counting.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from . import caching, db, stream
+from .models import Balance, ExpenseSplit
+
+def debts_for(splits):
+    """Aggregate a split queryset into ``{(debtor_id, creditor_id): total}``."""
+    rows = splits.filter(is_settled=False) \
+        .exclude(user=F('expense__payer')) \
+        .values('user_id', 'expense__payer_id') \
+        .annotate(total=Sum('amount_owed')) \
+        .order_by()
+    return {(row['user_id'], row['expense__payer_id']): row['total'] for row in rows}
+
+
+def _deltas(debts, sign):
+    # (user_id, friend_id) -> [you_owe delta, owed_to_you delta]
+    deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for (debtor, creditor), amount in debts.items():
+        if not amount:
+            continue
+        deltas[(debtor, creditor)][0] += sign * amount
+        deltas[(creditor, debtor)][1] += sign * amount
+    return deltas
+
+
+def apply_debts(debts, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) aggregated debts from the ledger."""
+    deltas = _deltas(debts, sign)
+    if not deltas:
+        return
+
+    # Bulk writes (bulk_create, queryset.update) send no model signals
+    caching.invalidate(user_id for user_id, _ in deltas)
+    stream.balances_changed(deltas)
+
+    db.add_totals(Balance, ('user', 'friend'), ('you_owe', 'owed_to_you'), deltas)
+
+
+def apply_splits(splits, sign=1):
+    """Add or remove the unsettled debts in ``splits`` from the ledger.
+
+    Must be called while the splits are still unsettled: before settling or
+    deleting them, after creating them.
+    """
+    apply_debts(debts_for(splits), sign)
+
+
+def rebuild():
+    """Recompute the whole ledger from ``ExpenseSplit``. Returns the row count."""
+    with transaction.atomic():
+        before = {(b['user_id'], b['friend_id']): (b['you_owe'], b['owed_to_you'])
+                  for b in Balance.objects.values('user_id', 'friend_id', 'you_owe', 'owed_to_you')}
+        after = _deltas(debts_for(ExpenseSplit.objects.all()), 1)
+        Balance.objects.all().delete()
+        rows = [
+            Balance(user_id=user_id, friend_id=friend_id, you_owe=you_owe, owed_to_you=owed_to_you)
+            for (user_id, friend_id), (you_owe, owed_to_you) in after.items()
+        ]
+        Balance.objects.bulk_create(rows, batch_size=500)
+
+        # Only the pairs the rebuild actually corrected
+        zero = (Decimal('0'), Decimal('0'))
+        changed = {}
+        for pair in before.keys() | after.keys():
+            old, new = before.get(pair, zero), after.get(pair, zero)
+            if tuple(old) != tuple(new):
+                changed[pair] = [new[0] - old[0], new[1] - old[1]]
+        caching.invalidate(user_id for user_id, _ in changed)
+        stream.balances_changed(changed)
+    return len(rows)
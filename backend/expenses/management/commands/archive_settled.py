@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from expenses import archive
+
+
+class Command(BaseCommand):
+    help = ('Move fully settled expenses and their splits older than a cutoff into the archive tables, '
+            'in batched transactions. Safe to run, stop and rerun while the API is serving traffic.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help='Archive expenses dated, and last settled, more than DAYS days ago')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE, help='Expenses per transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--older-than must be >= 0 and --batch-size >= 1')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+
+        if options['dry_run']:
+            count = archive.candidates(cutoff).count()
+            self.stdout.write(f'{count} expenses would be archived (cutoff {cutoff:%Y-%m-%d %H:%M})')
+            return
+
+        def progress(report):
+            if options['verbosity'] > 1:
+                self.stderr.write(f'Batch {report.batches}: {report.expenses} expenses, {report.splits} splits '
+                                  f'({report.rows_per_second:.0f} rows/s)')
+
+        report = archive.archive_settled(cutoff, options['batch_size'], options['pause'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {report.expenses} expenses and {report.splits} splits in {report.batches} batches, '
+            f'{report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)'
+        ))
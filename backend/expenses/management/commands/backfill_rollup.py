@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from expenses import rollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly (group, user) spending rollup from the expense and archive tables.'
+
+    def handle(self, *args, **options):
+        count = rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} monthly spend rows'))
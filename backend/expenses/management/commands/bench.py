@@ -0,0 +1,106 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import URLPattern, get_resolver
+
+from expenses import benchmark
+
+
+def _url_names(urlconf):
+    return {p.name for p in get_resolver(urlconf).url_patterns if isinstance(p, URLPattern) and p.name}
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every API endpoint against a synthetic dataset in a throwaway test database '
+            'and print p50/p95/p99 latency, query count and response size as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--group-size', type=int, default=10)
+        parser.add_argument('--expenses', type=int, default=5000)
+        parser.add_argument('--fanout', type=int, default=4, help='Participants per expense, payer included')
+        parser.add_argument('--settled-ratio', type=float, default=0.5)
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--only', nargs='+', metavar='SCENARIO', help=f'Subset of: {", ".join(benchmark.SCENARIOS)}')
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='Also compare WSGI and ASGI throughput of the dashboard reads at this concurrency')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per dashboard read in the comparison')
+        parser.add_argument('--provider-latency', type=float, default=0, metavar='SECONDS',
+                            help='Latency of the fake payment provider; with --concurrency, also load-tests order creation')
+        parser.add_argument('--contention', type=int, default=0, metavar='WRITERS',
+                            help='Also run WRITERS expense-creating threads against twice as many reader threads on '
+                                 'a file copy of the dataset, with default and tuned SQLite connections')
+        parser.add_argument('--serialization', type=int, default=0, metavar='ROWS',
+                            help='Also compare serializer and fast-path CPU per 1k rows on up to ROWS rows per payload')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+
+    def handle(self, *args, **options):
+        unknown = set(options['only'] or []) - set(benchmark.SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+        if options['group_size'] > options['users'] or options['fanout'] > options['group_size']:
+            raise CommandError('Need fanout <= group-size <= users')
+
+        dataset_options = {key: options[key] for key in (
+            'users', 'groups', 'group_size', 'expenses', 'fanout', 'settled_ratio', 'orders', 'seed')}
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            dataset = benchmark.build_dataset(**dataset_options)
+            results = benchmark.run(dataset, options['only'], options['iterations'], options['warmup'], options['cold'],
+                                    options['provider_latency'])
+            concurrent = None
+            if options['concurrency']:
+                concurrent = benchmark.run_concurrent(
+                    dataset, [name for name in options['only'] or benchmark.DASHBOARD if name in benchmark.DASHBOARD],
+                    options['concurrency'], options['requests'], options['cold'])
+                if options['provider_latency']:
+                    concurrent['create-order'] = {'wsgi': benchmark.run_order_load(
+                        options['concurrency'], options['requests'], options['provider_latency'])}
+            contention = None
+            if options['contention']:
+                contention = benchmark.run_contention(dataset, options['contention'], 2 * options['contention'],
+                                                      max(options['iterations'], 1))
+            serialization = None
+            if options['serialization']:
+                serialization = benchmark.run_serialization(options['serialization'], max(options['iterations'], 1))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        covered = {url_name for url_name, _ in benchmark.SCENARIOS.values()}
+        report = {
+            'commit': self._commit(),
+            'dataset': dataset_options,
+            'iterations': options['iterations'],
+            'cold': options['cold'],
+            'unbenchmarked_urls': sorted((_url_names('expenses.urls') | _url_names('payments.urls')) - covered),
+            'endpoints': results,
+        }
+        if concurrent is not None:
+            report['concurrency'] = {'concurrency': options['concurrency'], 'endpoints': concurrent}
+        if contention is not None:
+            report['contention'] = contention
+        if serialization is not None:
+            report['serialization'] = serialization
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(f'Wrote {options["output"]}')
+        else:
+            self.stdout.write(output)
+
+    def _commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip() or None
+        except OSError:
+            return None
@@ -0,0 +1,41 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses import importer
+
+
+class Command(BaseCommand):
+    help = ('Import expenses from a CSV or JSON file (columns: description, amount, payer, group, '
+            'participants, date). Invalid rows are reported and skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for CSV on stdin")
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('json' if path.lower().endswith('.json') else 'csv')
+        started = time.perf_counter()
+        try:
+            if path == '-':
+                report = self._import(sys.stdin, fmt, options['chunk_size'])
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as f:
+                    report = self._import(f, fmt, options['chunk_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        rate = report.created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} expenses in {elapsed:.2f}s ({rate:.0f}/s), {len(report.errors)} rows skipped'
+        ))
+
+    def _import(self, f, fmt, chunk_size):
+        rows = importer.read_json(f.read()) if fmt == 'json' else importer.read_csv(f)
+        return importer.import_rows(rows, chunk_size)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from expenses import ledger
+
+
+class Command(BaseCommand):
+    help = 'Recompute the pairwise Balance ledger from ExpenseSplit rows.'
+
+    def handle(self, *args, **options):
+        count = ledger.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} balance rows'))
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_balances(apps, schema_editor):
+    # Same aggregation as `manage.py rebuild_balances`, on historical models.
+    Balance = apps.get_model('expenses', 'Balance')
+    ExpenseSplit = apps.get_model('expenses', 'ExpenseSplit')
+    rows = {}
+    debts = ExpenseSplit.objects.filter(is_settled=False) \
+        .exclude(user=F('expense__payer')) \
+        .values('user_id', 'expense__payer_id') \
+        .annotate(total=Sum('amount_owed')) \
+        .order_by()
+    for debt in debts:
+        debtor, creditor = debt['user_id'], debt['expense__payer_id']
+        rows.setdefault((debtor, creditor), Balance(user_id=debtor, friend_id=creditor)).you_owe = debt['total']
+        rows.setdefault((creditor, debtor), Balance(user_id=creditor, friend_id=debtor)).owed_to_you = debt['total']
+    Balance.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_expensesplit_settled_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Balance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('you_owe', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('owed_to_you', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'friend')},
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0004_balance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='group',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='expenses', to='expenses.group'),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='payer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='paid_expenses', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['payer', 'date'], name='expense_payer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['group', 'date'], name='expense_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expensesplit',
+            index=models.Index(condition=models.Q(('is_settled', False)), fields=['user', 'expense'], name='split_unsettled_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expensesplit',
+            index=models.Index(condition=models.Q(('is_settled', False)), fields=['expense', 'user'], name='split_unsettled_expense_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expensesplit',
+            index=models.Index(condition=models.Q(('settled_at__isnull', False)), fields=['user', 'settled_at'], name='split_settled_at_idx'),
+        ),
+    ]
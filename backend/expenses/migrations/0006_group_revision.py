@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
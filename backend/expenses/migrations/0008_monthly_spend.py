@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:59
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DateField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_spend(apps, schema_editor):
+    # Same aggregation as `manage.py backfill_rollup`, on historical models
+    MonthlySpend = apps.get_model('expenses', 'MonthlySpend')
+    totals = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for expense_model, split_model in (('Expense', 'ExpenseSplit'), ('ArchivedExpense', 'ArchivedExpenseSplit')):
+        paid = apps.get_model('expenses', expense_model).objects.values('group_id', 'payer_id') \
+            .annotate(month=TruncMonth('date', output_field=DateField()), total=Sum('amount')).order_by()
+        for row in paid:
+            totals[(row['group_id'], row['payer_id'], row['month'])][0] += row['total']
+        shares = apps.get_model('expenses', split_model).objects.values('expense__group_id', 'user_id') \
+            .annotate(month=TruncMonth('expense__date', output_field=DateField()), total=Sum('amount_owed')).order_by()
+        for row in shares:
+            totals[(row['expense__group_id'], row['user_id'], row['month'])][1] += row['total']
+    MonthlySpend.objects.bulk_create([
+        MonthlySpend(group_id=group_id, user_id=user_id, month=month, paid=paid_total, share=share_total)
+        for (group_id, user_id, month), (paid_total, share_total) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('share', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('group', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expenses.group')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'month'], name='spend_user_month_idx')],
+                'unique_together': {('group', 'user', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_monthly_spend, migrations.RunPython.noop),
+    ]
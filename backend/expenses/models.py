@@ -5,6 +5,8 @@ class Group(models.Model):
     name = models.CharField(max_length=100)
     members = models.ManyToManyField(User, related_name='expense_groups')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Incremented on any expense, split or membership change; drives ETags
+    revision = models.PositiveBigIntegerField(default=0)
 
     def __str__(self):
         return self.name
@@ -12,10 +14,19 @@ class Group(models.Model):
 class Expense(models.Model):
     description = models.CharField(max_length=200)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    payer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='paid_expenses')
-    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='expenses')
+    # Indexed through the (payer, date) and (group, date) composites below
+    payer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='paid_expenses', db_index=False)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='expenses', db_index=False)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Monthly usage and "expenses I paid" scans
+            models.Index(fields=['payer', 'date'], name='expense_payer_date_idx'),
+            # Group expense lists and history filtered by group
+            models.Index(fields=['group', 'date'], name='expense_group_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.description} - {self.amount}"
 
@@ -26,9 +37,90 @@ class ExpenseSplit(models.Model):
     is_settled = models.BooleanField(default=False)
     settled_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Balance, settle and settle-plan queries only ever look at unsettled rows
+            models.Index(fields=['user', 'expense'], condition=models.Q(is_settled=False),
+                         name='split_unsettled_user_idx'),
+            models.Index(fields=['expense', 'user'], condition=models.Q(is_settled=False),
+                         name='split_unsettled_expense_idx'),
+            # History settlement events
+            models.Index(fields=['user', 'settled_at'], condition=models.Q(settled_at__isnull=False),
+                         name='split_settled_at_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} owes {self.amount_owed} for {self.expense.description}"
 
+# Cold storage for fully settled expenses, filled by `manage.py archive_settled`.
+# Rows keep their original ids, so history event ids and cursors do not change;
+# see expenses/archive.py.
+class ArchivedExpense(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    description = models.CharField(max_length=200)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='archived_expenses', db_index=False)
+    date = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['payer', 'date'], name='archived_payer_date_idx'),
+            models.Index(fields=['group', 'date'], name='archived_group_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.description} - {self.amount} (archived)"
+
+class ArchivedExpenseSplit(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    expense = models.ForeignKey(ArchivedExpense, on_delete=models.CASCADE, related_name='splits')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    amount_owed = models.DecimalField(max_digits=10, decimal_places=2)
+    is_settled = models.BooleanField(default=True)
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # History and exports by user; settlement events by date
+            models.Index(fields=['user', 'settled_at'], name='archived_split_user_idx'),
+        ]
+
+class Balance(models.Model):
+    # Materialized running totals of unsettled debts between two users.
+    # Stored in both directions so a user's balances are a single filter.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balances')
+    friend = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    you_owe = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    owed_to_you = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('user', 'friend')
+
+    def __str__(self):
+        return f"{self.user.username} / {self.friend.username}: {self.owed_to_you - self.you_owe}"
+
+class MonthlySpend(models.Model):
+    # Per (group, user, calendar month in TIME_ZONE) totals, kept by
+    # expenses/rollup.py: what the user paid and their share of the group's
+    # expenses. Archived expenses stay counted.
+    # Indexed through unique_together
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='+', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    month = models.DateField()
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    share = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('group', 'user', 'month')
+        indexes = [
+            # Monthly usage and per-user year over year
+            models.Index(fields=['user', 'month'], name='spend_user_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} in {self.group.name}, {self.month:%b %Y}: paid {self.paid}, share {self.share}"
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     avatar_url = models.CharField(max_length=255, blank=True, null=True)
@@ -0,0 +1,40 @@
+"""Exact money arithmetic for expenses.
+
+Amounts are handled as ``Decimal`` with two places and split in integer
+cents, so the shares of an expense always add up to the expense amount.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+# The largest amount Expense.amount (max_digits=10, decimal_places=2) holds
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+def parse_amount(value):
+    """Parse user input into a positive 2-place ``Decimal`` that fits an expense; raise ``ValueError`` if invalid."""
+    try:
+        amount = Decimal(str(value).strip())
+        if not amount.is_finite():
+            raise ValueError
+        # Raises InvalidOperation past the context precision, e.g. '1e40'
+        amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f'Invalid amount: {value!r}')
+    if amount <= 0:
+        # Also catches what rounds to nothing, e.g. '0.001'
+        raise ValueError('Amount must be positive')
+    if amount > MAX_AMOUNT:
+        raise ValueError(f'Amount must be at most {MAX_AMOUNT}')
+    return amount
+
+
+def split_evenly(amount, count):
+    """Split ``amount`` into ``count`` shares that sum exactly to ``amount``.
+
+    The leftover cents go one each to the first shares, so callers that
+    order participants deterministically (e.g. by id) always hand the extra
+    cent to the same members.
+    """
+    cents = int(amount / CENT)
+    base, remainder = divmod(cents, count)
+    return [(base + (1 if i < remainder else 0)) * CENT for i in range(count)]
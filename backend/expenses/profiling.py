@@ -0,0 +1,192 @@
+"""Per-request profiling: ``Server-Timing`` headers and Prometheus metrics.
+
+``ProfilingMiddleware`` wraps every database cursor for the duration of a
+request (``connection.execute_wrapper``) to count queries and time them,
+times DRF's deferred rendering of the response, and reports the lot as a
+``Server-Timing`` header. The same numbers feed per-route histograms that
+``/api/metrics/`` exposes in the Prometheus text format. Metrics live in
+process memory, so with several workers each one reports its own share.
+
+Requests slower than ``PROFILING_SLOW_REQUEST_MS`` (unset by default) are
+logged to ``expenses.profiling`` with the SQL they ran.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import caching
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, as in the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class Registry:
+    """Thread-safe per-(route, method, status) histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, total, db_time, render_time, queries):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'request_duration_seconds': Histogram(LATENCY_BUCKETS),
+                    'request_db_duration_seconds': Histogram(LATENCY_BUCKETS),
+                    'request_render_duration_seconds': Histogram(LATENCY_BUCKETS),
+                    'request_db_queries': Histogram(QUERY_BUCKETS),
+                }
+            series['request_duration_seconds'].observe(total)
+            series['request_db_duration_seconds'].observe(db_time)
+            series['request_render_duration_seconds'].observe(render_time)
+            series['request_db_queries'].observe(queries)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """The registry in the Prometheus text exposition format."""
+        with self._lock:
+            names = {}
+            for labels, series in sorted(self._series.items()):
+                for name, histogram in series.items():
+                    names.setdefault(name, []).append((labels, histogram))
+
+            lines = []
+            for name, entries in names.items():
+                metric = f'divideit_{name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for (route, method, status), histogram in entries:
+                    label = f'route="{_escape(route)}",method="{method}",status="{status}"'
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{{{label}}} {histogram.count}')
+
+        stats = caching.stats()
+        lines.append('# TYPE divideit_dashboard_cache_hits_total counter')
+        lines.append(f"divideit_dashboard_cache_hits_total {stats['hits']}")
+        lines.append('# TYPE divideit_dashboard_cache_misses_total counter')
+        lines.append(f"divideit_dashboard_cache_misses_total {stats['misses']}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts and times queries, optionally keeping their SQL."""
+
+    def __init__(self, keep_sql):
+        self.count = 0
+        self.duration = 0
+        self.keep_sql = keep_sql
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if self.keep_sql:
+                self.queries.append((elapsed, sql))
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', None)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder(keep_sql=self.slow_ms is not None)
+        started = time.perf_counter()
+        with self._wrap_connections(recorder):
+            response = self.get_response(request)
+        return self._finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(keep_sql=self.slow_ms is not None)
+        started = time.perf_counter()
+        with self._wrap_connections(recorder):
+            response = await self.get_response(request)
+        return self._finish(request, response, recorder, started)
+
+    def _wrap_connections(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def _finish(self, request, response, recorder, started):
+        total = time.perf_counter() - started
+        render_time = getattr(request, '_profiling_render_time', 0)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f'render;dur={render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        registry.observe((route, request.method, response.status_code),
+                         total, recorder.duration, render_time, recorder.count)
+
+        if self.slow_ms is not None and total * 1000 >= self.slow_ms:
+            logger.warning(
+                'Slow request %s %s: %.1f ms, %d queries (%.1f ms)\n%s',
+                request.method, request.get_full_path(), total * 1000, recorder.count, recorder.duration * 1000,
+                '\n'.join(f'  [{elapsed * 1000:.1f} ms] {sql}' for elapsed, sql in recorder.queries),
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time that separately
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._profiling_render_time = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,118 @@
+"""Incrementally maintained monthly spending per (group, user).
+
+``MonthlySpend`` holds, for each group, user and calendar month, what the
+user paid (expenses they are the payer of) and their share (the
+``amount_owed`` of their splits, settled or not). Monthly usage and the
+analytics endpoints read these rows, so they cost O(months) rows however
+many expenses there are.
+
+Creating an expense or a split and deleting an expense update the rollup
+through the signal handlers below. Bulk writes send no signals, so they
+call ``apply_expenses``, ``apply_splits`` or, with totals they already
+hold, ``apply`` themselves, inside the same transaction. Totals are added with one upsert per batch
+(``db.add_totals``), so concurrent writers to a new month both count.
+Archiving moves rows without changing the rollup.
+``rebuild()`` (``manage.py backfill_rollup``) recomputes it from the hot
+and archived tables.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DateField, Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import db
+from .archive import across
+from .models import Expense, ExpenseSplit, MonthlySpend
+
+def month_of(date):
+    """The rollup month of an expense date: the first of its month in the current time zone."""
+    return timezone.localtime(date).date().replace(day=1)
+
+
+def _month(field):
+    # Same boundaries as month_of(), computed by the database
+    return TruncMonth(field, output_field=DateField())
+
+
+def _paid(expenses):
+    rows = expenses.values('group_id', 'payer_id').annotate(month=_month('date'), total=Sum('amount')).order_by()
+    return {(row['group_id'], row['payer_id'], row['month']): row['total'] for row in rows}
+
+
+def _shares(splits):
+    rows = splits.values('expense__group_id', 'user_id') \
+        .annotate(month=_month('expense__date'), total=Sum('amount_owed')).order_by()
+    return {(row['expense__group_id'], row['user_id'], row['month']): row['total'] for row in rows}
+
+
+def _deltas(paid, shares, sign):
+    # (group_id, user_id, month) -> [paid delta, share delta]
+    deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for key, amount in paid.items():
+        deltas[key][0] += sign * amount
+    for key, amount in shares.items():
+        deltas[key][1] += sign * amount
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+
+def apply(paid=None, shares=None, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) ``{(group_id, user_id, month): amount}`` totals."""
+    deltas = _deltas(paid or {}, shares or {}, sign)
+    db.add_totals(MonthlySpend, ('group', 'user', 'month'), ('paid', 'share'), deltas)
+
+
+def apply_expenses(expense_ids, sign=1):
+    """Add or remove whole expenses, payer and splits. Call after inserting, before deleting."""
+    apply(_paid(Expense.objects.filter(id__in=expense_ids)),
+          _shares(ExpenseSplit.objects.filter(expense_id__in=expense_ids)), sign)
+
+
+def apply_splits(splits, sign=1):
+    """Add or remove the shares in a split queryset, e.g. after ``bulk_create``."""
+    apply(shares=_shares(splits), sign=sign)
+
+
+def rebuild():
+    """Recompute ``MonthlySpend`` from the hot and archived tables. Returns the row count."""
+    paid, shares = defaultdict(Decimal), defaultdict(Decimal)
+    rows = across(lambda expense, split: expense.objects.values('group_id', 'payer_id')
+                  .annotate(month=_month('date'), total=Sum('amount')).order_by())
+    for row in rows:
+        paid[(row['group_id'], row['payer_id'], row['month'])] += row['total']
+    rows = across(lambda expense, split: split.objects.values('expense__group_id', 'user_id')
+                  .annotate(month=_month('expense__date'), total=Sum('amount_owed')).order_by())
+    for row in rows:
+        shares[(row['expense__group_id'], row['user_id'], row['month'])] += row['total']
+
+    with transaction.atomic():
+        MonthlySpend.objects.all().delete()
+        rows = [
+            MonthlySpend(group_id=group_id, user_id=user_id, month=month, paid=paid_total, share=share_total)
+            for (group_id, user_id, month), (paid_total, share_total) in _deltas(paid, shares, 1).items()
+        ]
+        MonthlySpend.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+@receiver(post_save, sender=Expense)
+def expense_created(sender, instance, created, **kwargs):
+    if created:
+        apply(paid={(instance.group_id, instance.payer_id, month_of(instance.date)): Decimal(str(instance.amount))})
+
+
+@receiver(post_save, sender=ExpenseSplit)
+def split_created(sender, instance, created, **kwargs):
+    if created:
+        expense = instance.expense
+        apply(shares={(expense.group_id, instance.user_id, month_of(expense.date)): Decimal(str(instance.amount_owed))})
+
+
+@receiver(pre_delete, sender=Expense)
+def expense_deleting(sender, instance, **kwargs):
+    # Splits are only ever deleted along with their expense
+    apply_expenses([instance.pk], sign=-1)
@@ -20,7 +20,18 @@ class GroupSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Group
-        fields = '__all__'
+        # Not revision: it only feeds the ETags
+        fields = ['id', 'members', 'name', 'created_at']
+
+class GroupSummarySerializer(serializers.ModelSerializer):
+    # Annotated by groups.with_summary
+    member_count = serializers.IntegerField(read_only=True)
+    expense_total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    net_balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Group
+        fields = ['id', 'name', 'created_at', 'member_count', 'expense_total', 'net_balance']
 
 class ExpenseSplitSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -0,0 +1,61 @@
+"""Group debt simplification.
+
+Settling pairwise can take O(N^2) transfers in a group of N people. Only
+each member's net position matters, though: pairing the largest debtor
+with the largest creditor until everyone is square clears the group in at
+most N - 1 transfers. Positions are kept in integer cents so the plan
+balances exactly.
+"""
+import heapq
+from collections import defaultdict
+
+from django.db.models import F, Sum
+
+from .models import ExpenseSplit
+
+
+def unsettled_splits(group):
+    """Splits in ``group`` that still count as a debt (not settled, not the payer's own share)."""
+    return ExpenseSplit.objects.filter(expense__group=group, is_settled=False) \
+        .exclude(user=F('expense__payer'))
+
+
+def net_positions(group):
+    """``{user_id: cents}`` for members with a non-zero position; positive means they are owed."""
+    pairs = unsettled_splits(group) \
+        .values('user_id', 'expense__payer_id') \
+        .annotate(total=Sum('amount_owed')) \
+        .order_by()
+
+    net = defaultdict(int)
+    for pair in pairs:
+        cents = int(pair['total'] * 100)
+        net[pair['expense__payer_id']] += cents
+        net[pair['user_id']] -= cents
+    return {user_id: cents for user_id, cents in net.items() if cents}
+
+
+def minimal_transfers(net):
+    """Turn net positions into ``[(from_user_id, to_user_id, cents)]`` transfers.
+
+    Greedy over two max-heaps: O(N log N), and at most N - 1 transfers since
+    every step zeroes at least one member.
+    """
+    # Ties broken by user id so the plan is deterministic
+    creditors = [(-cents, user_id) for user_id, cents in net.items() if cents > 0]
+    debtors = [(cents, user_id) for user_id, cents in net.items() if cents < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, amount))
+
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
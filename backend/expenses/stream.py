@@ -0,0 +1,270 @@
+"""Server-Sent Events push channel for balance and activity changes.
+
+``/api/stream/<user_id>/`` (ASGI only, see ``expenses/async_urls.py``) is a
+``text/event-stream`` of three events:
+
+* ``balance``: ``{"friend_id", "you_owe", "owed_to_you"}``, the change to
+  one pair of the ``Balance`` ledger, sent by ``ledger.apply_debts``.
+* ``activity``: ``{"kind", "event_id", "event_date", "event_amount",
+  "group_id"}``, a new expense or payment in the user's history, or
+  ``{"kind", "event_id", "deleted": true}`` when an expense goes away.
+* ``resync``: the client fell behind and events were dropped; refetch.
+
+Events are published once the writing transaction commits, through an
+in-process ``Hub``: a connection only hears about writes made by the same
+process, so run a single ASGI worker, or treat the stream as a hint and
+keep a slow poll, until a shared broker sits behind ``Hub.publish``.
+
+Every connection buffers at most ``STREAM_MAX_QUEUED_EVENTS`` events and
+``STREAM_MAX_QUEUED_BYTES`` bytes. A client that falls further behind has
+its buffer dropped and gets one ``resync`` instead, so a slow reader costs
+a bounded amount of memory and never slows the writers down. A user may
+hold ``STREAM_MAX_CONNECTIONS_PER_USER`` streams at once. Nothing is
+published or queried while nobody is listening.
+"""
+import asyncio
+import itertools
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import fastpath
+from .models import Expense, ExpenseSplit
+
+RESYNC = b'event: resync\ndata: {}\n\n'
+
+
+class Busy(Exception):
+    """The user already holds the maximum number of streams."""
+
+
+def _frame(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {fastpath.dumps(data)}\n\n'.encode()
+
+
+class Subscription:
+    """One connection's bounded queue of encoded frames, owned by its event loop."""
+
+    def __init__(self, user_id, loop, max_events, max_bytes):
+        self.user_id = user_id
+        self.loop = loop
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._frames = deque()
+        self._bytes = 0
+        self._overflowed = False
+        self._ready = asyncio.Event()
+
+    def offer(self, frame):
+        # Runs on self.loop
+        if self._overflowed:
+            self.dropped += 1
+        elif len(self._frames) >= self.max_events or self._bytes + len(frame) > self.max_bytes:
+            # Too far behind to catch up event by event
+            self.dropped += len(self._frames) + 1
+            self._frames.clear()
+            self._bytes = 0
+            self._overflowed = True
+        else:
+            self._frames.append(frame)
+            self._bytes += len(frame)
+        self._ready.set()
+
+    async def next_frames(self, timeout):
+        """The frames queued since the last call, waiting up to ``timeout`` seconds; ``[]`` on timeout."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        if self._overflowed:
+            self._overflowed = False
+            return [RESYNC]
+        frames = list(self._frames)
+        self._frames.clear()
+        self._bytes = 0
+        return frames
+
+
+class Hub:
+    """Thread-safe user id -> subscriptions registry; publishing never blocks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id):
+        """A new ``Subscription`` on the running event loop; raises ``Busy``."""
+        with self._lock:
+            if len(self._subscriptions[user_id]) >= self.max_connections():
+                raise Busy(user_id)
+            subscription = Subscription(
+                user_id, asyncio.get_running_loop(),
+                getattr(settings, 'STREAM_MAX_QUEUED_EVENTS', 100),
+                getattr(settings, 'STREAM_MAX_QUEUED_BYTES', 64 * 1024),
+            )
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def max_connections(self):
+        return getattr(settings, 'STREAM_MAX_CONNECTIONS_PER_USER', 5)
+
+    def connections(self, user_id):
+        with self._lock:
+            return len(self._subscriptions.get(user_id, ()))
+
+    def listening(self):
+        """Whether anyone at all is subscribed."""
+        return bool(self._subscriptions)
+
+    def listeners(self, user_ids):
+        """The subset of ``user_ids`` with at least one subscription."""
+        with self._lock:
+            return {user_id for user_id in user_ids if user_id in self._subscriptions}
+
+    def publish(self, user_id, event, data):
+        """Queue ``event`` for every subscription of ``user_id``; returns how many."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        if not subscriptions:
+            return 0
+        frame = _frame(next(self._ids), event, data)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, frame)
+            except RuntimeError:
+                # Its event loop has shut down
+                self.unsubscribe(subscription)
+        return len(subscriptions)
+
+
+hub = Hub()
+
+
+async def frames(user_id, heartbeat=None):
+    """The response body of one stream: ``ready``, then events, with keep-alive comments."""
+    heartbeat = heartbeat or getattr(settings, 'STREAM_HEARTBEAT', 15)
+    try:
+        subscription = hub.subscribe(user_id)
+    except Busy:
+        yield b'event: error\ndata: {"error": "Too many streams"}\n\n'
+        return
+    try:
+        yield b'retry: 3000\nevent: ready\ndata: {}\n\n'
+        while True:
+            batch = await subscription.next_frames(heartbeat)
+            # Comments keep proxies from closing an idle connection
+            yield b''.join(batch) if batch else b': keep-alive\n\n'
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def _publish(messages):
+    # After commit: never push a change that may still roll back
+    messages = list(messages)
+    if messages:
+        transaction.on_commit(lambda: [hub.publish(*message) for message in messages])
+
+
+def balances_changed(deltas):
+    """Publish ledger deltas, ``{(user_id, friend_id): [you_owe, owed_to_you]}``."""
+    if not hub.listening():
+        return
+    listeners = hub.listeners({user_id for user_id, _ in deltas})
+    _publish(
+        (user_id, 'balance', {'friend_id': friend_id, 'you_owe': you_owe, 'owed_to_you': owed_to_you})
+        for (user_id, friend_id), (you_owe, owed_to_you) in deltas.items() if user_id in listeners
+    )
+
+
+def _activity(kind, event_id, date, amount, group_id):
+    return {'kind': kind, 'event_id': event_id, 'event_date': date, 'event_amount': amount, 'group_id': group_id}
+
+
+def _expenses_published(expense_ids, payers):
+    if not hub.listening():
+        return
+    rows = ExpenseSplit.objects.filter(expense_id__in=expense_ids) \
+        .values_list('user_id', 'expense_id', 'expense__date', 'expense__amount', 'expense__group_id',
+                     'expense__payer_id')
+    messages = {}
+    for user_id, expense_id, date, amount, group_id, payer_id in rows:
+        for recipient in (user_id, payer_id) if payers else (user_id,):
+            if payers or recipient != payer_id:
+                messages[(recipient, expense_id)] = _activity('expense', expense_id, date, amount, group_id)
+    listeners = hub.listeners({recipient for recipient, _ in messages})
+    _publish((recipient, 'activity', data) for (recipient, _), data in messages.items() if recipient in listeners)
+
+
+def splits_created(expense_ids):
+    """Publish expenses whose splits were bulk created to the participants, in one query."""
+    _expenses_published(expense_ids, payers=False)
+
+
+def expenses_created(expense_ids):
+    """Publish expenses inserted without signals to payers and participants, in one query."""
+    _expenses_published(expense_ids, payers=True)
+
+
+def splits_settled(split_ids):
+    """Publish settled splits as payments to both sides, in one query."""
+    if not hub.listening():
+        return
+    rows = ExpenseSplit.objects.filter(id__in=split_ids, is_settled=True).exclude(user=F('expense__payer')) \
+        .values_list('id', 'user_id', 'expense__payer_id', 'settled_at', 'amount_owed', 'expense__group_id')
+    messages = [
+        (recipient, 'activity', _activity('payment', split_id, settled_at, amount, group_id))
+        for split_id, user_id, payer_id, settled_at, amount, group_id in rows
+        for recipient in (user_id, payer_id)
+    ]
+    listeners = hub.listeners({recipient for recipient, _, _ in messages})
+    _publish(message for message in messages if message[0] in listeners)
+
+
+@receiver(post_save, sender=Expense)
+def expense_saved(sender, instance, created, **kwargs):
+    if created and hub.listening():
+        _publish([(instance.payer_id, 'activity', _activity(
+            'expense', instance.id, instance.date, instance.amount, instance.group_id))])
+
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, **kwargs):
+    if hub.listening():
+        _publish([(instance.payer_id, 'activity', {'kind': 'expense', 'event_id': instance.id, 'deleted': True})])
+
+
+@receiver(post_save, sender=ExpenseSplit)
+def split_saved(sender, instance, created, **kwargs):
+    if not hub.listening():
+        return
+    if created:
+        expense = instance.expense
+        # The payer heard about the expense itself
+        if instance.user_id != expense.payer_id:
+            _publish([(instance.user_id, 'activity', _activity(
+                'expense', expense.id, expense.date, expense.amount, expense.group_id))])
+    elif instance.is_settled and instance.settled_at:
+        splits_settled([instance.pk])
+
+
+@receiver(post_delete, sender=ExpenseSplit)
+def split_deleted(sender, instance, **kwargs):
+    if hub.listening():
+        _publish([(instance.user_id, 'activity',
+                   {'kind': 'expense', 'event_id': instance.expense_id, 'deleted': True})])
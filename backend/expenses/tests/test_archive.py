@@ -0,0 +1,172 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from expenses import archive, ledger, rollup
+from expenses.models import Group, Expense, ExpenseSplit, ArchivedExpense, ArchivedExpenseSplit, Balance
+
+
+def spend(group, payer, debtors, amount, days_ago, settled_days_ago=None):
+    """An expense ``days_ago`` old; the debtors' splits settled ``settled_days_ago``, or unsettled."""
+    expense = Expense.objects.create(description=f'Spent {amount}', amount=amount * (len(debtors) + 1),
+                                     payer=payer, group=group)
+    Expense.objects.filter(pk=expense.pk).update(date=timezone.now() - timedelta(days=days_ago))
+    settled_at = None if settled_days_ago is None else timezone.now() - timedelta(days=settled_days_ago)
+    ExpenseSplit.objects.create(expense=expense, user=payer, amount_owed=amount, is_settled=True)
+    for debtor in debtors:
+        ExpenseSplit.objects.create(expense=expense, user=debtor, amount_owed=amount,
+                                    is_settled=settled_at is not None, settled_at=settled_at)
+    return expense
+
+
+@pytest.fixture
+def world():
+    alice, bob, carol = (User.objects.create(username=name) for name in ('alice', 'bob', 'carol'))
+    group = Group.objects.create(name='Flat')
+    group.members.add(alice, bob, carol)
+    old = [spend(group, alice, [bob, carol], Decimal(10 + i), days_ago=400 + i, settled_days_ago=390)
+           for i in range(5)]
+    old.append(spend(group, bob, [alice], Decimal('7.50'), days_ago=500, settled_days_ago=450))
+    kept = [
+        spend(group, alice, [bob], Decimal(3), days_ago=400),                        # still owed
+        spend(group, carol, [bob], Decimal(4), days_ago=400, settled_days_ago=10),   # settled recently
+        spend(group, bob, [carol], Decimal(5), days_ago=10, settled_days_ago=5),     # recent
+    ]
+    ledger.rebuild()
+    rollup.rebuild()
+    return (alice, bob, carol), group, old, kept
+
+
+def everything(client, user, group):
+    history, cursor = [], None
+    while True:
+        params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+        page = client.get(reverse('history', args=[user.id]), params).json()
+        history += page['results']
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    export = b''.join(client.get(reverse('export-history', args=[user.id]), {'format': 'csv'}).streaming_content)
+    group_export = b''.join(client.get(reverse('export-group', args=[group.id]),
+                                       {'format': 'ndjson'}).streaming_content)
+    summary = client.get(reverse('group-list'), {'user_id': user.id, 'view': 'summary'}).json()['results']
+    return {
+        'history': history,
+        'export': export,
+        'group_export': group_export,
+        'usage': client.get(reverse('monthly-usage', args=[user.id])).json(),
+        'summary': summary,
+        'balance': client.get(reverse('balance', args=[user.id])).json(),
+        'breakdown': client.get(reverse('balance-breakdown', args=[user.id])).json(),
+    }
+
+
+def balances():
+    return {(b.user_id, b.friend_id): (b.you_owe, b.owed_to_you)
+            for b in Balance.objects.exclude(you_owe=0, owed_to_you=0)}
+
+
+@pytest.mark.django_db
+def test_archive_moves_old_settled_expenses_and_reads_stay_the_same(world):
+    (alice, bob, carol), group, old, kept = world
+    client = APIClient()
+    before = {user.id: everything(client, user, group) for user in (alice, bob, carol)}
+    ledger_before = balances()
+
+    report = archive.archive_settled(timezone.now() - timedelta(days=365), batch_size=4)
+
+    assert (report.expenses, report.splits, report.batches) == (6, 17, 2)
+    assert report.rows_per_second > 0
+    assert set(ArchivedExpense.objects.values_list('id', flat=True)) == {e.id for e in old}
+    assert set(Expense.objects.values_list('id', flat=True)) == {e.id for e in kept}
+    assert ArchivedExpenseSplit.objects.count() == 17
+    assert not ExpenseSplit.objects.filter(expense_id__in=[e.id for e in old]).exists()
+
+    # Recompute rather than serve the cached dashboard reads
+    cache.clear()
+    for user in (alice, bob, carol):
+        assert everything(client, user, group) == before[user.id], user.username
+    assert balances() == ledger_before
+    ledger.rebuild()
+    assert balances() == ledger_before
+
+    # Only the hot expenses are listed, and a rerun has nothing left to do
+    listed = client.get(reverse('expense-list'), {'group_id': group.id}).json()
+    assert {row['id'] for row in listed} == {e.id for e in kept}
+    assert archive.archive_settled(timezone.now() - timedelta(days=365)).expenses == 0
+
+
+@pytest.mark.django_db
+def test_archive_changes_the_expense_list_etag(world):
+    (alice, bob, carol), group, old, kept = world
+    client = APIClient()
+    etag = client.get(reverse('expense-list'), {'group_id': group.id})['ETag']
+    archive.archive_settled(timezone.now() - timedelta(days=365))
+    response = client.get(reverse('expense-list'), {'group_id': group.id}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_command_reports_rate_and_supports_dry_run(world):
+    out = StringIO()
+    call_command('archive_settled', '--older-than', '365', '--dry-run', stdout=out)
+    assert out.getvalue().startswith('6 expenses would be archived')
+    assert not ArchivedExpense.objects.exists()
+
+    out = StringIO()
+    call_command('archive_settled', '--older-than', '365', '--batch-size', '2', stdout=out)
+    assert 'Archived 6 expenses and 17 splits in 3 batches' in out.getvalue()
+    assert 'rows/s' in out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_archive_runs_alongside_settling(world):
+    (alice, bob, carol), group, old, kept = world
+    # More old debts, still owed when the job starts
+    owed = [spend(group, carol, [alice], Decimal(2), days_ago=400) for _ in range(30)]
+    ledger.rebuild()
+    errors = []
+
+    def settle():
+        try:
+            APIClient().post(reverse('settle-up'), {'user_id': alice.id, 'friend_ids': [carol.id]}, format='json')
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    def run_archive():
+        try:
+            archive.archive_settled(timezone.now() - timedelta(days=1), batch_size=1)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=settle), threading.Thread(target=run_archive)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    hot = set(Expense.objects.values_list('id', flat=True))
+    cold = set(ArchivedExpense.objects.values_list('id', flat=True))
+    assert not hot & cold
+    assert hot | cold == {e.id for e in old + kept + owed}
+    # Nothing owed was archived, and the splits moved with their expenses
+    assert not ArchivedExpenseSplit.objects.filter(is_settled=False).exists()
+    assert ArchivedExpenseSplit.objects.count() + ExpenseSplit.objects.count() == 17 + 6 + 60
+    settled = balances()
+    ledger.rebuild()
+    assert balances() == settled
@@ -0,0 +1,76 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from expenses import ledger
+from expenses.models import Group, Expense, ExpenseSplit
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def dashboard():
+    alice = User.objects.create(username='alice', email='alice@example.com')
+    bob = User.objects.create(username='bob', email='bob@example.com')
+    carol = User.objects.create(username='carol', email='carol@example.com')
+    group = Group.objects.create(name='Trip')
+    group.members.add(alice, bob, carol)
+    for i, (payer, debtors) in enumerate([(alice, [bob, carol]), (bob, [alice]), (alice, [carol])]):
+        expense = Expense.objects.create(description=f'Item {i}', amount=30, payer=payer, group=group)
+        ExpenseSplit.objects.create(expense=expense, user=payer, amount_owed=10, is_settled=True)
+        for debtor in debtors:
+            ExpenseSplit.objects.create(expense=expense, user=debtor, amount_owed=10,
+                                        is_settled=i == 1, settled_at=timezone.now() if i == 1 else None)
+    ledger.rebuild()
+    return alice, bob, carol
+
+
+def dashboard_requests(user_id):
+    return [
+        (reverse('balance', args=[user_id]), {}),
+        (reverse('balance-breakdown', args=[user_id]), {}),
+        (reverse('monthly-usage', args=[user_id]), {}),
+        (reverse('history', args=[user_id]), {}),
+        (reverse('history', args=[user_id]), {'ordering': 'amount', 'limit': 2}),
+        (reverse('history', args=[user_id]), {'limit': 'lots'}),
+    ]
+
+
+def fetch_async(requests, headers=None):
+    client = AsyncClient()
+
+    async def fetch():
+        return [await client.get(url, params, headers=headers) for url, params in requests]
+
+    return async_to_sync(fetch)()
+
+
+@pytest.mark.django_db
+def test_async_views_match_the_drf_views(dashboard, settings):
+    alice, bob, carol = dashboard
+    requests = dashboard_requests(alice.id) + dashboard_requests(bob.id) + dashboard_requests(999)
+    client = APIClient()
+    expected = [client.get(url, params) for url, params in requests]
+
+    settings.ROOT_URLCONF = 'config.asgi_urls'
+    actual = fetch_async(requests)
+
+    for (url, params), want, got in zip(requests, expected, actual):
+        assert got.resolver_match.func.__module__ == 'expenses.async_views', url
+        assert got.status_code == want.status_code, (url, params)
+        assert json.loads(got.content) == json.loads(want.content), (url, params)
+
+
+@pytest.mark.django_db
+def test_async_history_answers_304(dashboard, settings):
+    alice, *_ = dashboard
+    settings.ROOT_URLCONF = 'config.asgi_urls'
+    url = reverse('history', args=[alice.id])
+
+    first, = fetch_async([(url, {})])
+    again, = fetch_async([(url, {})], headers={'If-None-Match': first['ETag']})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
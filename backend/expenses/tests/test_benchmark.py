@@ -0,0 +1,51 @@
+import pytest
+from expenses import benchmark
+
+
+@pytest.mark.django_db
+def test_every_scenario_succeeds_on_a_small_dataset():
+    dataset = benchmark.build_dataset(users=12, groups=3, group_size=5, expenses=40, fanout=3, orders=5)
+    results = benchmark.run(dataset, iterations=2, warmup=1)
+
+    assert set(results) == set(benchmark.SCENARIOS)
+    for name, summary in results.items():
+        assert all(200 <= code < 300 for code in summary['status']), (name, summary['status'])
+        assert summary['samples'] == 2
+        assert summary['p50_ms'] <= summary['p95_ms'] <= summary['p99_ms']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_comparison_serves_both_interfaces():
+    dataset = benchmark.build_dataset(users=8, groups=2, group_size=4, expenses=20, fanout=3, orders=0)
+    results = benchmark.run_concurrent(dataset, concurrency=4, requests=8)
+
+    assert set(results) == set(benchmark.DASHBOARD)
+    for name, interfaces in results.items():
+        for interface in ('wsgi', 'asgi'):
+            assert interfaces[interface]['status'] == [200], (name, interface)
+            assert interfaces[interface]['requests'] == 8
+
+
+@pytest.mark.django_db
+def test_serialization_comparison_covers_every_payload():
+    benchmark.build_dataset(users=8, groups=2, group_size=4, expenses=20, fanout=3, orders=0)
+    results = benchmark.run_serialization(rows=50, repeat=1)
+
+    assert set(results) == set(benchmark.SERIALIZATION)
+    for name, summary in results.items():
+        assert 0 < summary['rows'] <= 50
+        for label in ('serializer', 'fastpath'):
+            assert summary[label]['total_ms'] >= 0, (name, label)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_contention_runs_writers_and_readers_per_connection_setup():
+    dataset = benchmark.build_dataset(users=8, groups=2, group_size=4, expenses=20, fanout=3, orders=0)
+    results = benchmark.run_contention(dataset, writers=2, readers=2, requests=4)
+
+    assert set(results) == set(benchmark.CONNECTION_SETUPS)
+    for setup, roles in results.items():
+        assert roles['writes']['status'] == [201] and roles['reads']['status'] == [200], setup
+        assert roles['writes']['requests'] == roles['reads']['requests'] == 8
+    # The runs wrote to their own copies
+    assert not dataset.group.expenses.filter(description__startswith='Contention').exists()
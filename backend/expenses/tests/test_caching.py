@@ -0,0 +1,64 @@
+import pytest
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses import caching
+from expenses.models import Group
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def people():
+    alice, bob, carol = (User.objects.create(username=name) for name in ('alice', 'bob', 'carol'))
+    group = Group.objects.create(name='Flat')
+    group.members.add(alice, bob)
+    return alice, bob, carol, group
+
+
+def add_expense(client, payer, group, amount='50'):
+    client.post(reverse('expense-list'), {
+        'description': 'Groceries', 'amount': amount, 'payer': payer.id, 'group': group.id
+    }, format='json')
+
+
+def dashboard(client, user):
+    return [client.get(reverse(name, args=[user.id])).data
+            for name in ('monthly-usage', 'balance', 'balance-breakdown')]
+
+
+@pytest.mark.django_db
+def test_repeat_reads_hit_and_writes_invalidate_affected_users(people, django_assert_num_queries):
+    alice, bob, carol, group = people
+    client = APIClient()
+    add_expense(client, alice, group)
+
+    first = dashboard(client, bob)
+    dashboard(client, carol)
+    with django_assert_num_queries(0):
+        assert dashboard(client, bob) == first
+    assert caching.stats() == {'hits': 3, 'misses': 6}
+
+    carol_version = caching.user_version(carol.id)
+    add_expense(client, alice, group, amount='30')
+    assert caching.user_version(carol.id) == carol_version
+
+    balance = client.get(reverse('balance', args=[bob.id])).data
+    assert balance['you_owe'] == 40
+    client.post(reverse('settle-up'), {'user_id': bob.id, 'friend_id': alice.id}, format='json')
+    assert client.get(reverse('balance', args=[bob.id])).data['you_owe'] == 0
+    assert client.get(reverse('balance-breakdown', args=[alice.id])).data == []
+
+
+@pytest.mark.django_db
+def test_file_based_backend(people, settings, tmp_path):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'dashboard': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)},
+    }
+    settings.DASHBOARD_CACHE_ALIAS = 'dashboard'
+    alice, bob, _, group = people
+    client = APIClient()
+    add_expense(client, alice, group)
+
+    first = dashboard(client, bob)
+    assert dashboard(client, bob) == first
+    assert caching.stats() == {'hits': 3, 'misses': 3}
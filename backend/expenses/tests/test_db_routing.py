@@ -0,0 +1,139 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from expenses import db
+from expenses.models import Group, Expense
+
+
+@pytest.mark.django_db
+def test_sqlite_connections_are_tuned():
+    with connection.cursor() as cursor:
+        pragmas = {}
+        for name in ('journal_mode', 'synchronous', 'mmap_size', 'busy_timeout'):
+            cursor.execute(f'PRAGMA {name}')
+            pragmas[name] = cursor.fetchone()[0]
+    assert pragmas == {'journal_mode': 'wal', 'synchronous': 1, 'mmap_size': 256 * 1024 * 1024, 'busy_timeout': 10000}
+
+
+@pytest.mark.parametrize('entry_point, max_age', [('wsgi', '60'), ('asgi', '0')])
+def test_connection_lifetime_follows_the_entry_point(entry_point, max_age, tmp_path):
+    # A fresh interpreter, as each server imports its entry point before settings
+    env = {key: value for key, value in os.environ.items() if not key.startswith('DJANGO_')}
+    env.update(DJANGO_SETTINGS_MODULE='config.settings', DJANGO_REPLICA_DB=str(tmp_path / 'replica.sqlite3'))
+    script = (f'import config.{entry_point}; from django.conf import settings; '
+              "print(settings.DATABASES['default']['CONN_MAX_AGE'], settings.DATABASES['replica']['CONN_MAX_AGE'])")
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-c', script], cwd=django_settings.BASE_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == [max_age, max_age]
+
+
+def test_router_sends_only_marked_reads_outside_transactions_to_the_replica(settings):
+    router = db.ReplicaRouter()
+    assert router.db_for_read(User) is None
+    with db.reading_replica():
+        # Not configured
+        assert router.db_for_read(User) is None
+        settings.DATABASE_REPLICA_ALIAS = 'replica'
+        assert router.db_for_read(User) == 'replica'
+        assert router.db_for_write(User) == 'default'
+    assert router.db_for_read(User) is None
+    assert router.allow_migrate('replica', 'expenses') is False
+    assert router.allow_migrate('default', 'expenses') is None
+
+
+@pytest.mark.django_db
+def test_reads_inside_a_transaction_stay_on_default(settings):
+    settings.DATABASE_REPLICA_ALIAS = 'replica'
+    with db.reading_replica(), transaction.atomic():
+        assert db.ReplicaRouter().db_for_read(User) is None
+
+
+@pytest.fixture(scope='module', autouse=True)
+def replica_alias(django_db_setup):
+    # A second connection to the test database stands in for a replica; it
+    # has to exist before the test database is set up for a test using it
+    connections.settings['replica'] = {**connections['default'].settings_dict}
+    yield
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICA_ALIAS = 'replica'
+    return connections['replica']
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+def test_read_views_query_the_replica_and_writes_stay_on_default(replica, settings):
+    alice = User.objects.create(username='alice')
+    group = Group.objects.create(name='Flat')
+    group.members.add(alice)
+    client = APIClient()
+
+    reads = [
+        reverse('history', args=[alice.id]),
+        reverse('group-list') + f'?user_id={alice.id}',
+        reverse('expense-list') + f'?group_id={group.id}',
+        reverse('group-monthly', args=[group.id]),
+        reverse('order-summary'),
+    ]
+    for path in reads:
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(replica) as secondary:
+            assert client.get(path).status_code == 200
+        assert len(primary) == 0 and len(secondary) > 0, path
+
+    # Cached under the user's data version, so computed from what was just written
+    cached = [
+        reverse('balance', args=[alice.id]),
+        reverse('balance-breakdown', args=[alice.id]),
+        reverse('monthly-usage', args=[alice.id]),
+    ]
+    for path in cached:
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(replica) as secondary:
+            assert client.get(path).status_code == 200
+        assert len(primary) > 0 and len(secondary) == 0, path
+
+    with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(replica) as secondary:
+        response = client.post(reverse('expense-list'), {
+            'description': 'Rent', 'amount': '10.00', 'payer': alice.id, 'group': group.id}, format='json')
+    assert response.status_code == 201
+    assert len(primary) > 0 and len(secondary) == 0
+    assert Expense.objects.using('replica').count() == 1
+
+    settings.ROOT_URLCONF = 'config.asgi_urls'
+    cache.clear()
+
+    async def async_read(name):
+        return (await AsyncClient().get(reverse(name, args=[alice.id]))).status_code
+
+    with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(replica) as secondary:
+        assert async_to_sync(async_read)('history') == 200
+    assert len(primary) == 0 and len(secondary) > 0
+    with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(replica) as secondary:
+        assert async_to_sync(async_read)('balance') == 200
+    assert len(primary) > 0 and len(secondary) == 0
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+def test_replica_connections_are_left_untuned(replica):
+    fresh = connections.create_connection('replica')
+    try:
+        with fresh.cursor() as cursor:
+            cursor.execute('PRAGMA mmap_size')
+            assert cursor.fetchone()[0] == 0
+    finally:
+        fresh.close()
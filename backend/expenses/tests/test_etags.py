@@ -0,0 +1,81 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from expenses.models import Group, Expense, ExpenseSplit
+from rest_framework.test import APIClient
+
+
+def revalidate(client, url, params=None):
+    first = client.get(url, params)
+    assert first.status_code == 200
+    return client.get(url, params, HTTP_IF_NONE_MATCH=first['ETag'])
+
+
+@pytest.mark.django_db
+def test_unchanged_resources_answer_304_until_a_write(django_assert_max_num_queries):
+    alice = User.objects.create(username='alice')
+    bob = User.objects.create(username='bob')
+    group = Group.objects.create(name='Flat')
+    group.members.add(alice)
+    client = APIClient()
+
+    urls = [
+        (reverse('group-list'), {'user_id': alice.id}),
+        (reverse('group-detail', args=[group.id]), None),
+        (reverse('expense-list'), {'group_id': group.id}),
+        (reverse('history', args=[alice.id]), None),
+    ]
+    etags = {}
+    for url, params in urls:
+        etags[url] = client.get(url, params)['ETag']
+        with django_assert_max_num_queries(1):
+            response = client.get(url, params, HTTP_IF_NONE_MATCH=etags[url])
+        assert response.status_code == 304
+
+    # Membership, expense and settlement changes all move the ETag
+    for write in (
+        lambda: client.post(reverse('add-member', args=[group.id]), {'email': 'bob@example.com'}, format='json'),
+        lambda: client.post(reverse('expense-list'), {
+            'description': 'Rent', 'amount': '100', 'payer': alice.id, 'group': group.id
+        }, format='json'),
+        lambda: client.post(reverse('settle-up'), {'user_id': alice.id, 'friend_id': group.members.exclude(id=alice.id).get().id}, format='json'),
+    ):
+        write()
+        for url, params in urls:
+            response = client.get(url, params, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == 200, url
+            etags[url] = response['ETag']
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_query_string():
+    alice = User.objects.create(username='alice')
+    client = APIClient()
+    url = reverse('history', args=[alice.id])
+    newest = client.get(url, {'ordering': '-date'})['ETag']
+    assert client.get(url, {'ordering': 'date'}, HTTP_IF_NONE_MATCH=newest).status_code == 200
+    assert revalidate(client, url, {'ordering': 'date'}).status_code == 304
+
+
+@pytest.mark.django_db
+def test_history_etag_follows_groups_the_user_is_not_a_member_of():
+    alice = User.objects.create(username='alice')
+    bob = User.objects.create(username='bob')
+    theirs = Group.objects.create(name='Not mine')
+    theirs.members.add(bob)
+    client = APIClient()
+    url = reverse('history', args=[alice.id])
+
+    etag = client.get(url)['ETag']
+    expense = Expense.objects.create(description='Lunch', amount=20, payer=bob, group=theirs)
+    split = ExpenseSplit.objects.create(expense=expense, user=alice, amount_owed=10)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert [event['id'] for event in response.data['results']] == [f'exp_{expense.id}']
+
+    # Later changes to that group move it too
+    etag = response['ETag']
+    split.is_settled, split.settled_at = True, timezone.now()
+    split.save()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
@@ -0,0 +1,82 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses.models import Group, Expense, ExpenseSplit
+from expenses.money import MAX_AMOUNT, parse_amount, split_evenly
+from rest_framework.test import APIClient
+
+
+def test_split_evenly_is_exact():
+    shares = split_evenly(Decimal('100.00'), 3)
+    assert shares == [Decimal('33.34'), Decimal('33.33'), Decimal('33.33')]
+    assert sum(split_evenly(Decimal('0.05'), 7)) == Decimal('0.05')
+
+
+@pytest.mark.parametrize('value', ['abc', 'NaN', 'Infinity', '1e40', '123456789012', '100000000', '0', '-5',
+                                   '0.004', '1e-9', None, ''])
+def test_parse_amount_rejects_what_an_expense_cannot_hold(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+
+def test_parse_amount_rounds_to_cents_within_the_field():
+    assert parse_amount(' 12.345 ') == Decimal('12.35')
+    assert parse_amount('0.005') == Decimal('0.01')
+    assert parse_amount('99999999.99') == MAX_AMOUNT
+    field = Expense._meta.get_field('amount')
+    assert len(MAX_AMOUNT.as_tuple().digits) == field.max_digits
+    assert -MAX_AMOUNT.as_tuple().exponent == field.decimal_places
+
+
+def make_group(size):
+    users = [User.objects.create(username=f"g{size}_user{i}") for i in range(size)]
+    group = Group.objects.create(name=f'Group of {size}')
+    group.members.add(*users)
+    return group, users
+
+
+def create_expense(client, group, payer, amount):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(reverse('expense-list'), {
+            'description': 'Rent', 'amount': amount, 'payer': payer.id, 'group': group.id
+        }, format='json')
+    assert response.status_code == 201
+    inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+    return response, len(inserts)
+
+
+@pytest.mark.django_db
+def test_create_expense_distributes_leftover_cents():
+    group, users = make_group(3)
+    response, _ = create_expense(APIClient(), group, users[1], '100')
+
+    amounts = {split['user']['id']: Decimal(split['amount_owed']) for split in response.data['splits']}
+    assert sum(amounts.values()) == Decimal('100.00')
+    # Lowest user id gets the extra cent
+    assert amounts[users[0].id] == Decimal('33.34')
+    assert ExpenseSplit.objects.get(user=users[1]).is_settled is True
+
+
+@pytest.mark.django_db
+def test_create_expense_inserts_do_not_grow_with_group_size():
+    client = APIClient()
+    small_group, small_users = make_group(3)
+    large_group, large_users = make_group(50)
+
+    _, small_inserts = create_expense(client, small_group, small_users[0], '10')
+    _, large_inserts = create_expense(client, large_group, large_users[0], '10')
+    assert small_inserts == large_inserts
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('amount', ['1e40', '12345678901', '1e-9'])
+def test_create_expense_rejects_unstorable_amounts(amount):
+    group, users = make_group(2)
+    response = APIClient().post(reverse('expense-list'), {
+        'description': 'Rent', 'amount': amount, 'payer': users[0].id, 'group': group.id
+    }, format='json')
+    assert response.status_code == 400
+    assert not Expense.objects.exists()
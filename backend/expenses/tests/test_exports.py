@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import warnings
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses.models import Group, Expense, ExpenseSplit
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def ledger_data():
+    alice = User.objects.create(username='alice')
+    bob = User.objects.create(username='bob')
+    carol = User.objects.create(username='carol')
+    trip = Group.objects.create(name='Trip')
+    flat = Group.objects.create(name='Flat')
+
+    dinner = Expense.objects.create(description='Dinner', amount=30, payer=alice, group=trip)
+    ExpenseSplit.objects.bulk_create([
+        ExpenseSplit(expense=dinner, user=alice, amount_owed=10, is_settled=True),
+        ExpenseSplit(expense=dinner, user=bob, amount_owed=10),
+        ExpenseSplit(expense=dinner, user=carol, amount_owed=10),
+    ])
+    rent = Expense.objects.create(description='Rent, March', amount=20, payer=bob, group=flat)
+    ExpenseSplit.objects.bulk_create([
+        ExpenseSplit(expense=rent, user=bob, amount_owed=10, is_settled=True),
+        ExpenseSplit(expense=rent, user=carol, amount_owed=10),
+    ])
+    return alice, bob, carol, trip, flat
+
+
+def body(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_history_export_streams_csv_of_every_split_the_user_is_part_of(ledger_data):
+    alice, bob, carol, trip, flat = ledger_data
+
+    response = APIClient().get(reverse('export-history', args=[bob.id]))
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    assert 'history-%d.csv' % bob.id in response['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(body(response))))
+    # Bob's share of dinner, plus every split of the rent he paid
+    assert [(r['description'], r['user_username']) for r in rows] == [
+        ('Dinner', 'bob'), ('Rent, March', 'bob'), ('Rent, March', 'carol'),
+    ]
+    assert rows[0]['payer_username'] == 'alice'
+    assert rows[0]['group_name'] == 'Trip'
+    assert rows[0]['amount_owed'] == '10.00'
+    assert rows[0]['is_settled'] == 'False'
+
+
+@pytest.mark.django_db
+def test_group_export_streams_ndjson(ledger_data):
+    alice, bob, carol, trip, flat = ledger_data
+
+    response = APIClient().get(reverse('export-group', args=[trip.id]) + '?format=ndjson')
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson; charset=utf-8'
+    rows = [json.loads(line) for line in body(response).splitlines()]
+    assert [r['user_username'] for r in rows] == ['alice', 'bob', 'carol']
+    assert {r['group_id'] for r in rows} == {trip.id}
+    assert rows[1]['expense_amount'] == '30.00'
+
+
+@pytest.mark.django_db
+def test_history_export_filters_by_group(ledger_data):
+    alice, bob, carol, trip, flat = ledger_data
+
+    response = APIClient().get(reverse('export-history', args=[carol.id]) + f'?group_id={flat.id}&format=ndjson')
+
+    rows = [json.loads(line) for line in body(response).splitlines()]
+    assert [r['description'] for r in rows] == ['Rent, March']
+
+
+@pytest.mark.django_db
+def test_csv_header_is_sent_before_the_query_runs(ledger_data):
+    alice, *_ = ledger_data
+    response = APIClient().get(reverse('export-history', args=[alice.id]))
+    chunks = iter(response.streaming_content)
+
+    with CaptureQueriesContext(connection) as captured:
+        header = next(chunks).decode()
+    assert header.startswith('split_id,expense_id,date')
+    assert len(captured) == 0
+
+    with CaptureQueriesContext(connection) as captured:
+        list(chunks)
+    assert len(captured) == 1
+
+
+@pytest.mark.django_db
+def test_asgi_export_streams_block_by_block(ledger_data, monkeypatch):
+    alice, *_ = ledger_data
+    expected = body(APIClient().get(reverse('export-history', args=[alice.id])))
+    # One block per row
+    monkeypatch.setattr('expenses.exports.FLUSH_SIZE', 1)
+
+    async def export(captured):
+        response = await AsyncClient().get(reverse('export-history', args=[alice.id]))
+        parts = aiter(response)
+        queries = len(captured)
+        header = await anext(parts)
+        return header, len(captured) - queries, [part async for part in parts]
+
+    with warnings.catch_warnings(), CaptureQueriesContext(connection) as captured:
+        # Django warns when it has to read a sync iterator into a list first
+        warnings.filterwarnings('error', 'StreamingHttpResponse must consume')
+        header, queries, rest = async_to_sync(export)(captured)
+
+    assert header.startswith(b'split_id,expense_id,date')
+    assert queries == 0
+    assert len(rest) > 2
+    assert (header + b''.join(rest)).decode() == expected
+
+
+@pytest.mark.django_db
+def test_exports_404_and_400():
+    client = APIClient()
+    assert client.get(reverse('export-history', args=[999])).status_code == 404
+    assert client.get(reverse('export-group', args=[999])).status_code == 404
+    user = User.objects.create(username='dave')
+    assert client.get(reverse('export-history', args=[user.id]) + '?from=nope').status_code == 400
@@ -0,0 +1,105 @@
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import renderers
+from rest_framework.test import APIClient
+
+from expenses import fastpath, ledger
+from expenses.models import Group, Expense, ExpenseSplit, Balance
+from expenses.serializers import ExpenseSerializer, ExpenseSplitSerializer, UserSerializer
+from expenses.views import expense_queryset
+
+
+def drf_json(data):
+    return renderers.JSONRenderer().render(data)
+
+
+@pytest.fixture
+def ledger_data():
+    alice = User.objects.create(username='alice', first_name='Alice', last_name='Ng', email='a@example.com')
+    alice.profile.avatar_url = '/avatars/alice.png'
+    alice.profile.save()
+    bob = User.objects.create(username='bob')
+    # No profile row at all
+    carol = User.objects.bulk_create([User(username='carol', last_name='Ruiz')])[0]
+    group = Group.objects.create(name='Trip ✈')
+    group.members.add(alice, bob, carol)
+
+    for i, (payer, amount) in enumerate([(alice, '90.00'), (bob, '10.01'), (carol, '0.30')]):
+        expense = Expense.objects.create(description=f'Dinner {i} \u2028 ünïcode', amount=Decimal(amount),
+                                         payer=payer, group=group)
+        shares = {alice: Decimal(amount) / 3, bob: Decimal(amount) / 3, carol: Decimal(amount) / 3}
+        ExpenseSplit.objects.bulk_create([
+            ExpenseSplit(expense=expense, user=user, amount_owed=share.quantize(Decimal('0.01')),
+                         is_settled=user == payer)
+            for user, share in shares.items()
+        ])
+    ExpenseSplit.objects.filter(user=bob, expense__payer=alice).update(is_settled=True, settled_at=timezone.now())
+    ledger.rebuild()
+    return alice, bob, carol, group
+
+
+@pytest.mark.django_db
+def test_expense_list_matches_serializer(ledger_data):
+    alice, bob, carol, group = ledger_data
+    response = APIClient().get(reverse('expense-list'), {'group_id': group.id})
+
+    expected = ExpenseSerializer(expense_queryset().filter(group=group), many=True).data
+    assert response.content == drf_json(expected)
+    assert len(response.json()) == 3
+
+
+@pytest.mark.django_db
+def test_breakdown_matches_serializer(ledger_data):
+    alice, bob, carol, group = ledger_data
+    response = APIClient().get(reverse('balance-breakdown', args=[alice.id]))
+
+    expected = [{
+        'friend': UserSerializer(balance.friend).data,
+        'you_owe': float(balance.you_owe),
+        'owed_to_you': float(balance.owed_to_you),
+        'net_balance': float(balance.owed_to_you - balance.you_owe)
+    } for balance in Balance.objects.filter(user=alice).exclude(you_owe=0, owed_to_you=0)]
+    expected.sort(key=lambda x: abs(x['net_balance']), reverse=True)
+    assert response.content == drf_json(expected)
+    assert {row['friend']['username'] for row in response.json()} == {'bob', 'carol'}
+
+
+@pytest.mark.django_db
+def test_history_splits_match_serializer(ledger_data):
+    alice, bob, carol, group = ledger_data
+    events = APIClient().get(reverse('history', args=[bob.id])).json()['results']
+
+    expenses = [event for event in events if event['type'] == 'expense']
+    assert len(expenses) == 3
+    for event in expenses:
+        splits = ExpenseSplit.objects.filter(expense_id=int(event['id'][4:])).select_related('user__profile')
+        assert drf_json(event['splits']) == drf_json(ExpenseSplitSerializer(splits, many=True).data)
+    payment, = [event for event in events if event['type'] == 'payment']
+    assert payment['description'] == 'Paid to alice (Dinner 0 \u2028 ünïcode)'
+
+
+@pytest.mark.parametrize('data', [
+    {'amount': Decimal('12.50'), 'zero': Decimal('0.00'), 'nested': [{'n': 1, 'f': 1.5, 'b': True, 'x': None}]},
+    {'utc': datetime(2026, 3, 1, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+     'ist': datetime(2026, 3, 1, 18, 0, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+     'naive': datetime(2026, 3, 1, 18, 0), 'day': date(2026, 3, 1), 'time': time(9, 15)},
+    {'text': 'ünïcode \u2028 \u2029 "quoted"', 'lazy': gettext_lazy('Lazy'), 'id': uuid.UUID(int=7),
+     'delta': timedelta(hours=1)},
+    [1, 'two', (3, 4)],
+])
+def test_renderer_matches_drf(data):
+    assert fastpath.JSONRenderer().render(data) == drf_json(data)
+
+
+def test_renderer_indents_like_drf():
+    data = {'amount': Decimal('1.00'), 'list': [1, 2]}
+    assert fastpath.JSONRenderer().render(data, 'application/json; indent=2') == \
+        renderers.JSONRenderer().render(data, 'application/json; indent=2')
+    assert fastpath.JSONRenderer().render(None) == b''
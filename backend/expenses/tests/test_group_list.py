@@ -0,0 +1,83 @@
+import pytest
+from decimal import Decimal
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses.models import Group, Expense, ExpenseSplit
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def groups():
+    alice = User.objects.create(username='alice')
+    bob = User.objects.create(username='bob')
+    carol = User.objects.create(username='carol')
+    trip = Group.objects.create(name='Trip')
+    trip.members.add(alice, bob, carol)
+    flat = Group.objects.create(name='Flat')
+    flat.members.add(alice, bob)
+    Group.objects.create(name='Someone else').members.add(carol)
+
+    def expense(group, payer, amount, debtors, settled=()):
+        e = Expense.objects.create(description='Item', amount=amount, payer=payer, group=group)
+        ExpenseSplit.objects.create(expense=e, user=payer, amount_owed=10, is_settled=True)
+        for debtor in debtors:
+            ExpenseSplit.objects.create(expense=e, user=debtor, amount_owed=10, is_settled=debtor in settled)
+
+    expense(trip, alice, 30, [bob, carol])           # bob and carol owe alice 10 each
+    expense(trip, bob, 20, [alice])                  # alice owes bob 10
+    expense(trip, carol, 20, [bob])                  # not alice's business
+    expense(flat, bob, '20.50', [alice], settled=[alice])
+    return alice, bob, carol, trip, flat
+
+
+@pytest.mark.django_db
+def test_list_is_scoped_to_the_callers_groups(groups):
+    alice, bob, carol, trip, flat = groups
+    response = APIClient().get(reverse('group-list'), {'user_id': alice.id})
+
+    assert response.status_code == 200
+    assert [g['name'] for g in response.data['results']] == ['Trip', 'Flat']
+    assert len(response.data['results'][0]['members']) == 3
+    assert set(response.data['results'][0]) == {'id', 'members', 'name', 'created_at'}
+
+
+@pytest.mark.django_db
+def test_list_requires_a_caller():
+    assert APIClient().get(reverse('group-list')).status_code == 400
+
+
+@pytest.mark.django_db
+def test_summary_annotates_counts_totals_and_net_balance_in_one_query(groups, django_assert_num_queries):
+    alice, bob, carol, trip, flat = groups
+    client = APIClient()
+
+    # One query for the ETag revisions, one for the page
+    with django_assert_num_queries(2):
+        response = client.get(reverse('group-list'), {'user_id': alice.id, 'view': 'summary'})
+
+    assert response.data['results'] == [
+        {'id': trip.id, 'name': 'Trip', 'created_at': response.data['results'][0]['created_at'],
+         'member_count': 3, 'expense_total': '70.00', 'net_balance': '10.00'},
+        {'id': flat.id, 'name': 'Flat', 'created_at': response.data['results'][1]['created_at'],
+         'member_count': 2, 'expense_total': '20.50', 'net_balance': '0.00'},
+    ]
+    bob_view = client.get(reverse('group-list'), {'user_id': bob.id, 'view': 'summary'}).data['results']
+    assert [Decimal(g['net_balance']) for g in bob_view] == [Decimal('-10.00'), Decimal('0.00')]
+
+
+@pytest.mark.django_db
+def test_pages_follow_the_cursor():
+    alice = User.objects.create(username='alice')
+    for i in range(5):
+        Group.objects.create(name=f'Group {i}').members.add(alice)
+    client = APIClient()
+
+    names = []
+    response = client.get(reverse('group-list'), {'user_id': alice.id, 'view': 'summary', 'page_size': 2})
+    while True:
+        names += [g['name'] for g in response.data['results']]
+        if not response.data['next']:
+            break
+        response = client.get(response.data['next'])
+
+    assert names == [f'Group {i}' for i in range(5)]
@@ -0,0 +1,90 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from expenses.models import Group, Expense, ExpenseSplit
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def history():
+    alice = User.objects.create(username='alice')
+    bob = User.objects.create(username='bob')
+    group = Group.objects.create(name='Flat')
+    other = Group.objects.create(name='Trip')
+    group.members.add(alice, bob)
+    other.members.add(alice, bob)
+    now = timezone.now()
+    for i in range(25):
+        expense = Expense.objects.create(description=f'Expense {i}', amount=10 + i, payer=bob,
+                                         group=group if i % 2 else other)
+        # auto_now_add ignores passed values; spread events over distinct days
+        Expense.objects.filter(pk=expense.pk).update(date=now - timedelta(days=50 - i))
+        ExpenseSplit.objects.create(expense=expense, user=bob, amount_owed=5, is_settled=True)
+        settled = i < 10
+        ExpenseSplit.objects.create(expense=expense, user=alice, amount_owed=5, is_settled=settled,
+                                    settled_at=now - timedelta(days=20 - i) if settled else None)
+    return alice, group
+
+
+def fetch_all(client, url, **params):
+    events, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        data = client.get(url, query).data
+        events.extend(data['results'])
+        pages += 1
+        cursor = data['next_cursor']
+        if not cursor:
+            return events, pages
+
+
+@pytest.mark.django_db
+def test_history_pages_cover_every_event_in_order(history):
+    alice, _ = history
+    client = APIClient()
+    url = reverse('history', args=[alice.id])
+
+    events, pages = fetch_all(client, url, limit=7)
+    assert pages == 5
+    assert len(events) == 35
+    assert len({e['id'] for e in events}) == 35
+    dates = [e['date'] for e in events]
+    assert dates == sorted(dates, reverse=True)
+
+    events, _ = fetch_all(client, url, limit=4, ordering='amount')
+    amounts = [e['amount'] for e in events]
+    assert len(events) == 35 and amounts == sorted(amounts)
+
+
+@pytest.mark.django_db
+def test_history_filters(history):
+    alice, group = history
+    client = APIClient()
+    url = reverse('history', args=[alice.id])
+
+    events, _ = fetch_all(client, url, group_id=group.id)
+    assert {e['group_name'] for e in events} == {'Flat'}
+
+    since = timezone.localdate() - timedelta(days=15)
+    events, _ = fetch_all(client, url, **{'from': since.isoformat()})
+    assert events and all(timezone.localdate(e['date']) >= since for e in events)
+
+    assert client.get(url, {'cursor': 'garbage'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_history_page_query_count_is_bounded(history):
+    alice, _ = history
+    client = APIClient()
+    url = reverse('history', args=[alice.id])
+
+    # Both pages mix expense and payment events
+    with CaptureQueriesContext(connection) as small:
+        client.get(url, {'limit': 12})
+    with CaptureQueriesContext(connection) as large:
+        client.get(url, {'limit': 35})
+    assert len(small) == len(large)
@@ -0,0 +1,151 @@
+import time
+import pytest
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from expenses import importer, ledger
+from expenses.models import Group, Expense, ExpenseSplit, Balance
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def trip():
+    alice = User.objects.create(username='alice@example.com')
+    bob = User.objects.create(username='bob@example.com')
+    carol = User.objects.create(username='carol@example.com')
+    group = Group.objects.create(name='Trip')
+    group.members.add(alice, bob, carol)
+    return alice, bob, carol, group
+
+
+def balances():
+    return {(b.user_id, b.friend_id): (b.you_owe, b.owed_to_you) for b in Balance.objects.all()}
+
+
+@pytest.mark.django_db
+def test_import_matches_single_create_and_reports_bad_rows(trip):
+    alice, bob, carol, group = trip
+    rows = [
+        {'description': 'Dinner', 'amount': '10.00', 'payer': alice.id, 'group': group.id},
+        {'description': 'Taxi', 'amount': '5', 'payer': 'bob@example.com', 'group': group.id,
+         'participants': [bob.id, carol.id], 'date': '2024-03-01'},
+        {'description': 'No amount', 'payer': alice.id, 'group': group.id},
+        {'description': 'Ghost', 'amount': '3', 'payer': 'nobody', 'group': group.id},
+        {'description': 'Stranger', 'amount': '3', 'payer': alice.id, 'group': group.id, 'participants': 'alice@example.com;zed'},
+    ]
+
+    report = importer.import_rows(rows, chunk_size=2)
+
+    assert report.created == 2
+    assert report.errors == [
+        {'row': 3, 'error': 'Amount is required'},
+        {'row': 4, 'error': 'Invalid payer or group'},
+        {'row': 5, 'error': "Unknown participant: 'zed'"},
+    ]
+    dinner = Expense.objects.get(description='Dinner')
+    assert [(s.user_id, s.amount_owed, s.is_settled) for s in dinner.splits.order_by('user_id')] == [
+        (alice.id, Decimal('3.34'), True), (bob.id, Decimal('3.33'), False), (carol.id, Decimal('3.33'), False),
+    ]
+    taxi = Expense.objects.get(description='Taxi')
+    assert timezone.localdate(taxi.date).isoformat() == '2024-03-01'
+    assert taxi.splits.count() == 2
+
+    # The incrementally applied ledger matches a full rebuild
+    imported = balances()
+    ledger.rebuild()
+    assert balances() == imported
+
+
+@pytest.mark.django_db
+def test_import_reports_amounts_an_expense_cannot_store(trip):
+    alice, bob, carol, group = trip
+    rows = [
+        {'description': 'Huge', 'amount': '1e40', 'payer': alice.id, 'group': group.id},
+        {'description': 'Too long', 'amount': '12345678901', 'payer': alice.id, 'group': group.id},
+        {'description': 'Rounds away', 'amount': '0.001', 'payer': alice.id, 'group': group.id},
+        {'description': 'Largest', 'amount': '99999999.99', 'payer': alice.id, 'group': group.id},
+    ]
+
+    report = importer.import_rows(rows)
+
+    assert report.created == 1
+    assert report.errors == [
+        {'row': 1, 'error': "Invalid amount: '1e40'"},
+        {'row': 2, 'error': 'Amount must be at most 99999999.99'},
+        {'row': 3, 'error': 'Amount must be positive'},
+    ]
+    assert list(Expense.objects.values_list('amount', flat=True)) == [Decimal('99999999.99')]
+
+
+@pytest.mark.django_db
+def test_import_api_accepts_json_and_csv_upload(trip):
+    alice, bob, carol, group = trip
+    client = APIClient()
+
+    response = client.post(reverse('expense-import'), {'expenses': [
+        {'description': 'Lunch', 'amount': '9', 'payer': alice.id, 'group': group.id},
+    ]}, format='json')
+    assert response.status_code == 201
+    assert response.data == {'created': 1, 'failed': 0, 'errors': []}
+
+    csv_file = SimpleUploadedFile('expenses.csv', (
+        'description,amount,payer,group,participants\n'
+        f'Fuel,20,{bob.id},{group.id},{alice.id};{bob.id}\n'
+        f'Broken,abc,{bob.id},{group.id},\n'
+    ).encode())
+    response = client.post(reverse('expense-import'), {'file': csv_file}, format='multipart')
+    assert response.status_code == 201
+    assert response.data['created'] == 1
+    assert response.data['errors'] == [{'row': 2, 'error': "Invalid amount: 'abc'"}]
+
+    response = client.post(reverse('expense-import'), {'expenses': [{'amount': '1'}]}, format='json')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_import_reports_malformed_rows_and_rejects_unreadable_files(trip):
+    alice, bob, carol, group = trip
+    client = APIClient()
+
+    response = client.post(reverse('expense-import'), {'expenses': [
+        {'description': 'Odd', 'amount': '3', 'payer': alice.id, 'group': group.id, 'participants': 5},
+        {'description': 'Nested', 'amount': '3', 'payer': {'id': alice.id}, 'group': [group.id]},
+        {'description': 'Fine', 'amount': '3', 'payer': alice.id, 'group': group.id},
+    ]}, format='json')
+    assert response.status_code == 201
+    assert response.data == {'created': 1, 'failed': 2, 'errors': [
+        {'row': 1, 'error': 'Participants must be a list or a separated string'},
+        {'row': 2, 'error': 'Invalid payer or group'},
+    ]}
+
+    header = 'description,amount,payer,group\n'
+    for name, body in (('latin-1', f'Caf\xe9,3,{alice.id},{group.id}\n'.encode('latin-1')),
+                       ('oversized field', f'{"x" * 200000},3,{alice.id},{group.id}\n'.encode())):
+        upload = SimpleUploadedFile('expenses.csv', header.encode() + body)
+        response = client.post(reverse('expense-import'), {'file': upload}, format='multipart')
+        assert response.status_code == 400, name
+        assert response.data['error'].startswith('Unreadable file after row 0: '), name
+    assert Expense.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_import_command_throughput(trip, tmp_path, capsys):
+    alice, bob, carol, group = trip
+    path = tmp_path / 'expenses.csv'
+    with open(path, 'w') as f:
+        f.write('description,amount,payer,group\n')
+        for i in range(10000):
+            f.write(f'Item {i},{i % 97 + 1}.50,{(alice, bob, carol)[i % 3].id},{group.id}\n')
+
+    started = time.perf_counter()
+    call_command('import_expenses', str(path))
+    elapsed = time.perf_counter() - started
+
+    assert Expense.objects.count() == 10000
+    assert ExpenseSplit.objects.count() == 30000
+    assert 'Imported 10000 expenses' in capsys.readouterr().out
+    # Runs at 10-15k/s here; half the 10k/s target leaves room for slower machines
+    assert 10000 / elapsed > 5000
@@ -0,0 +1,77 @@
+"""EXPLAIN QUERY PLAN checks for the hot ExpenseSplit/Expense access paths.
+
+The tables are seeded with a realistic skew (most splits settled) and
+ANALYZEd so SQLite plans as it would on a live database, then every hot
+query must be answered through an index search, never a table scan.
+"""
+import random
+import pytest
+from django.db import connection
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.contrib.auth.models import User
+from expenses import history, simplify
+from expenses.models import Group, Expense, ExpenseSplit
+
+
+@pytest.fixture
+def seeded():
+    rng = random.Random(1)
+    users = User.objects.bulk_create([User(username=f'user{i}') for i in range(50)])
+    groups = Group.objects.bulk_create([Group(name=f'Group {i}') for i in range(10)])
+    expenses = Expense.objects.bulk_create([
+        Expense(description='Item', amount=10, payer=rng.choice(users), group=rng.choice(groups))
+        for _ in range(2000)
+    ])
+    now = timezone.now()
+    splits = []
+    for expense in expenses:
+        for user in rng.sample(users, 4):
+            settled = rng.random() < 0.9
+            splits.append(ExpenseSplit(expense=expense, user=user, amount_owed='2.50',
+                                       is_settled=settled, settled_at=now if settled else None))
+    ExpenseSplit.objects.bulk_create(splits)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return users, groups
+
+
+def hot_queries(user, friend, group):
+    return {
+        'you_owe': (
+            ExpenseSplit.objects.filter(user=user, is_settled=False).exclude(expense__payer=user),
+            'split_unsettled_user_idx',
+        ),
+        'owed_to_you': (
+            ExpenseSplit.objects.filter(expense__payer=user, is_settled=False).exclude(user=user),
+            'split_unsettled_expense_idx',
+        ),
+        'settle_up': (
+            ExpenseSplit.objects.filter(user=user, expense__payer=friend, is_settled=False),
+            'split_unsettled_user_idx',
+        ),
+        'settle_plan': (
+            simplify.unsettled_splits(group).values('user_id', 'expense__payer_id')
+            .annotate(total=Sum('amount_owed')).order_by(),
+            'split_unsettled_expense_idx',
+        ),
+        'history_expenses': (history._expense_rows(user), 'expense_payer_date_idx'),
+        'history_payments': (history._payment_rows(user), 'expense_payer_date_idx'),
+        'monthly_usage': (
+            Expense.objects.filter(payer=user).annotate(month=TruncMonth('date'))
+            .values('month').annotate(total=Sum('amount')).order_by('month'),
+            'expense_payer_date_idx',
+        ),
+        'group_expenses': (Expense.objects.filter(group=group).order_by('date'), 'expense_group_date_idx'),
+    }
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_indexes(seeded):
+    users, groups = seeded
+    for name, (queryset, index) in hot_queries(users[0], users[1], groups[0]).items():
+        plan = queryset.explain()
+        scans = [line for line in plan.splitlines() if ' SCAN ' in f' {line} ']
+        assert not scans, f'{name} scans a table:\n{plan}'
+        assert index in plan, f'{name} does not use {index}:\n{plan}'
@@ -0,0 +1,116 @@
+import threading
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses import ledger
+from expenses.models import Group, Expense, ExpenseSplit, Balance
+from rest_framework.test import APIClient
+
+
+def ledger_snapshot():
+    return {
+        (b.user_id, b.friend_id): (b.you_owe, b.owed_to_you)
+        for b in Balance.objects.exclude(you_owe=0, owed_to_you=0)
+    }
+
+
+@pytest.fixture
+def trio():
+    alice = User.objects.create_user(username='alice', password='testpass')
+    bob = User.objects.create_user(username='bob', password='testpass')
+    carol = User.objects.create_user(username='carol', password='testpass')
+    group = Group.objects.create(name='Trip')
+    group.members.add(alice, bob, carol)
+    return alice, bob, carol, group
+
+
+@pytest.mark.django_db
+def test_ledger_follows_expense_lifecycle(trio):
+    alice, bob, carol, group = trio
+    client = APIClient()
+
+    response = client.post(reverse('expense-list'), {
+        'description': 'Dinner', 'amount': '90', 'payer': alice.id, 'group': group.id
+    }, format='json')
+    assert response.status_code == 201
+    client.post(reverse('expense-list'), {
+        'description': 'Taxi', 'amount': '30', 'payer': bob.id, 'group': group.id,
+        'participants': [alice.id, bob.id]
+    }, format='json')
+
+    balance = client.get(reverse('balance', args=[alice.id])).data
+    assert Decimal(balance['owed_to_you']) == Decimal('60')
+    assert Decimal(balance['you_owe']) == Decimal('15')
+
+    breakdown = {row['friend']['id']: row for row in client.get(reverse('balance-breakdown', args=[alice.id])).data}
+    assert breakdown[bob.id]['net_balance'] == 15.0
+    assert breakdown[carol.id]['net_balance'] == 30.0
+
+    # Incremental state matches a full rebuild
+    snapshot = ledger_snapshot()
+    call_command('rebuild_balances')
+    assert ledger_snapshot() == snapshot
+
+    client.post(reverse('settle-up'), {'user_id': alice.id, 'friend_id': bob.id}, format='json')
+    breakdown = client.get(reverse('balance-breakdown', args=[alice.id])).data
+    assert [row['friend']['id'] for row in breakdown] == [carol.id]
+
+    dinner = Expense.objects.get(description='Dinner')
+    client.delete(reverse('expense-detail', args=[dinner.id]))
+    assert client.get(reverse('balance-breakdown', args=[alice.id])).data == []
+    assert ledger_snapshot() == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_first_debts_for_a_pair_add_up(trio, monkeypatch):
+    alice, bob, carol, group = trio
+    # Let the transactions overlap, as they do on backends where
+    # select_for_update cannot lock a row that does not exist yet
+    monkeypatch.setitem(connections['default'].settings_dict['OPTIONS'], 'transaction_mode', 'DEFERRED')
+    errors = []
+    start = threading.Barrier(8)
+
+    def owe():
+        try:
+            start.wait()
+            with transaction.atomic():
+                ledger.apply_debts({(alice.id, bob.id): Decimal('1.10'), (carol.id, bob.id): Decimal('0.10')})
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=owe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert ledger_snapshot() == {
+        (alice.id, bob.id): (Decimal('8.80'), Decimal('0')), (bob.id, alice.id): (Decimal('0'), Decimal('8.80')),
+        (carol.id, bob.id): (Decimal('0.80'), Decimal('0')), (bob.id, carol.id): (Decimal('0'), Decimal('0.80')),
+    }
+    ledger.apply_debts({(carol.id, bob.id): Decimal('0.10')}, sign=-1)
+    ledger.apply_debts({(carol.id, bob.id): Decimal('0.70')}, sign=-1)
+    # Rounded on every addition, so a paid-off pair is exactly zero again
+    assert (carol.id, bob.id) not in ledger_snapshot()
+
+
+@pytest.mark.django_db
+def test_rebuild_invalidates_cached_balances(trio):
+    alice, bob, carol, group = trio
+    client = APIClient()
+    client.post(reverse('expense-list'), {
+        'description': 'Dinner', 'amount': '30', 'payer': alice.id, 'group': group.id}, format='json')
+    # A ledger that drifted from the splits, as rebuild_balances exists to fix
+    Balance.objects.filter(user=bob, friend=alice).update(you_owe=99)
+    Balance.objects.filter(user=alice, friend=bob).update(owed_to_you=99)
+    assert client.get(reverse('balance', args=[bob.id])).data['you_owe'] == Decimal('99.00')
+    ledger.rebuild()
+
+    assert client.get(reverse('balance', args=[bob.id])).data['you_owe'] == Decimal('10.00')
+    assert client.get(reverse('balance', args=[alice.id])).data['owed_to_you'] == Decimal('20.00')
@@ -0,0 +1,69 @@
+import logging
+import pytest
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses import profiling
+from expenses.models import Group
+from rest_framework.test import APIClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    profiling.registry.clear()
+
+
+def timings(response):
+    entries = {}
+    for entry in response['Server-Timing'].split(', '):
+        name, *params = entry.split(';')
+        entries[name] = dict(param.split('=', 1) for param in params)
+    return entries
+
+
+@pytest.mark.django_db
+def test_server_timing_reports_queries_render_and_total():
+    alice = User.objects.create(username='alice')
+    Group.objects.create(name='Trip').members.add(alice)
+
+    response = APIClient().get(reverse('group-list'), {'user_id': alice.id})
+
+    entries = timings(response)
+    assert set(entries) == {'db', 'render', 'total'}
+    assert entries['db']['desc'] == '"3 queries"'
+    assert float(entries['render']['dur']) <= float(entries['total']['dur'])
+    assert float(entries['db']['dur']) <= float(entries['total']['dur'])
+
+
+@pytest.mark.django_db
+def test_metrics_expose_per_route_histograms():
+    client = APIClient()
+    user = User.objects.create(username='alice')
+    client.get(reverse('balance', args=[user.id]))
+    client.get(reverse('balance', args=[user.id]))
+    client.get(reverse('balance', args=[999]))
+
+    response = client.get(reverse('metrics'))
+
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.content.decode()
+    label = 'route="api/balance/<int:user_id>/",method="GET",status="200"'
+    assert '# TYPE divideit_request_duration_seconds histogram' in body
+    assert f'divideit_request_duration_seconds_count{{{label}}} 2' in body
+    assert f'divideit_request_duration_seconds_bucket{{{label},le="+Inf"}} 2' in body
+    assert 'divideit_request_duration_seconds_count{route="api/balance/<int:user_id>/",method="GET",status="404"} 1' in body
+    # The second balance read came from the dashboard cache
+    assert 'divideit_dashboard_cache_hits_total 1' in body
+
+
+@pytest.mark.django_db
+def test_slow_requests_are_logged_with_their_sql(settings, caplog):
+    settings.PROFILING_SLOW_REQUEST_MS = 0
+
+    with caplog.at_level(logging.WARNING, logger='expenses.profiling'):
+        APIClient().get(reverse('group-list'), {'user_id': 1})
+
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert message.startswith('Slow request GET /api/groups/')
+    assert 'SELECT' in message
@@ -0,0 +1,73 @@
+"""Query-count budgets per endpoint.
+
+Each endpoint is hit with 10, 100 and 1000 rows behind it and must stay
+within a fixed number of queries, so an N+1 regression fails the suite.
+"""
+import pytest
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses import ledger
+from expenses.models import Group, Expense, ExpenseSplit, Profile
+from rest_framework.test import APIClient
+
+ROW_COUNTS = [10, 100, 1000]
+
+
+@pytest.fixture
+def dataset(request):
+    rows = request.param
+    users = User.objects.bulk_create([User(username=f'user{i}') for i in range(rows)])
+    Profile.objects.bulk_create([Profile(user=u, avatar_url=f'/avatars/{u.id}.png') for u in users])
+    me = users[0]
+
+    big_group = Group.objects.create(name='Everyone')
+    Membership = Group.members.through
+    Membership.objects.bulk_create([Membership(group=big_group, user=u) for u in users])
+
+    # Many small groups for the group list
+    groups = Group.objects.bulk_create([Group(name=f'Pair {i}') for i in range(rows)])
+    Membership.objects.bulk_create(
+        [Membership(group=g, user=me) for g in groups]
+        + [Membership(group=g, user=users[i]) for i, g in enumerate(groups) if users[i] != me]
+    )
+
+    # One expense paid by each user, shared with me: `rows` friends and history events
+    expenses = Expense.objects.bulk_create([
+        Expense(description=f'Expense {i}', amount=20, payer=u, group=big_group)
+        for i, u in enumerate(users)
+    ])
+    ExpenseSplit.objects.bulk_create(
+        [ExpenseSplit(expense=e, user=e.payer, amount_owed=10, is_settled=True) for e in expenses]
+        + [ExpenseSplit(expense=e, user=me, amount_owed=10) for e in expenses if e.payer != me]
+    )
+
+    # One expense split across the whole group for the detail view
+    wide = Expense.objects.create(description='Party', amount=rows, payer=me, group=big_group)
+    ExpenseSplit.objects.bulk_create([ExpenseSplit(expense=wide, user=u, amount_owed=1) for u in users])
+
+    ledger.rebuild()
+    return {'me': me, 'big_group': big_group, 'wide': wide}
+
+
+ENDPOINTS = [
+    # (url name, args from dataset, query params, max queries)
+    # ETag-enabled endpoints spend one query on the group revisions
+    ('group-list', lambda d: [], lambda d: {'user_id': d['me'].id}, 3),
+    ('group-detail', lambda d: [d['big_group'].id], lambda d: {}, 3),
+    ('expense-list', lambda d: [], lambda d: {'group_id': d['big_group'].id}, 3),
+    ('expense-detail', lambda d: [d['wide'].id], lambda d: {}, 2),
+    ('balance', lambda d: [d['me'].id], lambda d: {}, 1),
+    ('balance-breakdown', lambda d: [d['me'].id], lambda d: {}, 2),
+    ('history', lambda d: [d['me'].id], lambda d: {}, 6),
+    ('monthly-usage', lambda d: [d['me'].id], lambda d: {}, 1),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('dataset', ROW_COUNTS, indirect=True)
+@pytest.mark.parametrize('name,args,params,max_queries', ENDPOINTS, ids=[e[0] for e in ENDPOINTS])
+def test_endpoint_query_budget(dataset, name, args, params, max_queries, django_assert_max_num_queries):
+    client = APIClient()
+    with django_assert_max_num_queries(max_queries):
+        response = client.get(reverse(name, args=args(dataset)), params(dataset))
+    assert response.status_code == 200
@@ -0,0 +1,171 @@
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from expenses import archive, importer, rollup
+from expenses.models import Group, Expense, MonthlySpend
+
+
+def rows():
+    return {(r.group_id, r.user_id, r.month): (r.paid, r.share)
+            for r in MonthlySpend.objects.exclude(paid=0, share=0)}
+
+
+def at(year, month, day=15):
+    return timezone.make_aware(datetime(year, month, day, 12))
+
+
+@pytest.fixture
+def flat():
+    alice, bob, carol = (User.objects.create(username=name) for name in ('alice', 'bob', 'carol'))
+    group = Group.objects.create(name='Flat')
+    group.members.add(alice, bob, carol)
+    return alice, bob, carol, group
+
+
+@pytest.mark.django_db
+def test_incremental_rollup_matches_a_rebuild(flat):
+    alice, bob, carol, group = flat
+    client = APIClient()
+    for amount, payer in (('30.00', alice), ('10.00', bob)):
+        assert client.post(reverse('expense-list'), {
+            'description': 'Groceries', 'amount': amount, 'payer': payer.id, 'group': group.id}, format='json').status_code == 201
+    report = importer.import_rows([
+        {'description': 'Taxi', 'amount': '5', 'payer': bob.id, 'group': group.id,
+         'participants': [bob.id, carol.id], 'date': '2024-03-01'},
+        {'description': 'Rent', 'amount': '90', 'payer': carol.id, 'group': group.id, 'date': '2023-03-10'},
+    ])
+    assert report.created == 2
+    doomed = Expense.objects.get(description='Groceries', payer=bob)
+    assert client.delete(reverse('expense-detail', args=[doomed.id])).status_code == 204
+
+    incremental = rows()
+    assert incremental[(group.id, alice.id, rollup.month_of(timezone.now()))] == (Decimal('30.00'), Decimal('10.00'))
+    assert incremental[(group.id, carol.id, rollup.month_of(at(2024, 3, 1)))] == (Decimal('0.00'), Decimal('2.50'))
+    assert rollup.rebuild() == len(incremental)
+    assert rows() == incremental
+
+    # Archiving moves expenses but not what they add up to
+    Expense.objects.update(date=timezone.now() - timedelta(days=800))
+    rollup.rebuild()
+    before = rows()
+    archive.archive_settled(timezone.now(), batch_size=2)
+    assert rows() == before
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_first_spend_in_a_month_adds_up(flat, monkeypatch):
+    alice, bob, carol, group = flat
+    month = rollup.month_of(at(2024, 5))
+    # Overlapping transactions, so every thread can miss the row at first
+    monkeypatch.setitem(connections['default'].settings_dict['OPTIONS'], 'transaction_mode', 'DEFERRED')
+    errors = []
+    start = threading.Barrier(8)
+
+    def spend():
+        try:
+            start.wait()
+            with transaction.atomic():
+                rollup.apply({(group.id, alice.id, month): Decimal('1.10')},
+                             {(group.id, alice.id, month): Decimal('0.55'), (group.id, bob.id, month): Decimal('0.55')})
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=spend) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert rows() == {(group.id, alice.id, month): (Decimal('8.80'), Decimal('4.40')),
+                      (group.id, bob.id, month): (Decimal('0'), Decimal('4.40'))}
+    rollup.apply(shares={(group.id, bob.id, month): Decimal('4.40')}, sign=-1)
+    assert (group.id, bob.id, month) not in rows()
+
+
+@pytest.fixture
+def history(flat):
+    alice, bob, carol, group = flat
+    for when, payer, amount in ((at(2023, 1), alice, 30), (at(2023, 2), bob, 60),
+                                (at(2024, 1), alice, 45), (at(2024, 2), carol, 90), (at(2024, 2), alice, 15)):
+        importer.import_rows([{'description': 'Spent', 'amount': str(amount), 'payer': payer.id,
+                               'group': group.id, 'date': when.isoformat()}])
+    return flat
+
+
+@pytest.mark.django_db
+def test_group_analytics(history):
+    alice, bob, carol, group = history
+    client = APIClient()
+
+    monthly = client.get(reverse('group-monthly', args=[group.id]), {'from': '2023-02', 'to': '2024-01'}).json()
+    assert monthly == [{'month': '2023-02', 'total': 60.0}, {'month': '2024-01', 'total': 45.0}]
+
+    members = client.get(reverse('group-member-spend', args=[group.id]), {'from': '2024-01'}).json()
+    assert [(m['user']['id'], m['paid'], m['share'], m['net']) for m in members] == [
+        (alice.id, 60.0, 50.0, 10.0), (bob.id, 0.0, 50.0, -50.0), (carol.id, 90.0, 50.0, 40.0)]
+
+    yoy = client.get(reverse('group-yoy', args=[group.id]), {'year': 2024}).json()
+    assert (yoy['this_year'], yoy['last_year']) == (150.0, 90.0)
+    assert yoy['months'][0] == {'month': 'Jan', 'this_year': 45.0, 'last_year': 30.0, 'change_percent': 50.0}
+    assert yoy['months'][1]['change_percent'] == 75.0
+    assert yoy['months'][2]['change_percent'] is None
+
+    mine = client.get(reverse('user-yoy', args=[alice.id]), {'year': 2024, 'measure': 'paid'}).json()
+    assert (mine['this_year'], mine['last_year']) == (60.0, 30.0)
+    share = client.get(reverse('user-yoy', args=[bob.id]), {'year': 2024, 'group_id': group.id}).json()
+    assert (share['measure'], share['this_year'], share['last_year']) == ('share', 50.0, 30.0)
+
+    assert client.get(reverse('group-monthly', args=[999])).status_code == 404
+    assert client.get(reverse('user-yoy', args=[999])).status_code == 404
+    assert client.get(reverse('group-monthly', args=[group.id]), {'from': 'March'}).status_code == 400
+    assert client.get(reverse('group-yoy', args=[group.id]), {'year': 'last'}).status_code == 400
+    assert client.get(reverse('user-yoy', args=[alice.id]), {'measure': 'owed'}).status_code == 400
+    for year in (1, 10000):
+        assert client.get(reverse('group-yoy', args=[group.id]), {'year': year}).status_code == 400
+        assert client.get(reverse('user-yoy', args=[alice.id]), {'year': year}).status_code == 400
+    assert client.get(reverse('user-yoy', args=[alice.id]), {'group_id': 'abc'}).status_code == 400
+    assert client.get(reverse('group-yoy', args=[group.id]), {'year': 9998}).status_code == 200
+
+
+@pytest.mark.django_db
+def test_analytics_query_count_does_not_grow_with_expenses(history):
+    alice, bob, carol, group = history
+
+    def queries():
+        counts = []
+        for name, args in (('group-monthly', [group.id]), ('group-member-spend', [group.id]),
+                           ('group-yoy', [group.id]), ('user-yoy', [alice.id])):
+            with CaptureQueriesContext(connection) as ctx:
+                assert APIClient().get(reverse(name, args=args)).status_code == 200
+            counts.append(len(ctx))
+        return counts
+
+    before = queries()
+    importer.import_rows([{'description': f'More {n}', 'amount': '12', 'payer': bob.id, 'group': group.id,
+                           'date': at(2024, 1 + n % 12).isoformat()} for n in range(50)])
+    assert queries() == before
+    assert max(before) <= 2
+
+
+@pytest.mark.django_db
+def test_backfill_rollup_command(history):
+    expected = rows()
+    MonthlySpend.objects.all().delete()
+    out = StringIO()
+    call_command('backfill_rollup', stdout=out)
+    assert rows() == expected
+    assert out.getvalue().strip() == f'Rebuilt {len(expected)} monthly spend rows'
@@ -0,0 +1,53 @@
+import random
+import time
+import pytest
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses.models import Group, Expense, ExpenseSplit, Balance
+from expenses.simplify import minimal_transfers
+from rest_framework.test import APIClient
+
+
+def test_minimal_transfers_clears_every_position():
+    rng = random.Random(7)
+    net = {user_id: rng.randint(-50000, 50000) for user_id in range(1, 5000)}
+    net[0] = -sum(net.values())
+
+    started = time.perf_counter()
+    transfers = minimal_transfers(net)
+    assert time.perf_counter() - started < 0.5
+
+    assert len(transfers) <= len(net) - 1
+    for debtor, creditor, cents in transfers:
+        assert cents > 0
+        net[debtor] += cents
+        net[creditor] -= cents
+    assert not any(net.values())
+
+
+@pytest.mark.django_db
+def test_settle_plan_collapses_a_debt_cycle():
+    a, b, c = (User.objects.create(username=name) for name in 'abc')
+    group = Group.objects.create(name='Cycle')
+    group.members.add(a, b, c)
+    client = APIClient()
+    # a pays for b, b pays for c, c pays for a: everyone is square
+    for payer, debtor in ((a, b), (b, c), (c, a)):
+        client.post(reverse('expense-list'), {
+            'description': 'Lunch', 'amount': '20', 'payer': payer.id, 'group': group.id,
+            'participants': [payer.id, debtor.id]
+        }, format='json')
+    client.post(reverse('expense-list'), {
+        'description': 'Cab', 'amount': '30', 'payer': a.id, 'group': group.id
+    }, format='json')
+
+    url = reverse('group-settle-plan', args=[group.id])
+    plan = client.get(url).data
+    assert sorted((t['from_user']['id'], t['amount']) for t in plan['transfers']) == [(b.id, 10.0), (c.id, 10.0)]
+    assert all(t['to_user']['id'] == a.id for t in plan['transfers'])
+
+    executed = client.post(url, {'execute': True}, format='json').data
+    assert executed['transfers'] == plan['transfers']
+    assert not ExpenseSplit.objects.filter(expense__group=group, is_settled=False).exists()
+    assert not Balance.objects.exclude(you_owe=0, owed_to_you=0).exists()
+    assert client.get(url).data['transfers'] == []
@@ -0,0 +1,107 @@
+import threading
+import pytest
+from django.db import connections
+from django.urls import reverse
+from django.contrib.auth.models import User
+from expenses import ledger
+from expenses.models import Group, Expense, ExpenseSplit, Balance
+from rest_framework.test import APIClient
+
+
+def owe(group, debtor, creditor, amount):
+    expense = Expense.objects.create(description='Item', amount=amount * 2, payer=creditor, group=group)
+    ExpenseSplit.objects.create(expense=expense, user=creditor, amount_owed=amount, is_settled=True)
+    ExpenseSplit.objects.create(expense=expense, user=debtor, amount_owed=amount)
+    ledger.apply_splits(expense.splits.all())
+
+
+def balances():
+    return {(b.user_id, b.friend_id): (b.you_owe, b.owed_to_you)
+            for b in Balance.objects.exclude(you_owe=0, owed_to_you=0)}
+
+
+@pytest.fixture
+def people():
+    users = [User.objects.create(username=name) for name in ('alice', 'bob', 'carol', 'dave')]
+    group = Group.objects.create(name='Flat')
+    group.members.add(*users)
+    return users, group
+
+
+@pytest.mark.django_db
+def test_settles_several_counterparties_both_ways(people, django_assert_max_num_queries):
+    (alice, bob, carol, dave), group = people
+    owe(group, alice, bob, 10)
+    owe(group, alice, bob, 5)
+    owe(group, carol, alice, 7)
+    owe(group, alice, dave, 3)   # not part of this settle
+
+    with django_assert_max_num_queries(11):
+        response = APIClient().post(reverse('settle-up'), {
+            'user_id': alice.id, 'friend_ids': [bob.id, carol.id]
+        }, format='json')
+
+    assert response.status_code == 200
+    assert response.data['message'] == 'Settled 3 debts'
+    assert response.data['amount_settled'] == 22.0
+    assert response.data['counterparties'] == [
+        {'friend_id': bob.id, 'paid': 15.0, 'received': 0.0},
+        {'friend_id': carol.id, 'paid': 0.0, 'received': 7.0},
+    ]
+    assert list(ExpenseSplit.objects.filter(is_settled=False).values_list('user_id', flat=True)) == [alice.id]
+    settled = balances()
+    ledger.rebuild()
+    assert balances() == settled
+
+
+@pytest.mark.django_db
+def test_single_friend_id_and_validation(people):
+    (alice, bob, carol, dave), group = people
+    owe(group, bob, alice, 4)
+    client = APIClient()
+
+    response = client.post(reverse('settle-up'), {'user_id': alice.id, 'friend_id': bob.id}, format='json')
+    assert response.data['message'] == 'Settled 1 debts'
+    assert response.data['amount_settled'] == 4.0
+
+    assert client.post(reverse('settle-up'), {'user_id': alice.id, 'friend_ids': [bob.id, 999]},
+                       format='json').status_code == 404
+    assert client.post(reverse('settle-up'), {'user_id': alice.id, 'friend_ids': bob.id},
+                       format='json').status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_settles_settle_each_debt_once(people):
+    (alice, bob, carol, dave), group = people
+    for _ in range(20):
+        owe(group, alice, bob, 1)
+        owe(group, carol, alice, 2)
+        owe(group, dave, bob, 1)
+
+    results, errors = [], []
+    start = threading.Barrier(8)
+
+    def settle(payload):
+        try:
+            start.wait()
+            response = APIClient().post(reverse('settle-up'), payload, format='json')
+            results.append((response.status_code, response.data['amount_settled']))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    payloads = [{'user_id': alice.id, 'friend_ids': [bob.id, carol.id]}] * 4 \
+        + [{'user_id': bob.id, 'friend_ids': [alice.id, dave.id]}] * 4
+    threads = [threading.Thread(target=settle, args=(payload,)) for payload in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert all(status == 200 for status, _ in results)
+    # Every debt was settled by exactly one request
+    assert sum(amount for _, amount in results) == 20 * (1 + 2 + 1)
+    assert not ExpenseSplit.objects.filter(is_settled=False).exists()
+    assert balances() == {}
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from expenses import stream
+from expenses.models import Group, Expense, ExpenseSplit
+
+
+def parse(chunks):
+    """``[(event, data)]`` of the SSE frames in ``chunks``, skipping comments."""
+    events = []
+    for block in b''.join(chunks).decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_subscription_buffers_until_read_and_resyncs_when_full(settings):
+    settings.STREAM_MAX_QUEUED_EVENTS = 3
+    hub = stream.Hub()
+
+    async def scenario():
+        subscription = hub.subscribe(7)
+        # Published from other threads, as the sync views do
+        thread = threading.Thread(target=lambda: [hub.publish(7, 'activity', {'n': n}) for n in range(2)])
+        thread.start()
+        thread.join()
+        first = await subscription.next_frames(1)
+
+        for n in range(10):
+            hub.publish(7, 'activity', {'n': n})
+        await asyncio.sleep(0)
+        overflowed = await subscription.next_frames(1)
+
+        hub.publish(7, 'activity', {'n': 'after'})
+        await asyncio.sleep(0)
+        recovered = await subscription.next_frames(1)
+        idle = await subscription.next_frames(0.01)
+        hub.unsubscribe(subscription)
+        return first, overflowed, recovered, idle, subscription.dropped
+
+    first, overflowed, recovered, idle, dropped = async_to_sync(scenario)()
+    assert parse(first) == [('activity', {'n': 0}), ('activity', {'n': 1})]
+    assert overflowed == [stream.RESYNC]
+    assert parse(recovered) == [('activity', {'n': 'after'})]
+    assert idle == []
+    assert dropped == 10
+    assert not hub.listening()
+    assert hub.publish(7, 'activity', {}) == 0
+
+
+def test_subscription_byte_limit_and_connection_limit(settings):
+    settings.STREAM_MAX_QUEUED_BYTES = 200
+    settings.STREAM_MAX_CONNECTIONS_PER_USER = 2
+    hub = stream.Hub()
+
+    async def scenario():
+        subscriptions = [hub.subscribe(1), hub.subscribe(1)]
+        with pytest.raises(stream.Busy):
+            hub.subscribe(1)
+        other = hub.subscribe(2)
+        hub.publish(1, 'activity', {'text': 'x' * 500})
+        hub.publish(2, 'activity', {'text': 'x' * 50})
+        await asyncio.sleep(0)
+        return [await s.next_frames(1) for s in subscriptions], await other.next_frames(1)
+
+    firsts, other = async_to_sync(scenario)()
+    assert firsts == [[stream.RESYNC], [stream.RESYNC]]
+    assert parse(other) == [('activity', {'text': 'x' * 50})]
+    assert hub.listeners({1, 2, 3}) == {1, 2}
+
+
+@pytest.fixture
+def friends():
+    alice = User.objects.create(username='alice', email='alice@example.com')
+    bob = User.objects.create(username='bob', email='bob@example.com')
+    group = Group.objects.create(name='Flat')
+    group.members.add(alice, bob)
+    return alice, bob, group
+
+
+def listen(user_id, actions, until):
+    """Open ``user_id``'s stream, run each sync action, and collect events until ``until(events)``."""
+    async def scenario():
+        response = await AsyncClient().get(reverse('stream', args=[user_id]))
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/event-stream'
+        chunks = response.streaming_content.__aiter__()
+        events = parse([await chunks.__anext__()])
+        for action in actions:
+            await sync_to_async(action)()
+        while not until(events):
+            events += parse([await asyncio.wait_for(chunks.__anext__(), 5)])
+        await chunks.aclose()
+        return events
+
+    return async_to_sync(scenario)()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stream_pushes_balance_deltas_and_activity(friends, settings):
+    settings.ROOT_URLCONF = 'config.asgi_urls'
+    alice, bob, group = friends
+
+    def spend():
+        response = APIClient().post(reverse('expense-list'), {
+            'description': 'Groceries', 'amount': '30.00', 'payer': alice.id, 'group': group.id}, format='json')
+        assert response.status_code == 201
+
+    def settle():
+        response = APIClient().post(reverse('settle-up'), {'user_id': bob.id, 'friend_id': alice.id}, format='json')
+        assert response.status_code == 200
+
+    events = listen(bob.id, [spend, settle], until=lambda events: len(events) >= 5)
+    expense = Expense.objects.get()
+    split = ExpenseSplit.objects.get(user=bob)
+    kinds = [(event, data.get('kind')) for event, data in events]
+    assert kinds == [('ready', None), ('balance', None), ('activity', 'expense'),
+                     ('balance', None), ('activity', 'payment')]
+    assert events[1][1] == {'friend_id': alice.id, 'you_owe': 15.0, 'owed_to_you': 0.0}
+    assert events[2][1]['event_id'] == expense.id and events[2][1]['group_id'] == group.id
+    assert events[3][1] == {'friend_id': alice.id, 'you_owe': -15.0, 'owed_to_you': 0.0}
+    assert events[4][1]['event_id'] == split.id and events[4][1]['event_amount'] == 15.0
+    # The connection went away with the client
+    assert not stream.hub.listening()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_nothing_is_published_for_rolled_back_writes(friends, settings):
+    settings.ROOT_URLCONF = 'config.asgi_urls'
+    alice, bob, group = friends
+
+    def rolled_back():
+        from django.db import transaction
+        with pytest.raises(RuntimeError), transaction.atomic():
+            expense = Expense.objects.create(description='Oops', amount=10, payer=alice, group=group)
+            ExpenseSplit.objects.create(expense=expense, user=bob, amount_owed=5)
+            raise RuntimeError
+
+    def deleted():
+        expense = Expense.objects.create(description='Kept', amount=10, payer=bob, group=group)
+        expense.delete()
+
+    events = listen(bob.id, [rolled_back, deleted], until=lambda events: len(events) >= 3)
+    assert [data.get('deleted') for event, data in events] == [None, None, True]
+    assert events[1][1]['kind'] == 'expense' and events[1][1]['event_amount'] == 10.0
+
+
+@pytest.mark.django_db
+def test_stream_rejects_unknown_users_and_too_many_connections(friends, settings):
+    settings.ROOT_URLCONF = 'config.asgi_urls'
+    settings.STREAM_MAX_CONNECTIONS_PER_USER = 1
+    alice, bob, group = friends
+
+    async def scenario():
+        client = AsyncClient()
+        missing = await client.get(reverse('stream', args=[999]))
+        first = await client.get(reverse('stream', args=[alice.id]))
+        chunks = first.streaming_content.__aiter__()
+        await chunks.__anext__()
+        second = await client.get(reverse('stream', args=[alice.id]))
+        await chunks.aclose()
+        return missing.status_code, second.status_code
+
+    assert async_to_sync(scenario)() == (404, 429)
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from expenses.authentication import TokenCache, token_cache
+from expenses.models import Group, Expense, ExpenseSplit
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture
+def debt():
+    payer = User.objects.create_user(username='payer', password='testpass')
+    debtor = User.objects.create_user(username='debtor', password='testpass')
+    group = Group.objects.create(name='Flat')
+    group.members.add(payer, debtor)
+    expense = Expense.objects.create(description='Rent', amount=100, payer=payer, group=group)
+    split = ExpenseSplit.objects.create(expense=expense, user=debtor, amount_owed=50)
+    return debtor, split
+
+
+def login(username='debtor', password='testpass'):
+    response = APIClient().post(reverse('login'), {'username': username, 'password': password}, format='json')
+    assert response.status_code == 200
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+    return client, response.data
+
+
+@pytest.mark.django_db
+def test_login_issues_a_token_that_authenticates_without_queries(debt, django_assert_num_queries):
+    debtor, split = debt
+    client, data = login()
+    assert data['username'] == 'debtor'
+    assert Token.objects.get(user=debtor).key == data['token']
+    # Logging in again keeps the same token
+    assert login()[1]['token'] == data['token']
+
+    client.get(reverse('group-list'))  # resolves and caches the token
+    with django_assert_num_queries(0):
+        assert client.get(reverse('metrics')).status_code == 200
+    assert client.get(reverse('group-list')).status_code == 200  # caller taken from the token
+
+    response = client.post(reverse('split-settle', args=[split.id]))
+    assert response.status_code == 200
+    assert token_cache.hits >= 3
+
+
+@pytest.mark.django_db
+def test_bad_token_and_no_token(debt):
+    debtor, split = debt
+    client = APIClient()
+    assert client.post(reverse('split-settle', args=[split.id])).status_code in (401, 403)
+    client.credentials(HTTP_AUTHORIZATION='Token nope')
+    assert client.post(reverse('split-settle', args=[split.id])).status_code == 401
+
+
+@pytest.mark.django_db
+def test_logout_revokes_the_cached_token(debt):
+    debtor, split = debt
+    client, data = login()
+    assert client.post(reverse('logout')).status_code == 200
+    assert not Token.objects.filter(user=debtor).exists()
+    assert client.post(reverse('split-settle', args=[split.id])).status_code == 401
+
+    # A fresh login gets a new token
+    assert login()[1]['token'] != data['token']
+
+
+@pytest.mark.django_db
+def test_password_reset_revokes_the_cached_token(debt):
+    debtor, split = debt
+    client, data = login()
+    assert client.post(reverse('split-settle', args=[split.id])).status_code == 200
+    assert len(token_cache) == 1
+
+    response = APIClient().post(reverse('password-reset-confirm'), {
+        'uid': urlsafe_base64_encode(force_bytes(debtor.pk)),
+        'token': default_token_generator.make_token(debtor),
+        'new_password': 'n3w-Passw0rd!',
+    }, format='json')
+    assert response.status_code == 200
+    assert len(token_cache) == 0
+    assert client.post(reverse('logout')).status_code == 401
+    assert login(password='n3w-Passw0rd!')[1]['token'] != data['token']
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_reloaded_and_rejected(debt):
+    debtor, split = debt
+    client, data = login()
+    assert client.get(reverse('group-list')).status_code == 200
+    debtor.is_active = False
+    debtor.save()
+    assert client.get(reverse('group-list')).status_code == 401
+
+
+class FakeUser:
+    def __init__(self, pk):
+        self.pk = pk
+
+
+def test_token_cache_is_bounded_and_expires(monkeypatch):
+    cache = TokenCache(maxsize=2, ttl=60)
+    cache.set('a', FakeUser(1), 'token-a')
+    cache.set('b', FakeUser(2), 'token-b')
+    assert cache.get('a')[1] == 'token-a'  # 'b' is now least recently used
+    cache.set('c', FakeUser(3), 'token-c')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+    # One entry per user
+    cache.set('a2', FakeUser(1), 'token-a2')
+    assert cache.get('a') is None and len(cache) == 2
+    cache.discard_user(1)
+    assert cache.get('a2') is None
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 61)
+    assert cache.get('c') is None
+    assert len(cache) == 0
@@ -1,10 +1,12 @@
 from rest_framework import generics, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.contrib.auth.models import User
-from django.db.models import Sum, Count, Q
-from django.db.models.functions import TruncMonth
+from django.db import transaction
+from django.db.models import Sum, Count, Q, Prefetch, Value, DecimalField
+from django.db.models.functions import Coalesce
 from django.contrib.auth import authenticate
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -12,13 +14,39 @@ from django.utils.encoding import force_bytes, force_str
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from datetime import MINYEAR, MAXYEAR
+from decimal import Decimal
+from . import analytics, authentication, caching, db, etags, exports, fastpath, groups, importer, ledger, profiling, rollup, stream
+from .money import parse_amount, split_evenly
+from .simplify import net_positions, minimal_transfers, unsettled_splits
+from .history import history_page, DEFAULT_LIMIT as DEFAULT_HISTORY_LIMIT
 from .models import Group, Expense, ExpenseSplit
-from .serializers import GroupSerializer, ExpenseSerializer, UserSerializer, ExpenseSplitSerializer
+from .serializers import GroupSerializer, GroupSummarySerializer, ExpenseSerializer, UserSerializer, ExpenseSplitSerializer
+
+def expense_queryset():
+    # Everything ExpenseSerializer touches, loaded in a fixed number of queries
+    return Expense.objects.select_related('payer__profile', 'group').prefetch_related(
+        Prefetch('splits', queryset=ExpenseSplit.objects.select_related('user__profile'))
+    )
+
+def group_queryset():
+    # Members with their profiles for GroupSerializer's nested UserSerializer
+    return Group.objects.prefetch_related(
+        Prefetch('members', queryset=User.objects.select_related('profile'))
+    )
 
 class ExpenseRetrieveDestroyAPIView(generics.RetrieveDestroyAPIView):
-    queryset = Expense.objects.all()
+    queryset = expense_queryset()
     serializer_class = ExpenseSerializer
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            ledger.apply_splits(instance.splits.all(), sign=-1)
+            instance.delete()
+
 class LoginAPIView(APIView):
     def post(self, request):
         username = request.data.get('username')
@@ -26,11 +54,17 @@ class LoginAPIView(APIView):
         user = authenticate(username=username, password=password)
         
         if user:
-            # Return full user data including avatar_url
+            # Return full user data including avatar_url, plus the API token
             serializer = UserSerializer(user)
-            return Response(serializer.data)
+            return Response({**serializer.data, 'token': authentication.issue_token(user)})
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_400_BAD_REQUEST)
 
+class LogoutAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    def post(self, request):
+        authentication.revoke_tokens(request.user)
+        return Response({'message': 'Logged out'})
+
 class RegisterAPIView(APIView):
     def post(self, request):
         username = request.data.get('email') # Use email as username
@@ -69,13 +103,43 @@ class UserProfileAPIView(APIView):
             user.last_name = request.data.get('last_name', user.last_name)
             user.email = request.data.get('email', user.email)
             user.save()
+            etags.bump_for_member(user)
             return Response({'message': 'Profile updated'})
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=404)
 
+class GroupPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+@method_decorator(db.replica_reads, name='get')
+@method_decorator(condition(etag_func=etags.group_list_etag), name='get')
 class GroupListCreateAPIView(generics.ListCreateAPIView):
-    queryset = Group.objects.all()
+    # Lists the caller's groups: ?user_id=<id> unless authenticated.
+    # ?view=summary swaps nested members for annotated totals.
     serializer_class = GroupSerializer
+    pagination_class = GroupPagination
+
+    def is_summary(self):
+        return self.request.query_params.get('view') == 'summary'
+
+    def get_queryset(self):
+        user_id = groups.caller_id(self.request)
+        if self.is_summary():
+            return groups.with_summary(groups.member_groups(user_id), user_id)
+        return group_queryset().filter(members=user_id)
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and self.is_summary():
+            return GroupSummarySerializer
+        return GroupSerializer
+
+    def get(self, request, *args, **kwargs):
+        if groups.caller_id(request) is None:
+            return Response({'error': 'user_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        return self.list(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
         name = request.data.get('name')
@@ -96,10 +160,18 @@ class GroupListCreateAPIView(generics.ListCreateAPIView):
         serializer = self.get_serializer(group)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+@method_decorator(condition(etag_func=etags.group_detail_etag), name='get')
 class GroupRetrieveDestroyAPIView(generics.RetrieveDestroyAPIView):
-    queryset = Group.objects.all()
+    queryset = group_queryset()
     serializer_class = GroupSerializer
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            ledger.apply_splits(ExpenseSplit.objects.filter(expense__group=instance), sign=-1)
+            instance.delete()
+
+@method_decorator(db.replica_reads, name='get')
+@method_decorator(condition(etag_func=etags.expense_list_etag), name='get')
 class ExpenseListCreateAPIView(generics.ListCreateAPIView):
     serializer_class = ExpenseSerializer
 
@@ -110,6 +182,10 @@ class ExpenseListCreateAPIView(generics.ListCreateAPIView):
             queryset = queryset.filter(group_id=group_id)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Same payload as ExpenseSerializer(many=True), built from .values() rows
+        return Response(fastpath.expense_list(self.filter_queryset(self.get_queryset())))
+
     def post(self, request, *args, **kwargs):
         description = request.data.get('description')
         amount_val = request.data.get('amount')
@@ -120,9 +196,9 @@ class ExpenseListCreateAPIView(generics.ListCreateAPIView):
             return Response({'error': 'Amount is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            amount = float(amount_val)
-        except ValueError:
-            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
+            amount = parse_amount(amount_val)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             payer = User.objects.get(id=payer_id)
@@ -130,106 +206,194 @@ class ExpenseListCreateAPIView(generics.ListCreateAPIView):
         except (User.DoesNotExist, Group.DoesNotExist):
             return Response({'error': 'Invalid payer or group'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create Expense
-        expense = Expense.objects.create(
-            description=description,
-            amount=amount,
-            payer=payer,
-            group=group
-        )
+        with transaction.atomic():
+            # Create Expense
+            expense = Expense.objects.create(
+                description=description,
+                amount=amount,
+                payer=payer,
+                group=group
+            )
 
-        # Split Logic
-        participant_ids = request.data.get('participants', [])
-        if participant_ids:
-            members = User.objects.filter(id__in=participant_ids)
-        else:
-            members = group.members.all()
+            # Split Logic
+            participant_ids = request.data.get('participants', [])
+            if participant_ids:
+                members = User.objects.filter(id__in=participant_ids)
+            else:
+                members = group.members.all()
+            # Ordered by id so the leftover cents always land on the same members
+            members = list(members.order_by('id'))
 
-        if not members:
-            # If no participants specified and no members in group, default to just the payer
-            members = [payer]
-        
-        count = len(members) if isinstance(members, list) else members.count()
-        if count > 0:
-            split_amount = amount / count
-            for member in members:
-                ExpenseSplit.objects.create(
+            if not members:
+                # If no participants specified and no members in group, default to just the payer
+                members = [payer]
+
+            shares = split_evenly(amount, len(members))
+            splits = ExpenseSplit.objects.bulk_create([
+                ExpenseSplit(
                     expense=expense,
                     user=member,
-                    amount_owed=split_amount,
+                    amount_owed=share,
                     is_settled=(member == payer)
                 )
-        serializer = ExpenseSerializer(expense)
+                for member, share in zip(members, shares)
+            ])
+
+            ledger.apply_debts({
+                (split.user_id, payer.id): split.amount_owed
+                for split in splits if not split.is_settled
+            })
+            # bulk_create sends no signals; the expense's own save covered the payer
+            rollup.apply_splits(ExpenseSplit.objects.filter(expense=expense))
+            stream.splits_created([expense.id])
+
+        serializer = ExpenseSerializer(expense_queryset().get(pk=expense.pk))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+class ExpenseImportAPIView(APIView):
+    def post(self, request):
+        upload = request.FILES.get('file')
+        try:
+            rows = importer.read_upload(upload) if upload else importer.read_json(request.data)
+            # CSV rows are read, and can fail to decode, as the import goes
+            report = importer.import_rows(rows)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not report.created and report.errors:
+            return Response(report.as_dict(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED)
+
 class BalanceAPIView(APIView):
     def get(self, request, user_id):
-        # Calculate how much 'user_id' owes and is owed
-        # This is a simplified demo version
-        
-        try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
+        data = caching.get_or_compute('balance', user_id, lambda: self.totals(user_id))
+        if data is None:
             return Response({'error': 'User not found'}, status=404)
+        return Response(data)
 
-        # You owe: Splits where user is 'user' and is_settled=False
-        owed = ExpenseSplit.objects.filter(user=user, is_settled=False).exclude(expense__payer=user)
-        total_owed = sum(split.amount_owed for split in owed)
-        
-        # You are owed: Expenses you paid, minus your own share (which is marked settled)
-        paid_expenses = Expense.objects.filter(payer=user)
-        total_owed_to_you = 0
-        for exp in paid_expenses:
-            # Sum of unsettled splits from OTHER users
-            unsettled = exp.splits.filter(is_settled=False).exclude(user=user)
-            total_owed_to_you += sum(split.amount_owed for split in unsettled)
-
-        return Response({
-            'user': user.username,
-            'you_owe': total_owed,
-            'owed_to_you': total_owed_to_you
-        })
+    def totals(self, user_id):
+        # Calculate how much 'user_id' owes and is owed.
+        # The user lookup and both ledger totals come back from one statement;
+        # Coalesce keeps the totals Decimal when the user has no balances yet.
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        totals = User.objects.filter(id=user_id).values('username').annotate(
+            you_owe=Coalesce(Sum('balances__you_owe'), zero),
+            owed_to_you=Coalesce(Sum('balances__owed_to_you'), zero)
+        ).order_by('username').first()
+
+        if totals is None:
+            return None
+
+        return {
+            'user': totals['username'],
+            'you_owe': totals['you_owe'],
+            'owed_to_you': totals['owed_to_you']
+        }
 
 class SettleUpAPIView(APIView):
     def post(self, request):
-        # Settle all debts between two users
-        friend_id = request.data.get('friend_id')
+        # Settle all debts, both ways, between a user and one or more counterparties
         user_id = request.data.get('user_id')
+        friend_ids = request.data.get('friend_ids')
+        if friend_ids is None:
+            friend_ids = [request.data.get('friend_id')]
+        if not isinstance(friend_ids, list):
+            return Response({'error': 'friend_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            user_a = User.objects.get(id=user_id)
-            user_b = User.objects.get(id=friend_id)
-        except User.DoesNotExist:
+            user_id = int(user_id)
+            friend_ids = {int(friend_id) for friend_id in friend_ids} - {user_id}
+        except (TypeError, ValueError):
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        if User.objects.filter(id__in=friend_ids | {user_id}).count() != len(friend_ids) + 1:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Direction 1: A owes B
-        debts_a_owes_b = ExpenseSplit.objects.filter(
-            user=user_a, 
-            expense__payer=user_b, 
-            is_settled=False
-        )
-        
-        # Direction 2: B owes A
-        debts_b_owes_a = ExpenseSplit.objects.filter(
-            user=user_b, 
-            expense__payer=user_a, 
-            is_settled=False
+        debts = ExpenseSplit.objects.filter(is_settled=False).filter(
+            Q(user_id=user_id, expense__payer_id__in=friend_ids)
+            | Q(user_id__in=friend_ids, expense__payer_id=user_id)
         )
-        
-        count_a = debts_a_owes_b.count()
-        count_b = debts_b_owes_a.count()
-        total_a = sum(d.amount_owed for d in debts_a_owes_b)
-        total_b = sum(d.amount_owed for d in debts_b_owes_a)
-        
-        now = timezone.now()
-        debts_a_owes_b.update(is_settled=True, settled_at=now)
-        debts_b_owes_a.update(is_settled=True, settled_at=now)
+
+        with transaction.atomic():
+            # Lock the outstanding splits so a concurrent settle waits, then
+            # finds nothing left, instead of settling them a second time
+            split_ids = list(debts.select_for_update(of=('self',)).values_list('id', flat=True))
+            locked = ExpenseSplit.objects.filter(id__in=split_ids)
+            totals = locked.values('user_id', 'expense__payer_id') \
+                .annotate(total=Sum('amount_owed'), count=Count('id')) \
+                .order_by()
+            totals = {(row['user_id'], row['expense__payer_id']): row for row in totals}
+
+            ledger.apply_debts({pair: row['total'] for pair, row in totals.items()}, sign=-1)
+            etags.bump_for_splits(locked)
+            settled = locked.filter(is_settled=False).update(is_settled=True, settled_at=timezone.now())
+            stream.splits_settled(split_ids)
+
+        counterparties = []
+        for friend_id in sorted(friend_ids):
+            paid = totals.get((user_id, friend_id), {}).get('total') or Decimal('0')
+            received = totals.get((friend_id, user_id), {}).get('total') or Decimal('0')
+            counterparties.append({'friend_id': friend_id, 'paid': float(paid), 'received': float(received)})
+
+        return Response({
+            'message': f'Settled {settled} debts',
+            'amount_settled': float(sum(row['total'] for row in totals.values())),
+            'counterparties': counterparties
+        })
+
+
+class GroupSettlePlanAPIView(APIView):
+    """Minimal set of transfers that clears every unsettled debt in a group.
+
+    GET returns the plan. POST with ``{"execute": true}`` settles all of the
+    group's outstanding splits in one transaction and returns the plan that
+    was executed.
+    """
+    def get(self, request, group_id):
+        try:
+            group = Group.objects.get(id=group_id)
+        except Group.DoesNotExist:
+            return Response({'error': 'Group not found'}, status=404)
+        return Response(self.plan(group))
+
+    def post(self, request, group_id):
+        try:
+            group = Group.objects.get(id=group_id)
+        except Group.DoesNotExist:
+            return Response({'error': 'Group not found'}, status=404)
+
+        if not request.data.get('execute'):
+            return Response(self.plan(group))
+
+        with transaction.atomic():
+            # Lock the outstanding splits so the executed plan matches what gets settled
+            split_ids = list(unsettled_splits(group).select_for_update().values_list('id', flat=True))
+            plan = self.plan(group)
+            splits = ExpenseSplit.objects.filter(id__in=split_ids)
+            ledger.apply_splits(splits, sign=-1)
+            etags.bump([group.id])
+            settled = splits.update(is_settled=True, settled_at=timezone.now())
+            stream.splits_settled(split_ids)
 
         return Response({
-            'message': f'Settled {count_a + count_b} debts',
-            'amount_settled': float(total_a + total_b)
+            **plan,
+            'message': f'Settled {settled} debts',
         })
 
+    def plan(self, group):
+        transfers = minimal_transfers(net_positions(group))
+        user_ids = {user_id for transfer in transfers for user_id in transfer[:2]}
+        users = User.objects.select_related('profile').in_bulk(user_ids)
+        return {
+            'group': group.id,
+            'transfers': [
+                {
+                    'from_user': UserSerializer(users[debtor]).data,
+                    'to_user': UserSerializer(users[creditor]).data,
+                    'amount': cents / 100
+                }
+                for debtor, creditor, cents in transfers
+            ]
+        }
+
 
 class MarkSplitSettledAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -246,9 +410,14 @@ class MarkSplitSettledAPIView(APIView):
         if split.user != request.user:
             return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
 
-        split.is_settled = True
-        split.settled_at = timezone.now()
-        split.save()
+        with transaction.atomic():
+            # Re-read under the lock; a concurrent settle may have got here first
+            split = ExpenseSplit.objects.select_for_update().get(pk=split.pk)
+            if not split.is_settled:
+                ledger.apply_splits(ExpenseSplit.objects.filter(pk=split.pk), sign=-1)
+            split.is_settled = True
+            split.settled_at = timezone.now()
+            split.save()
         return Response({'message': 'Split marked as settled', 'split_id': split.id})
 
 class AddMemberToGroupAPIView(APIView):
@@ -303,6 +472,9 @@ class UserProfileUpdateAPIView(APIView):
                 profile.avatar_url = avatar_url
                 profile.save()
 
+            # Groups nest member details
+            etags.bump_for_member(user)
+
             return Response({
                 'message': 'Profile updated successfully',
                 'user': UserSerializer(user).data
@@ -312,21 +484,87 @@ class UserProfileUpdateAPIView(APIView):
 
 class MonthlyUsageAPIView(APIView):
     def get(self, request, user_id):
-        # Returns spending per month for this user
-        usage = Expense.objects.filter(payer_id=user_id) \
-            .annotate(month=TruncMonth('date')) \
-            .values('month') \
-            .annotate(total=Sum('amount')) \
-            .order_by('month')
-            
-        data = []
-        for entry in usage:
-            data.append({
-                'month': entry['month'].strftime('%b %Y'),
-                'amount': float(entry['total'])
-            })
-            
-        return Response(data)
+        return Response(caching.get_or_compute('usage', user_id, lambda: self.usage(user_id)))
+
+    def usage(self, user_id):
+        # Returns spending per month for this user, archived expenses included
+        return analytics.usage(analytics.monthly_paid(user_id))
+
+
+@method_decorator(db.replica_reads, name='get')
+class GroupMonthlySpendAPIView(APIView):
+    def get(self, request, group_id):
+        if not Group.objects.filter(id=group_id).exists():
+            return Response({'error': 'Group not found'}, status=404)
+        try:
+            start = analytics.parse_month(request.query_params.get('from'), 'from')
+            end = analytics.parse_month(request.query_params.get('to'), 'to')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(analytics.group_monthly(group_id, start, end))
+
+
+@method_decorator(db.replica_reads, name='get')
+class GroupMemberSpendAPIView(APIView):
+    # Each member's share of the group's spending against what they paid
+    def get(self, request, group_id):
+        if not Group.objects.filter(id=group_id).exists():
+            return Response({'error': 'Group not found'}, status=404)
+        try:
+            start = analytics.parse_month(request.query_params.get('from'), 'from')
+            end = analytics.parse_month(request.query_params.get('to'), 'to')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(analytics.group_members(group_id, start, end))
+
+
+def _year(value):
+    try:
+        year = int(value) if value else None
+    except ValueError:
+        raise ValueError('Invalid year')
+    # Compared with the year before, and both must fit a date
+    if year is not None and not MINYEAR < year < MAXYEAR:
+        raise ValueError(f'Invalid year, expected {MINYEAR + 1} to {MAXYEAR - 1}')
+    return year
+
+
+def _id(value, name):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        raise ValueError(f'Invalid {name}')
+
+
+@method_decorator(db.replica_reads, name='get')
+class GroupYearOverYearAPIView(APIView):
+    def get(self, request, group_id):
+        if not Group.objects.filter(id=group_id).exists():
+            return Response({'error': 'Group not found'}, status=404)
+        try:
+            year = _year(request.query_params.get('year'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(analytics.group_year_over_year(group_id, year))
+
+
+@method_decorator(db.replica_reads, name='get')
+class UserYearOverYearAPIView(APIView):
+    # ?measure=share (what the user consumed, default) or paid; ?group_id narrows to one group
+    def get(self, request, user_id):
+        if not User.objects.filter(id=user_id).exists():
+            return Response({'error': 'User not found'}, status=404)
+        params = request.query_params
+        measure = params.get('measure', 'share')
+        try:
+            if measure not in analytics.MEASURES:
+                raise ValueError('Invalid measure, expected paid or share')
+            year = _year(params.get('year'))
+            group_id = _id(params.get('group_id'), 'group_id')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(analytics.user_year_over_year(user_id, measure, year, group_id))
+
 class PasswordResetRequestAPIView(APIView):
     def post(self, request):
         email = request.data.get('email')
@@ -367,132 +605,86 @@ class PasswordResetConfirmAPIView(APIView):
         if user is not None and default_token_generator.check_token(user, token):
             user.set_password(new_password)
             user.save()
+            # Sign out everywhere
+            authentication.revoke_tokens(user)
             return Response({'message': 'Password has been reset successfully'})
         else:
             return Response({'error': 'Invalid or expired reset link'}, status=status.HTTP_400_BAD_REQUEST)
 
 class UserBalanceBreakdownAPIView(APIView):
+    def get(self, request, user_id):
+        data = caching.get_or_compute('breakdown', user_id, lambda: self.breakdown(user_id))
+        if data is None:
+            return Response({'error': 'User not found'}, status=404)
+        return Response(data)
+
+    def breakdown(self, user_id):
+        if not User.objects.filter(id=user_id).exists():
+            return None
+        return fastpath.breakdown(fastpath.balance_rows(user_id))
+
+
+@method_decorator(db.replica_reads, name='get')
+@method_decorator(condition(etag_func=etags.history_etag), name='get')
+class HistoryAPIView(APIView):
     def get(self, request, user_id):
         try:
             user = User.objects.get(id=user_id)
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=404)
 
-        # Map to store friend_id -> {friend_details, net_balance, you_owe, owed_to_you}
-        breakdown = {}
-
-        # 1. Debts you owe: Splits where you are the debtor
-        your_debts = ExpenseSplit.objects.filter(user=user, is_settled=False).exclude(expense__payer=user)
-        for split in your_debts:
-            friend = split.expense.payer
-            if friend.id not in breakdown:
-                breakdown[friend.id] = {
-                    'friend': UserSerializer(friend).data,
-                    'you_owe': 0.0,
-                    'owed_to_you': 0.0
-                }
-            breakdown[friend.id]['you_owe'] += float(split.amount_owed)
-
-        # 2. Debts owed to you: Splits on expenses YOU paid where others are debtors
-        debts_to_you = ExpenseSplit.objects.filter(expense__payer=user, is_settled=False).exclude(user=user)
-        for split in debts_to_you:
-            debtor = split.user
-            if debtor.id not in breakdown:
-                breakdown[debtor.id] = {
-                    'friend': UserSerializer(debtor).data,
-                    'you_owe': 0.0,
-                    'owed_to_you': 0.0
-                }
-            breakdown[debtor.id]['owed_to_you'] += float(split.amount_owed)
-
-        # Convert to list and calculate net
-        result = []
-        for f_id, data in breakdown.items():
-            net = data['owed_to_you'] - data['you_owe']
-            result.append({
-                **data,
-                'net_balance': net
-            })
+        params = request.query_params
+        try:
+            events, next_cursor = history_page(
+                user,
+                ordering=params.get('ordering', '-date'),
+                cursor=params.get('cursor'),
+                limit=params.get('limit', DEFAULT_HISTORY_LIMIT),
+                date_from=params.get('from'),
+                date_to=params.get('to'),
+                group_id=params.get('group_id'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Sort by absolute balance (most important first)
-        result.sort(key=lambda x: abs(x['net_balance']), reverse=True)
+        return Response({
+            'results': events,
+            'next_cursor': next_cursor
+        })
 
-        return Response(result)
 
+class HistoryExportAPIView(APIView):
+    renderer_classes = [exports.CSVRenderer, exports.NDJSONRenderer]
 
-class HistoryAPIView(APIView):
     def get(self, request, user_id):
         try:
             user = User.objects.get(id=user_id)
         except User.DoesNotExist:
             return Response({'error': 'User not found'}, status=404)
-        
-        # 1. Get Expenses where user is payer or receiver
-        expenses = Expense.objects.filter(
-            Q(payer=user) | Q(splits__user=user)
-        ).distinct()
-        
-        # 2. Get Settlements where user is payer or receiver
-        # Settlements where I owe someone (user=me) OR I am being paid (expense__payer=me)
-        settled_splits = ExpenseSplit.objects.filter(
-            is_settled=True,
-            settled_at__isnull=False
-        ).filter(
-            Q(user=user) | Q(expense__payer=user)
-        ).distinct()
-
-        events = []
-        
-        # Add Expense Creation Events
-        for exp in expenses:
-            events.append({
-                'id': f"exp_{exp.id}",
-                'type': 'expense',
-                'description': exp.description,
-                'amount': float(exp.amount),
-                'date': exp.date,
-                'payer': exp.payer.id,
-                'payer_name': f"{exp.payer.first_name} {exp.payer.last_name}".strip() or exp.payer.username,
-                'group_name': exp.group.name,
-                'splits': ExpenseSplitSerializer(exp.splits.all(), many=True).data
-            })
-            
-        # Add Settlement (Payment) Events
-        for split in settled_splits:
-            # Skip splits where payer is the debtor (self-payment)
-            if split.user == split.expense.payer:
-                continue
 
-            is_receiving = split.expense.payer == user
-            
-            if is_receiving:
-                description = f"Received from {split.user.username}"
-            else:
-                description = f"Paid to {split.expense.payer.username}"
-
-            events.append({
-                'id': f"settle_{split.id}",
-                'type': 'payment',
-                'description': f"{description} ({split.expense.description})",
-                'amount': float(split.amount_owed),
-                'date': split.settled_at,
-                'from_user': split.user.username,
-                'to_user': split.expense.payer.username,
-                'is_receiving': is_receiving,
-                'group_name': split.expense.group.name
-            })
+        params = request.query_params
+        try:
+            rows = exports.history_rows(
+                user,
+                date_from=params.get('from'),
+                date_to=params.get('to'),
+                group_id=params.get('group_id'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return exports.stream(request, rows, f'history-{user.id}')
+
+
+class GroupExportAPIView(APIView):
+    renderer_classes = [exports.CSVRenderer, exports.NDJSONRenderer]
+
+    def get(self, request, pk):
+        if not Group.objects.filter(pk=pk).exists():
+            return Response({'error': 'Group not found'}, status=404)
+        return exports.stream(request, exports.group_rows(pk), f'group-{pk}')
 
-        # Ordering logic
-        ordering = request.query_params.get('ordering', '-date')
-        
-        reverse = ordering.startswith('-')
-        sort_key = ordering.lstrip('-')
-        
-        if sort_key == 'date':
-            events.sort(key=lambda x: x['date'], reverse=reverse)
-        elif sort_key == 'amount':
-            events.sort(key=lambda x: x['amount'], reverse=reverse)
-        else:
-            events.sort(key=lambda x: x['date'], reverse=True) # Default newest
 
-        return Response(events)
+class MetricsAPIView(APIView):
+    def get(self, request):
+        return HttpResponse(profiling.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
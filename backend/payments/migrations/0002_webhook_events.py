@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:49
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_orders(apps, schema_editor):
+    # The unique index below cannot go on while provider order ids repeat.
+    # Each row may be a payment record, so stop and name them rather than
+    # pick which ones to drop
+    Order = apps.get_model('payments', 'Order')
+    duplicated = Order.objects.values('order_payment_id').annotate(n=Count('id')).filter(n__gt=1) \
+        .values_list('order_payment_id', flat=True)
+    rows = Order.objects.filter(order_payment_id__in=list(duplicated)).order_by('order_payment_id', 'id')
+    if not rows:
+        return
+    lines = [f'  {row.order_payment_id}: order {row.id} ({"paid" if row.isPaid else "unpaid"})' for row in rows]
+    raise RuntimeError(
+        'Orders share a provider order id; merge or remove the extra rows, then migrate again:\n'
+        + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('event', models.CharField(max_length=50)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(check_duplicate_orders, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='order_payment_id',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
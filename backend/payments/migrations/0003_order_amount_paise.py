@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:20
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def amounts_to_paise(apps, schema_editor):
+    # order_amount held whatever the client posted, in rupees; anything
+    # unreadable becomes 0
+    Order = apps.get_model('payments', 'Order')
+    orders = list(Order.objects.only('id', 'order_amount'))
+    for order in orders:
+        try:
+            rupees = Decimal(order.order_amount.strip())
+        except (InvalidOperation, AttributeError):
+            rupees = Decimal(0)
+        if not rupees.is_finite() or rupees < 0:
+            rupees = Decimal(0)
+        order.order_amount_paise = int((rupees * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    Order.objects.bulk_update(orders, ['order_amount_paise'], batch_size=1000)
+
+
+def paise_to_amounts(apps, schema_editor):
+    Order = apps.get_model('payments', 'Order')
+    orders = list(Order.objects.only('id', 'order_amount_paise'))
+    for order in orders:
+        rupees, rest = divmod(order.order_amount_paise, 100)
+        order.order_amount = f'{rupees}.{rest:02d}'
+    Order.objects.bulk_update(orders, ['order_amount'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_webhook_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='order_amount_paise',
+            field=models.PositiveBigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        # A default lets a rollback re-add the column before filling it
+        migrations.AlterField(
+            model_name='order',
+            name='order_amount',
+            field=models.CharField(default='', max_length=25),
+        ),
+        migrations.RunPython(amounts_to_paise, paise_to_amounts),
+        migrations.RemoveField(
+            model_name='order',
+            name='order_amount',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date', 'id'], name='order_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['isPaid', 'order_date', 'id'], name='order_paid_date_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-18 18:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def created_from_order_date(apps, schema_editor):
+    # The creation time was never stored. order_date is the last save:
+    # creation for an order left alone, payment otherwise; the closest left
+    Order = apps.get_model('payments', 'Order')
+    Order.objects.update(created_at=F('order_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_order_amount_paise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(created_from_order_date, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_paid_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['isPaid', 'created_at', 'id'], name='order_paid_created_idx'),
+        ),
+    ]
@@ -1,11 +1,44 @@
 from django.db import models
 
+
+def format_paise(paise):
+    rupees, rest = divmod(paise, 100)
+    return f'{rupees}.{rest:02d}'
+
+
 class Order(models.Model):
     order_product = models.CharField(max_length=100)
-    order_amount = models.CharField(max_length=25)
-    order_payment_id = models.CharField(max_length=100)
+    # Paise, the unit the provider charges in, so totals can be summed in SQL
+    order_amount_paise = models.PositiveBigIntegerField()
+    # The provider's order id: verification and webhooks look orders up by it
+    order_payment_id = models.CharField(max_length=100, unique=True)
     isPaid = models.BooleanField(default=False)
+    # Last change; paying an order moves it
     order_date = models.DateTimeField(auto_now=True)
+    # Never changes, so the list pages and date filters key on it
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first keyset pages, overall and by paid status
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+            models.Index(fields=['isPaid', 'created_at', 'id'], name='order_paid_created_idx'),
+        ]
 
     def __str__(self):
         return self.order_product
+
+    @property
+    def order_amount(self):
+        """The amount in rupees, as a string."""
+        return format_paise(self.order_amount_paise)
+
+
+class WebhookEvent(models.Model):
+    """A provider event already applied; redeliveries with the same id are skipped."""
+    event_id = models.CharField(max_length=100, unique=True)
+    event = models.CharField(max_length=50)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.event_id
@@ -0,0 +1,173 @@
+"""Payment provider interface behind the order and verification views.
+
+``get_provider()`` returns one provider per process, built from
+``PAYMENT_PROVIDER`` on first use:
+
+* ``razorpay``: one shared ``razorpay.Client`` whose ``requests`` session
+  keeps up to ``PAYMENT_POOL_SIZE`` keep-alive connections, bounds every
+  call with ``PAYMENT_CONNECT_TIMEOUT``/``PAYMENT_READ_TIMEOUT`` seconds and
+  retries failed connections up to ``PAYMENT_MAX_RETRIES`` times. A request
+  the provider may already have received (read timeout, 5xx on a POST) is
+  never retried, so an order is never created twice.
+* ``fake``: offline, for tests and load tests. Orders take
+  ``PAYMENT_FAKE_LATENCY`` seconds and time out like the real client when
+  that exceeds the read timeout. Signatures are checked the way Razorpay
+  signs them.
+
+Webhook deliveries are signed over the raw body with a separate secret,
+``RAZORPAY_WEBHOOK_SECRET``.
+
+Provider failures surface as ``PaymentProviderError``.
+"""
+import hashlib
+import hmac
+import itertools
+import threading
+import time
+
+import razorpay
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PaymentProviderError(Exception):
+    """The provider could not be reached in time or rejected the request."""
+
+
+class PaymentProvider:
+    def create_order(self, amount, currency='INR'):
+        """Create an order for ``amount`` in the currency's minor unit; return the provider's order dict."""
+        raise NotImplementedError
+
+    def verify_signature(self, order_id, payment_id, signature):
+        """Whether ``signature`` is the provider's signature of this payment of this order."""
+        raise NotImplementedError
+
+    def verify_webhook(self, body, signature):
+        """Whether ``signature`` is the provider's signature of the raw webhook ``body`` (bytes)."""
+        raise NotImplementedError
+
+
+def _order_payload(amount, currency):
+    return {'amount': amount, 'currency': currency, 'payment_capture': '1'}
+
+
+class RazorpayProvider(PaymentProvider):
+    def __init__(self, key_id, key_secret, connect_timeout=3.05, read_timeout=10, max_retries=2, pool_size=10,
+                 base_url=razorpay.Client.DEFAULTS['base_url'], webhook_secret=None):
+        retry = Retry(
+            total=max_retries, connect=max_retries, read=0, other=0,
+            # Busy or briefly unavailable: retried for idempotent methods only
+            status=max_retries, status_forcelist=(429, 502, 503, 504),
+            backoff_factor=0.2, raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.client = razorpay.Client(session=session, auth=(key_id, key_secret), base_url=base_url)
+        self.timeout = (connect_timeout, read_timeout)
+        self.webhook_secret = webhook_secret
+
+    def create_order(self, amount, currency='INR'):
+        try:
+            return self.client.order.create(_order_payload(amount, currency), timeout=self.timeout)
+        except (requests.RequestException, razorpay.errors.BadRequestError,
+                razorpay.errors.GatewayError, razorpay.errors.ServerError) as e:
+            raise PaymentProviderError(str(e)) from e
+
+    def verify_signature(self, order_id, payment_id, signature):
+        try:
+            self.client.utility.verify_payment_signature({
+                'razorpay_order_id': order_id,
+                'razorpay_payment_id': payment_id,
+                'razorpay_signature': signature,
+            })
+        except razorpay.errors.SignatureVerificationError:
+            return False
+        return True
+
+    def verify_webhook(self, body, signature):
+        if not self.webhook_secret:
+            return False
+        try:
+            self.client.utility.verify_webhook_signature(body.decode(), str(signature), self.webhook_secret)
+        except (razorpay.errors.SignatureVerificationError, UnicodeDecodeError):
+            return False
+        return True
+
+
+class FakeProvider(PaymentProvider):
+    def __init__(self, key_secret='fake-secret', latency=0, read_timeout=10, webhook_secret='fake-webhook-secret'):
+        self.key_secret = key_secret
+        self.webhook_secret = webhook_secret
+        self.latency = latency
+        self.read_timeout = read_timeout
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_order(self, amount, currency='INR'):
+        if self.latency > self.read_timeout:
+            time.sleep(self.read_timeout)
+            raise PaymentProviderError('Read timed out')
+        time.sleep(self.latency)
+        with self._lock:
+            number = next(self._ids)
+        return {'id': f'order_fake{number}', 'entity': 'order', 'status': 'created', **_order_payload(amount, currency)}
+
+    def sign(self, order_id, payment_id):
+        """The signature checkout would hand back for this payment."""
+        return hmac.new(self.key_secret.encode(), f'{order_id}|{payment_id}'.encode(), hashlib.sha256).hexdigest()
+
+    def verify_signature(self, order_id, payment_id, signature):
+        return hmac.compare_digest(self.sign(order_id, payment_id), str(signature))
+
+    def sign_webhook(self, body):
+        """The ``X-Razorpay-Signature`` a delivery of ``body`` would carry."""
+        return hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+
+    def verify_webhook(self, body, signature):
+        return hmac.compare_digest(self.sign_webhook(body), str(signature))
+
+
+def _build():
+    name = getattr(settings, 'PAYMENT_PROVIDER', 'razorpay')
+    read_timeout = getattr(settings, 'PAYMENT_READ_TIMEOUT', 10)
+    if name == 'razorpay':
+        return RazorpayProvider(
+            settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET,
+            connect_timeout=getattr(settings, 'PAYMENT_CONNECT_TIMEOUT', 3.05),
+            read_timeout=read_timeout,
+            max_retries=getattr(settings, 'PAYMENT_MAX_RETRIES', 2),
+            pool_size=getattr(settings, 'PAYMENT_POOL_SIZE', 10),
+            webhook_secret=getattr(settings, 'RAZORPAY_WEBHOOK_SECRET', None),
+        )
+    if name == 'fake':
+        return FakeProvider(settings.RAZORPAY_KEY_SECRET, getattr(settings, 'PAYMENT_FAKE_LATENCY', 0), read_timeout,
+                            getattr(settings, 'RAZORPAY_WEBHOOK_SECRET', None) or 'fake-webhook-secret')
+    raise ValueError(f'Unknown PAYMENT_PROVIDER: {name!r}')
+
+
+_provider = None
+_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _lock:
+            if _provider is None:
+                _provider = _build()
+    return _provider
+
+
+@receiver(setting_changed)
+def reset_provider(setting=None, **kwargs):
+    # override_settings(PAYMENT_PROVIDER='fake', ...) takes effect on the next call
+    global _provider
+    if setting is None or setting.startswith(('PAYMENT_', 'RAZORPAY_')):
+        _provider = None
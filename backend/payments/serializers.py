@@ -2,9 +2,10 @@ from rest_framework import serializers
 from .models import Order
 
 class OrderSerializer(serializers.ModelSerializer):
+    order_amount = serializers.CharField(read_only=True)
     order_date = serializers.DateTimeField(format="%d %B %Y %I:%M %p")
+    created_at = serializers.DateTimeField(format="%d %B %Y %I:%M %p", read_only=True)
 
     class Meta:
         model = Order
-        fields = '__all__'
-        depth = 2
+        fields = ['id', 'order_product', 'order_amount', 'order_amount_paise', 'order_payment_id', 'isPaid', 'order_date', 'created_at']
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from payments.models import Order
+from payments.serializers import OrderSerializer
+
+
+@pytest.fixture
+def orders():
+    now = timezone.now()
+    rows = Order.objects.bulk_create([
+        Order(order_product=f'Order {i}', order_amount_paise=100 * i + 5, order_payment_id=f'order_{i}',
+              isPaid=i % 3 == 0)
+        for i in range(30)
+    ])
+    # Pairs share a timestamp, so pages have to break ties on id
+    for i, order in enumerate(rows):
+        order.created_at = order.order_date = now - timedelta(days=i // 2)
+    Order.objects.bulk_update(rows, ['created_at', 'order_date'])
+    return rows
+
+
+def walk(client, params, between_pages=None):
+    results, url = [], reverse('order-list')
+    while url:
+        with CaptureQueriesContext(connection) as queries:
+            page = client.get(url, params if url == reverse('order-list') else None).json()
+        assert len(queries) == 1
+        results += page['results']
+        url = page['next']
+        if between_pages:
+            between_pages()
+    return results
+
+
+@pytest.mark.django_db
+def test_order_list_pages_newest_first_without_gaps(orders):
+    results = walk(APIClient(), {'page_size': 4})
+    expected = sorted(orders, key=lambda o: (o.created_at, o.id), reverse=True)
+    assert [row['id'] for row in results] == [o.id for o in expected]
+    assert results[-1] == OrderSerializer(Order.objects.get(pk=expected[-1].pk)).data
+    assert results[-1]['order_amount'] == '28.05' and results[-1]['order_amount_paise'] == 2805
+
+
+@pytest.mark.django_db
+def test_paying_orders_mid_walk_neither_skips_nor_repeats_them(orders):
+    unpaid = iter([o for o in reversed(orders) if not o.isPaid])
+
+    def pay_one():
+        # The oldest unpaid order, which has not been listed yet; verify and
+        # the webhook move its order_date to now
+        Order.objects.filter(pk=next(unpaid).pk).update(isPaid=True, order_date=timezone.now())
+
+    results = walk(APIClient(), {'page_size': 4}, between_pages=pay_one)
+    assert sorted(row['id'] for row in results) == sorted(o.id for o in orders)
+
+
+@pytest.mark.django_db
+def test_order_list_filters_by_paid_status_and_date(orders):
+    client = APIClient()
+    paid = walk(client, {'page_size': 3, 'paid': 'true'})
+    assert {row['id'] for row in paid} == {o.id for o in orders if o.isPaid}
+    unpaid = walk(client, {'paid': 'false'})
+    assert {row['id'] for row in unpaid} == {o.id for o in orders if not o.isPaid}
+
+    day = timezone.localdate() - timedelta(days=3)
+    recent = walk(client, {'from': day.isoformat(), 'to': timezone.localdate().isoformat()})
+    assert {row['id'] for row in recent} == {o.id for o in orders[:8]}
+
+    assert client.get(reverse('order-list'), {'paid': 'yes'}).status_code == 400
+    assert client.get(reverse('order-list'), {'from': '18/10/2026'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_summary_totals_come_from_one_query(orders):
+    client = APIClient()
+    with CaptureQueriesContext(connection) as queries:
+        summary = client.get(reverse('order-summary')).json()
+    assert len(queries) == 1
+    paid = [o for o in orders if o.isPaid]
+    unpaid = [o for o in orders if not o.isPaid]
+    assert summary['paid'] == {'count': len(paid), 'amount_paise': sum(o.order_amount_paise for o in paid),
+                               'amount': '135.50'}
+    assert summary['unpaid']['amount_paise'] == sum(o.order_amount_paise for o in unpaid)
+
+    day = timezone.localdate().isoformat()
+    today = client.get(reverse('order-summary'), {'from': day}).json()
+    assert today['paid'] == {'count': 1, 'amount_paise': 5, 'amount': '0.05'}
+    assert today['unpaid'] == {'count': 1, 'amount_paise': 105, 'amount': '1.05'}
+    empty = client.get(reverse('order-summary'), {'paid': 'true', 'to': '2000-01-01'}).json()
+    assert empty['paid'] == {'count': 0, 'amount_paise': 0, 'amount': '0.00'}
+
+
+@pytest.mark.django_db
+def test_order_amounts_must_be_positive():
+    client = APIClient()
+    assert client.post(reverse('create-order'), {'name': 'Tea', 'amount': -5}, format='json').status_code == 400
+    assert not Order.objects.exists()
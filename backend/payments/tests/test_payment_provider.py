@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments.models import Order
+from payments.providers import FakeProvider, PaymentProviderError, RazorpayProvider, get_provider
+
+
+@pytest.fixture
+def fake():
+    with override_settings(PAYMENT_PROVIDER='fake', PAYMENT_FAKE_LATENCY=0):
+        yield get_provider()
+
+
+@pytest.mark.django_db
+def test_create_order_and_verify_through_the_fake_provider(fake):
+    client = APIClient()
+    response = client.post(reverse('create-order'), {'name': 'Coffee', 'amount': '12'}, format='json')
+    assert response.status_code == 200
+    payment = response.data['payment']
+    assert payment['amount'] == 1200 and payment['currency'] == 'INR'
+    assert Order.objects.get(order_payment_id=payment['id']).order_amount_paise == 1200
+
+    bad = client.post(reverse('verify-payment'), {
+        'razorpay_order_id': payment['id'], 'razorpay_payment_id': 'pay_1', 'razorpay_signature': 'forged',
+    }, format='json')
+    assert bad.status_code == 400
+    assert not Order.objects.get(order_payment_id=payment['id']).isPaid
+
+    good = client.post(reverse('verify-payment'), {
+        'razorpay_order_id': payment['id'], 'razorpay_payment_id': 'pay_1',
+        'razorpay_signature': fake.sign(payment['id'], 'pay_1'),
+    }, format='json')
+    assert good.status_code == 200
+    assert Order.objects.get(order_payment_id=payment['id']).isPaid
+
+
+@pytest.mark.django_db
+def test_bad_input_is_rejected(fake):
+    client = APIClient()
+    assert client.post(reverse('create-order'), {'name': 'Coffee', 'amount': 'ten'}, format='json').status_code == 400
+    assert client.post(reverse('verify-payment'), {'razorpay_order_id': 'x'}, format='json').status_code == 400
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_slow_provider_is_cut_off_at_the_read_timeout():
+    with override_settings(PAYMENT_PROVIDER='fake', PAYMENT_FAKE_LATENCY=5, PAYMENT_READ_TIMEOUT=0.05):
+        started = time.perf_counter()
+        response = APIClient().post(reverse('create-order'), {'name': 'Coffee', 'amount': 1}, format='json')
+        assert time.perf_counter() - started < 1
+    assert response.status_code == 502
+    assert not Order.objects.exists()
+
+
+def test_provider_is_shared_and_rebuilt_on_settings_change():
+    with override_settings(PAYMENT_PROVIDER='fake'):
+        provider = get_provider()
+        assert isinstance(provider, FakeProvider) and get_provider() is provider
+    assert isinstance(get_provider(), RazorpayProvider)
+
+
+class Provider(BaseHTTPRequestHandler):
+    """A local stand-in for the Razorpay API: every POST is counted, answers as ``server.mode`` says."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append(self.client_address)
+        if self.server.mode == 'slow':
+            time.sleep(0.5)
+        status, body = (503, {'error': {'code': 'SERVER_ERROR', 'description': 'Busy'}}) \
+            if self.server.mode == 'busy' else (200, {'id': f'order_{len(self.server.requests)}'})
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Provider)
+    httpd.requests, httpd.mode = [], 'ok'
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def razorpay_at(server, **options):
+    return RazorpayProvider('key', 'secret', base_url=f'http://127.0.0.1:{server.server_address[1]}', **options)
+
+
+def test_razorpay_client_reuses_its_connection(server):
+    provider = razorpay_at(server)
+    assert [provider.create_order(100)['id'] for _ in range(3)] == ['order_1', 'order_2', 'order_3']
+    # One keep-alive connection, not a handshake per order
+    assert len(set(server.requests)) == 1
+
+
+@pytest.mark.parametrize('mode', ['slow', 'busy'])
+def test_razorpay_orders_fail_fast_and_are_never_sent_twice(server, mode):
+    server.mode = mode
+    provider = razorpay_at(server, read_timeout=0.1, max_retries=3)
+    started = time.perf_counter()
+    with pytest.raises(PaymentProviderError):
+        provider.create_order(100)
+    assert time.perf_counter() - started < 0.45
+    assert len(server.requests) == 1
+
+
+def test_razorpay_retries_refused_connections():
+    provider = RazorpayProvider('key', 'secret', base_url='http://127.0.0.1:9', connect_timeout=0.1, max_retries=2)
+    retries = provider.client.session.get_adapter('http://127.0.0.1:9').max_retries
+    assert (retries.connect, retries.read) == (2, 0)
+    with pytest.raises(PaymentProviderError):
+        provider.create_order(100)
+    assert provider.verify_signature('order_1', 'pay_1', 'forged') is False
@@ -0,0 +1,150 @@
+import json
+import threading
+
+import pytest
+from django.db import IntegrityError, connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from payments.models import Order, WebhookEvent
+from payments.providers import get_provider
+
+
+@pytest.fixture
+def fake():
+    with override_settings(PAYMENT_PROVIDER='fake'):
+        yield get_provider()
+
+
+def captured(order_id, event_id=None, kind='payment.captured'):
+    return {'id': event_id or f'evt_{order_id}', 'entity': 'event', 'event': kind,
+            'payload': {'payment': {'entity': {'id': f'pay_{order_id}', 'order_id': order_id}}}}
+
+
+def deliver(provider, data, signature=None, **headers):
+    body = json.dumps(data).encode()
+    return APIClient().post(reverse('payment-webhook'), body, content_type='application/json',
+                            HTTP_X_RAZORPAY_SIGNATURE=signature or provider.sign_webhook(body), **headers)
+
+
+def orders(n):
+    return Order.objects.bulk_create([Order(order_product='Tea', order_amount_paise=500, order_payment_id=f'order_{i}')
+                                      for i in range(n)])
+
+
+@pytest.mark.django_db
+def test_order_payment_id_is_unique():
+    orders(1)
+    with pytest.raises(IntegrityError):
+        Order.objects.create(order_product='Tea', order_amount_paise=500, order_payment_id='order_0')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unique_order_id_migration_refuses_duplicates():
+    executor = MigrationExecutor(connection)
+    executor.migrate([('payments', '0001_initial')])
+    Old = executor.loader.project_state([('payments', '0001_initial')]).apps.get_model('payments', 'Order')
+    try:
+        for paid in (False, True):
+            Old.objects.create(order_product='Tea', order_amount=5, order_payment_id='order_1', isPaid=paid)
+        executor = MigrationExecutor(connection)
+        with pytest.raises(RuntimeError, match=r'order_1: order \d+ \(unpaid\)\n  order_1: order \d+ \(paid\)'):
+            executor.migrate([('payments', '0002_webhook_events')])
+        assert Old.objects.count() == 2
+    finally:
+        Old.objects.all().delete()
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes('payments'))
+
+
+@pytest.mark.django_db
+def test_verification_is_one_update_and_idempotent(fake):
+    orders(1)
+    data = {'razorpay_order_id': 'order_0', 'razorpay_payment_id': 'pay_0',
+            'razorpay_signature': fake.sign('order_0', 'pay_0')}
+    with CaptureQueriesContext(connection) as queries:
+        first = APIClient().post(reverse('verify-payment'), data, format='json')
+    assert first.status_code == 200 and len(queries) == 1
+    assert Order.objects.get().isPaid
+
+    retried = APIClient().post(reverse('verify-payment'), data, format='json')
+    assert retried.status_code == 200
+
+    data = {'razorpay_order_id': 'order_missing', 'razorpay_payment_id': 'pay_0',
+            'razorpay_signature': fake.sign('order_missing', 'pay_0')}
+    assert APIClient().post(reverse('verify-payment'), data, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_webhook_batch_is_applied_in_constant_queries(fake):
+    orders(50)
+    events = [captured(f'order_{i}') for i in range(40)]
+    events.append(captured('order_45', kind='payment.failed'))
+    events.append(captured('order_0'))  # same event twice in one batch
+    with CaptureQueriesContext(connection) as queries:
+        response = deliver(fake, {'events': events})
+    assert response.status_code == 200
+    assert response.json() == {'received': 41, 'duplicates': 0, 'orders_paid': 40}
+    assert len(queries) <= 5
+    assert Order.objects.filter(isPaid=True).count() == 40
+    assert WebhookEvent.objects.count() == 41
+
+    # A redelivery, plus one new event
+    response = deliver(fake, {'events': events + [captured('order_49')]})
+    assert response.json() == {'received': 42, 'duplicates': 41, 'orders_paid': 1}
+    assert Order.objects.filter(isPaid=True).count() == 41
+
+
+@pytest.mark.django_db
+def test_single_razorpay_delivery_takes_its_id_from_the_header(fake):
+    orders(1)
+    event = {'entity': 'event', 'event': 'order.paid',
+             'payload': {'order': {'entity': {'id': 'order_0'}}, 'payment': {'entity': {'id': 'pay_0'}}}}
+    response = deliver(fake, event, HTTP_X_RAZORPAY_EVENT_ID='evt_header')
+    assert response.json() == {'received': 1, 'duplicates': 0, 'orders_paid': 1}
+    assert WebhookEvent.objects.get().event_id == 'evt_header'
+
+
+@pytest.mark.django_db
+def test_webhook_rejects_bad_signatures_and_payloads(fake):
+    orders(1)
+    assert deliver(fake, {'events': [captured('order_0')]}, signature='forged').status_code == 400
+    assert deliver(fake, {'events': [{'event': 'payment.captured'}]}).status_code == 400
+    assert deliver(fake, {'events': 'nope'}).status_code == 400
+    assert deliver(fake, {'event': 'payment.captured'}).status_code == 400  # no event id
+    with override_settings(PAYMENT_WEBHOOK_MAX_BATCH=2):
+        too_many = deliver(get_provider(), {'events': [captured(f'order_{i}') for i in range(3)]})
+    assert too_many.status_code == 413
+    assert not Order.objects.filter(isPaid=True).exists()
+    assert not WebhookEvent.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_redeliveries_apply_once(fake):
+    orders(20)
+    data = {'events': [captured(f'order_{i}') for i in range(20)]}
+    barrier = threading.Barrier(4)
+    results, errors = [], []
+
+    def redeliver():
+        try:
+            barrier.wait()
+            results.append(deliver(fake, data).json())
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=redeliver) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sum(result['orders_paid'] for result in results) == 20
+    assert WebhookEvent.objects.count() == 20
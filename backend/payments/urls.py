@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import TransactionAPIView, PaymentVerificationAPIView, OrderListAPIView
+from .views import TransactionAPIView, PaymentVerificationAPIView, OrderListAPIView, OrderSummaryAPIView, PaymentWebhookAPIView
 
 urlpatterns = [
     path('create-order/', TransactionAPIView.as_view(), name='create-order'),
     path('verify-payment/', PaymentVerificationAPIView.as_view(), name='verify-payment'),
+    path('payments/webhook/', PaymentWebhookAPIView.as_view(), name='payment-webhook'),
     path('orders/', OrderListAPIView.as_view(), name='order-list'),
+    path('orders/summary/', OrderSummaryAPIView.as_view(), name='order-summary'),
 ]
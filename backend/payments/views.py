@@ -1,32 +1,115 @@
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from rest_framework.pagination import CursorPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
-from django.conf import settings
-import razorpay
-from .models import Order
+from expenses.db import replica_reads
+from . import webhooks
+from .models import Order, format_paise
+from .providers import PaymentProviderError, get_provider
 from .serializers import OrderSerializer
 
+def _day_start(value, name):
+    day = parse_date(value) if value else None
+    if value and day is None:
+        raise ValueError(f'Invalid {name}, expected YYYY-MM-DD')
+    return timezone.make_aware(datetime.combine(day, time.min)) if day else None
+
+
+def filter_orders(queryset, params):
+    """Apply ``?paid=true|false&from=YYYY-MM-DD&to=YYYY-MM-DD`` (creation dates); raises ``ValueError``."""
+    paid = params.get('paid')
+    if paid is not None:
+        if paid not in ('true', 'false'):
+            raise ValueError('Invalid paid, expected true or false')
+        queryset = queryset.filter(isPaid=paid == 'true')
+    start = _day_start(params.get('from'), 'from')
+    end = _day_start(params.get('to'), 'to')
+    if start:
+        queryset = queryset.filter(created_at__gte=start)
+    if end:
+        queryset = queryset.filter(created_at__lt=end + timedelta(days=1))
+    return queryset
+
+
+class OrderPagination(CursorPagination):
+    # Keyset pages on the (created_at, id) indexes, newest first. Not
+    # order_date: paying an order rewrites it, which would move the order
+    # across the cursor mid-walk
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+@method_decorator(replica_reads, name='get')
 class OrderListAPIView(generics.ListAPIView):
-    queryset = Order.objects.all().order_by('-order_date')
     serializer_class = OrderSerializer
+    pagination_class = OrderPagination
+
+    def get_queryset(self):
+        return filter_orders(Order.objects.all(), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        try:
+            return super().list(request, *args, **kwargs)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(replica_reads, name='get')
+class OrderSummaryAPIView(APIView):
+    def get(self, request):
+        try:
+            orders = filter_orders(Order.objects.all(), request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Paid and unpaid totals in one aggregate
+        totals = orders.aggregate(
+            paid_count=Count('id', filter=Q(isPaid=True)),
+            paid_paise=Sum('order_amount_paise', filter=Q(isPaid=True), default=0),
+            unpaid_count=Count('id', filter=Q(isPaid=False)),
+            unpaid_paise=Sum('order_amount_paise', filter=Q(isPaid=False), default=0),
+        )
+        return Response({
+            kind: {
+                'count': totals[f'{kind}_count'],
+                'amount_paise': totals[f'{kind}_paise'],
+                'amount': format_paise(totals[f'{kind}_paise']),
+            }
+            for kind in ('paid', 'unpaid')
+        })
 
 class TransactionAPIView(APIView):
     def post(self, request):
         name = request.data.get('name')
         amount = request.data.get('amount')
-        
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        
-        payment = client.order.create({
-            "amount": int(amount) * 100, # Razorpay expects amount in paise
-            "currency": "INR",
-            "payment_capture": "1"
-        })
+
+        try:
+            paise = int(amount) * 100 # Razorpay expects amount in paise
+            if paise <= 0:
+                raise ValueError(amount)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid amount'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            payment = get_provider().create_order(paise, 'INR')
+        except PaymentProviderError as e:
+            return Response({'error': 'Payment provider unavailable', 'detail': str(e)},
+                            status=status.HTTP_502_BAD_GATEWAY)
         
         order = Order.objects.create(
             order_product=name,
-            order_amount=amount,
+            order_amount_paise=paise,
             order_payment_id=payment['id']
         )
         
@@ -43,25 +126,42 @@ class PaymentVerificationAPIView(APIView):
     def post(self, request):
         data = request.data
         
-        # Verify signature
-        # Razorpay signature verification
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        
         try:
             # We need razorpay_order_id, razorpay_payment_id, razorpay_signature
-            params_dict = {
-                'razorpay_order_id': data['razorpay_order_id'],
-                'razorpay_payment_id': data['razorpay_payment_id'],
-                'razorpay_signature': data['razorpay_signature']
-            }
-            client.utility.verify_payment_signature(params_dict)
-            
-            # If successful, mark order as paid
-            order = Order.objects.get(order_payment_id=data['razorpay_order_id'])
-            order.isPaid = True
-            order.save()
-            
+            order_id = data['razorpay_order_id']
+            if not get_provider().verify_signature(order_id, data['razorpay_payment_id'], data['razorpay_signature']):
+                raise ValueError('Razorpay Signature Verification Failed')
+
+            # If successful, mark order as paid. One conditional UPDATE on the
+            # unique index; a retried verification finds it paid and succeeds
+            if not Order.objects.filter(order_payment_id=order_id, isPaid=False) \
+                    .update(isPaid=True, order_date=timezone.now()):
+                if not Order.objects.filter(order_payment_id=order_id).exists():
+                    raise Order.DoesNotExist('Order matching query does not exist.')
+
             return Response({'status': 'Payment Verified'}, status=status.HTTP_200_OK)
             
-        except Exception as e:
+        except (KeyError, ValueError, Order.DoesNotExist) as e:
             return Response({'status': 'Payment Verification Failed', 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PaymentWebhookAPIView(APIView):
+    # The provider authenticates by signing the body, not with a user session
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request):
+        body = request.body
+        if not get_provider().verify_webhook(body, request.headers.get('X-Razorpay-Signature', '')):
+            return Response({'error': 'Invalid signature'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            batch = webhooks.parse(json.loads(body), request.headers.get('X-Razorpay-Event-Id'))
+        except (ValueError, webhooks.InvalidBatch) as e:
+            return Response({'error': 'Invalid payload', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        limit = getattr(settings, 'PAYMENT_WEBHOOK_MAX_BATCH', 500)
+        if len(batch) > limit:
+            return Response({'error': f'At most {limit} events per request'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        return Response(webhooks.apply(batch), status=status.HTTP_200_OK)
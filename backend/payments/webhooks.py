@@ -0,0 +1,67 @@
+"""Applying batches of provider webhook events.
+
+A delivery is either one Razorpay event, with its id in the
+``X-Razorpay-Event-Id`` header, or ``{"events": [...]}`` where every event
+carries its own ``id``. Either way the raw body is signed as a whole
+(``X-Razorpay-Signature``), so a relay that batches events re-signs them.
+
+Events are deduplicated by id, within the batch and against
+``WebhookEvent``, and the whole batch is applied in one transaction with
+one ``UPDATE`` per kind of change, however many events it holds.
+Redelivering a batch changes nothing.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, WebhookEvent
+
+# Events that mean the order's money has been captured
+PAID_EVENTS = ('payment.captured', 'order.paid')
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+def parse(data, event_id=None):
+    """The ``{id: event}`` of a decoded delivery, in delivery order."""
+    if isinstance(data, dict) and 'events' in data:
+        events = data['events']
+        if not isinstance(events, list):
+            raise InvalidBatch('events must be a list')
+    else:
+        events = [{**data, 'id': event_id} if isinstance(data, dict) else data]
+    batch = {}
+    for event in events:
+        if not isinstance(event, dict) or not event.get('id') or not isinstance(event.get('event'), str):
+            raise InvalidBatch('Every event needs an id and an event type')
+        batch.setdefault(str(event['id']), event)
+    return batch
+
+
+def order_id(event):
+    """The provider order id an event is about, or ``None``."""
+    payload = event.get('payload') or {}
+    try:
+        if 'order' in payload:
+            return payload['order']['entity']['id']
+        return payload['payment']['entity']['order_id']
+    except (KeyError, TypeError):
+        return None
+
+
+def apply(batch):
+    """Record and apply the events of ``batch`` not seen before.
+
+    Returns ``{'received', 'duplicates', 'orders_paid'}``.
+    """
+    with transaction.atomic():
+        seen = set(WebhookEvent.objects.filter(event_id__in=list(batch)).values_list('event_id', flat=True))
+        fresh = {event_id: event for event_id, event in batch.items() if event_id not in seen}
+        # A concurrent delivery of the same event loses the insert; applying twice is harmless
+        WebhookEvent.objects.bulk_create([WebhookEvent(event_id=event_id, event=event['event'][:50])
+                                          for event_id, event in fresh.items()], ignore_conflicts=True)
+        paid = {order_id(event) for event in fresh.values() if event['event'] in PAID_EVENTS} - {None}
+        orders_paid = Order.objects.filter(order_payment_id__in=paid, isPaid=False) \
+            .update(isPaid=True, order_date=timezone.now()) if paid else 0
+    return {'received': len(batch), 'duplicates': len(batch) - len(fresh), 'orders_paid': orders_paid}
@@ -4,6 +4,15 @@ import { API_BASE_URL } from '../api/config';
 
 const AuthContext = createContext(null);
 
+// Every API call carries the token issued at login
+const setAuthToken = (token) => {
+    if (token) {
+        axios.defaults.headers.common['Authorization'] = `Token ${token}`;
+    } else {
+        delete axios.defaults.headers.common['Authorization'];
+    }
+};
+
 export const AuthProvider = ({ children }) => {
     const [user, setUser] = useState(null);
     const [loading, setLoading] = useState(true);
@@ -13,7 +22,9 @@ export const AuthProvider = ({ children }) => {
             try {
                 const storedUser = localStorage.getItem('divideit_user');
                 if (storedUser) {
-                    setUser(JSON.parse(storedUser));
+                    const parsed = JSON.parse(storedUser);
+                    setAuthToken(parsed.token);
+                    setUser(parsed);
                 }
             } catch (error) {
                 console.error("Failed to initialize auth:", error);
@@ -25,9 +36,25 @@ export const AuthProvider = ({ children }) => {
         initializeAuth();
     }, []);
 
+    // A token revoked or expired on the server answers 401; drop it so the
+    // layout sends the user back to the login page
+    useEffect(() => {
+        const interceptor = axios.interceptors.response.use(
+            (response) => response,
+            (error) => {
+                if (error.response?.status === 401 && error.config?.headers?.Authorization) {
+                    clearSession();
+                }
+                return Promise.reject(error);
+            }
+        );
+        return () => axios.interceptors.response.eject(interceptor);
+    }, []);
+
     const login = async (username, password) => {
         try {
             const res = await axios.post(`${API_BASE_URL}/login/`, { username, password });
+            setAuthToken(res.data.token);
             setUser(res.data);
             localStorage.setItem('divideit_user', JSON.stringify(res.data));
             return { success: true };
@@ -46,11 +73,19 @@ export const AuthProvider = ({ children }) => {
         }
     };
 
-    const logout = () => {
+    const clearSession = () => {
+        setAuthToken(null);
         setUser(null);
         localStorage.removeItem('divideit_user');
     };
 
+    const logout = () => {
+        if (user?.token) {
+            axios.post(`${API_BASE_URL}/logout/`).catch(() => {});
+        }
+        clearSession();
+    };
+
     const updateUser = (newData) => {
         const updatedUser = { ...user, ...newData };
         setUser(updatedUser);
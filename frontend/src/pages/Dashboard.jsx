@@ -41,6 +41,31 @@ export default function Dashboard() {
             }
         }
         fetchData();
+
+        // Live updates when served over ASGI; otherwise the stream just fails
+        // and the dashboard refreshes after our own actions as before
+        if (!user?.id || typeof EventSource === 'undefined') return;
+        let refetch = null;
+        const scheduleRefetch = () => {
+            // Coalesce a burst of events into one round of requests
+            clearTimeout(refetch);
+            refetch = setTimeout(fetchData, 300);
+        };
+        const source = new EventSource(`${API_BASE_URL}/stream/${user.id}/`);
+        source.addEventListener('balance', (event) => {
+            const delta = JSON.parse(event.data);
+            setBalance((current) => ({
+                you_owe: Number(current.you_owe) + delta.you_owe,
+                owed_to_you: Number(current.owed_to_you) + delta.owed_to_you
+            }));
+            scheduleRefetch();
+        });
+        source.addEventListener('activity', scheduleRefetch);
+        source.addEventListener('resync', scheduleRefetch);
+        return () => {
+            clearTimeout(refetch);
+            source.close();
+        };
     }, [user]);
 
     const totalBalance = balance.owed_to_you - balance.you_owe;
@@ -45,9 +45,17 @@ export default function GroupsPage() {
 
     useEffect(() => {
         async function fetchGroups() {
+            if (!user?.id) return;
             try {
-                const res = await axios.get(`${API_BASE_URL}/groups/`);
-                setGroups(res.data);
+                // Summary rows for the list; members are loaded when a group is opened
+                let url = `${API_BASE_URL}/groups/?user_id=${user.id}&view=summary`;
+                let all = [];
+                while (url) {
+                    const res = await axios.get(url);
+                    all = all.concat(res.data.results);
+                    url = res.data.next;
+                }
+                setGroups(all);
             } catch (error) {
                 console.error("Failed to fetch groups");
             } finally {
@@ -55,7 +63,7 @@ export default function GroupsPage() {
             }
         }
         fetchGroups();
-    }, []);
+    }, [user?.id]);
 
     const fetchExpenses = async (groupId) => {
         try {
@@ -67,8 +75,14 @@ export default function GroupsPage() {
     };
 
     const handleOpenGroup = async (group) => {
-        setActiveGroup(group);
-        setSelectedMembers(group.members.map(m => m.id)); // Default to all members
+        try {
+            const res = await axios.get(`${API_BASE_URL}/groups/${group.id}/`);
+            setActiveGroup(res.data);
+            setSelectedMembers(res.data.members.map(m => m.id)); // Default to all members
+        } catch (error) {
+            console.error("Failed to fetch group");
+            return;
+        }
         await fetchExpenses(group.id);
         setShowExpenseModal(true);
     };
@@ -112,7 +126,14 @@ export default function GroupsPage() {
                 name: newGroupName,
                 user_id: user?.id
             });
-            setGroups([...groups, res.data]);
+            setGroups([...groups, {
+                id: res.data.id,
+                name: res.data.name,
+                created_at: res.data.created_at,
+                member_count: res.data.members.length,
+                expense_total: '0.00',
+                net_balance: '0.00'
+            }]);
             setShowModal(false);
             setNewGroupName('');
         } catch (error) {
@@ -152,7 +173,7 @@ export default function GroupsPage() {
 
             setActiveGroup(updatedGroup);
             // Also update the groups list
-            setGroups(groups.map(g => g.id === updatedGroup.id ? updatedGroup : g));
+            setGroups(groups.map(g => g.id === updatedGroup.id ? { ...g, member_count: updatedGroup.members.length } : g));
 
             // Auto-check the new member in the split list if they were just added
             // Find the member ID of the one we just added
@@ -247,7 +268,7 @@ export default function GroupsPage() {
                                 </svg>
                             </button>
                         </div>
-                        <p style={{ color: 'var(--text-muted)' }}>{group.members.length} Members</p>
+                        <p style={{ color: 'var(--text-muted)' }}>{group.member_count} Members</p>
                         <div style={{ marginTop: '1rem', paddingTop: '1rem', borderTop: '1px solid var(--border)', display: 'flex', gap: '0.5rem' }}>
                             <button onClick={() => handleOpenGroup(group)} className="btn" style={{ background: 'rgba(255,255,255,0.05)', border: '1px solid var(--border)', padding: '0.5rem 1rem', fontSize: '0.875rem', color: 'var(--text-muted)' }}>View Expenses</button>
                             <button onClick={() => handleOpenGroup(group)} className="btn btn-primary" style={{ padding: '0.5rem 1rem', fontSize: '0.875rem' }}>Add Expense</button>
@@ -10,13 +10,15 @@ export default function PaymentHistory() {
     const [transactions, setTransactions] = useState([]);
     const [loading, setLoading] = useState(true);
     const [ordering, setOrdering] = useState('-date');
+    const [nextCursor, setNextCursor] = useState(null);
 
     const fetchHistory = async () => {
         if (!user?.id) return;
         setLoading(true);
         try {
             const res = await axios.get(`${API_BASE_URL}/history/${user.id}/?ordering=${ordering}`);
-            setTransactions(res.data);
+            setTransactions(res.data.results);
+            setNextCursor(res.data.next_cursor);
         } catch (error) {
             console.error("Failed to fetch history", error);
         } finally {
@@ -24,6 +26,19 @@ export default function PaymentHistory() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        try {
+            const res = await axios.get(`${API_BASE_URL}/history/${user.id}/`, {
+                params: { ordering, cursor: nextCursor }
+            });
+            setTransactions(prev => [...prev, ...res.data.results]);
+            setNextCursor(res.data.next_cursor);
+        } catch (error) {
+            console.error("Failed to fetch history", error);
+        }
+    };
+
     useEffect(() => {
         fetchHistory();
     }, [user, ordering]);
@@ -255,6 +270,13 @@ export default function PaymentHistory() {
                         </tbody>
                     </table>
                 </div>
+                {!loading && nextCursor && (
+                    <div style={{ padding: '1rem', textAlign: 'center', borderTop: '1px solid var(--border)' }}>
+                        <button onClick={loadMore} className="btn" style={{ padding: '0.5rem 1.25rem', fontSize: '0.85rem' }}>
+                            Load more
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );